@@ -14,6 +14,7 @@ from sentry import eventstore, features
 from sentry.api.base import region_silo_endpoint
 from sentry.api.bases import GroupEndpoint
 from sentry.api.serializers import EventSerializer, serialize
+from sentry.grouping.grouphash_cache import invalidate_grouphashes
 from sentry.grouping.variants import ComponentVariant
 from sentry.models import Group, GroupHash
 from sentry.utils import snuba
@@ -135,6 +136,7 @@ def _split_group(group: Group, hash: str, hierarchical_hashes: Optional[Sequence
     grouphash.state = GroupHash.State.SPLIT
     grouphash.group_id = group.id
     grouphash.save()
+    invalidate_grouphashes(group.project_id, [hash])
 
 
 def _get_full_hierarchical_hashes(group: Group, hash: str) -> Optional[Sequence[str]]:
@@ -212,6 +214,11 @@ def _unsplit_group(group: Group, hash: str, hierarchical_hashes: Optional[Sequen
         if grouphash_to_delete is not None:
             grouphash_to_delete.delete()
 
+    invalidate_grouphashes(
+        group.project_id,
+        [gh.hash for gh in (grouphash_to_unsplit, grouphash_to_delete) if gh is not None],
+    )
+
 
 def _get_group_filters(group: Group):
     return [
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from sentry.api.base import region_silo_endpoint
 from sentry.api.bases import ProjectEndpoint
 from sentry.api.exceptions import ResourceDoesNotExist
+from sentry.grouping.grouphash_cache import invalidate_grouphashes
 from sentry.models import GroupHash, GroupTombstone
 
 
@@ -28,10 +29,15 @@ class GroupTombstoneDetailsEndpoint(ProjectEndpoint):
         except GroupTombstone.DoesNotExist:
             raise ResourceDoesNotExist
 
-        GroupHash.objects.filter(project_id=project.id, group_tombstone_id=tombstone_id).update(
+        grouphashes = GroupHash.objects.filter(
+            project_id=project.id, group_tombstone_id=tombstone_id
+        )
+        hashes = list(grouphashes.values_list("hash", flat=True))
+        grouphashes.update(
             # will allow new events to be captured
             group_tombstone_id=None
         )
+        invalidate_grouphashes(project.id, hashes)
 
         tombstone.delete()
 
@@ -24,6 +24,7 @@ from sentry.auth.superuser import is_active_superuser
 from sentry.constants import RESERVED_PROJECT_SLUGS
 from sentry.datascrubbing import validate_pii_config_update
 from sentry.dynamic_sampling import generate_rules, get_supported_biases_ids, get_user_biases
+from sentry.grouping.api import warm_grouping_config_cache
 from sentry.grouping.enhancer import Enhancements, InvalidEnhancerConfig
 from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
 from sentry.ingest.inbound_filters import FilterTypes
@@ -511,6 +512,12 @@ class ProjectDetailsEndpoint(ProjectEndpoint):
         if result.get("fingerprintingRules") is not None:
             if project.update_option("sentry:fingerprinting_rules", result["fingerprintingRules"]):
                 changed_proj_settings["sentry:fingerprinting_rules"] = result["fingerprintingRules"]
+        if changed_proj_settings.keys() & {
+            "sentry:grouping_config",
+            "sentry:grouping_enhancements",
+            "sentry:fingerprinting_rules",
+        }:
+            warm_grouping_config_cache(project)
         if result.get("secondaryGroupingConfig") is not None:
             if project.update_option(
                 "sentry:secondary_grouping_config", result["secondaryGroupingConfig"]
@@ -9,6 +9,7 @@ from rest_framework.response import Response
 
 from sentry import eventstream
 from sentry.api.base import audit_logger
+from sentry.grouping.grouphash_cache import invalidate_grouphashes
 from sentry.issues.grouptype import GroupCategory
 from sentry.models import Group, GroupHash, GroupInbox, GroupStatus, Project
 from sentry.signals import issue_deleted
@@ -42,6 +43,12 @@ def delete_group_list(
     eventstream_state = eventstream.start_delete_groups(project.id, group_ids)
     transaction_id = uuid4().hex
 
+    hashes = list(
+        GroupHash.objects.filter(project_id=project.id, group__id__in=group_ids).values_list(
+            "hash", flat=True
+        )
+    )
+
     # We do not want to delete split hashes as they are necessary for keeping groups... split.
     GroupHash.objects.filter(
         project_id=project.id, group__id__in=group_ids, state=GroupHash.State.SPLIT
@@ -49,6 +56,7 @@ def delete_group_list(
     GroupHash.objects.filter(project_id=project.id, group__id__in=group_ids).exclude(
         state=GroupHash.State.SPLIT
     ).delete()
+    invalidate_grouphashes(project.id, hashes)
 
     # We remove `GroupInbox` rows here so that they don't end up influencing queries for
     # `Group` instances that are pending deletion
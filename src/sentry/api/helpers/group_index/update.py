@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from collections import defaultdict
+from functools import partial
 from typing import Any, Dict, Mapping, MutableMapping, Sequence
 
 import rest_framework
-from django.db import IntegrityError, transaction
+from django.db import IntegrityError, router, transaction
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework import serializers
@@ -15,6 +16,7 @@ from sentry import analytics, features
 from sentry.api.serializers import serialize
 from sentry.api.serializers.models.actor import ActorSerializer
 from sentry.db.models.query import create_or_update
+from sentry.grouping.grouphash_cache import invalidate_grouphashes
 from sentry.issues.grouptype import GroupCategory
 from sentry.issues.ignored import handle_archived_until_escalating, handle_ignored
 from sentry.issues.merge import handle_merge
@@ -93,9 +95,16 @@ def handle_discard(
             else:
                 groups_to_delete[group.project_id].append(group)
 
+                hashes = list(GroupHash.objects.filter(group=group).values_list("hash", flat=True))
                 GroupHash.objects.filter(group=group).update(
                     group=None, group_tombstone_id=tombstone.id
                 )
+                # Events saved before the tombstone is committed would otherwise
+                # cache the old rows under the new generation.
+                transaction.on_commit(
+                    partial(invalidate_grouphashes, group.project_id, hashes),
+                    using=router.db_for_write(GroupHash),
+                )
 
     for project in projects:
         delete_group_list(
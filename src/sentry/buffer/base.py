@@ -1,6 +1,8 @@
 import logging
+from collections import defaultdict
 
-from django.db.models import F
+from django.db.models import Case, F, Value, When
+from django.db.models.signals import post_save
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
@@ -28,7 +30,7 @@ class Buffer(Service, metaclass=BufferMount):
     keep up with the updates.
     """
 
-    __all__ = ("get", "incr", "process", "process_pending", "validate")
+    __all__ = ("get", "incr", "process", "process_batch", "process_pending", "validate")
 
     def get(self, model, columns, filters):
         """
@@ -102,3 +104,91 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, batch):
+        """
+        Processes many buffered increments at once. ``batch`` is a list of
+        ``(model, columns, filters, extra, signal_only)`` tuples.
+
+        Increments of rows keyed by primary key are written with a single
+        ``UPDATE ... CASE`` statement per model, everything else goes through
+        `process` one item at a time.
+        """
+        items_by_model = defaultdict(list)
+        for item in batch:
+            model, columns, filters, extra, signal_only = item
+            if len(filters) == 1 and set(filters) <= {"id", "pk"} and not signal_only:
+                items_by_model[model].append(item)
+            else:
+                self.process(model, columns, filters, extra, signal_only)
+
+        for model, items in items_by_model.items():
+            self._process_model_batch(model, items)
+
+    def _process_model_batch(self, model, items):
+        from sentry.event_manager import ScoreClause
+        from sentry.models import Group
+
+        columns_by_id = {}
+        extra_by_id = {}
+        for _, columns, filters, extra, _ in items:
+            (pk,) = filters.values()
+            pk_columns = columns_by_id.setdefault(pk, {})
+            for c, v in columns.items():
+                pk_columns[c] = pk_columns.get(c, 0) + v
+            extra_by_id.setdefault(pk, {}).update(extra or {})
+
+        update_kwargs_by_id = {}
+        for pk, columns in columns_by_id.items():
+            update_kwargs = {c: F(c) + v for c, v in columns.items()}
+            update_kwargs.update(extra_by_id[pk])
+            # HACK: same as `process`, keep the score of groups up to date
+            if model is Group and "last_seen" in update_kwargs and "times_seen" in update_kwargs:
+                update_kwargs["score"] = ScoreClause(
+                    group=None,
+                    times_seen=update_kwargs["times_seen"],
+                    last_seen=update_kwargs["last_seen"],
+                )
+            if update_kwargs:
+                update_kwargs_by_id[pk] = update_kwargs
+
+        fields = {f for update_kwargs in update_kwargs_by_id.values() for f in update_kwargs}
+        case_kwargs = {}
+        for field in fields:
+            output_field = model._meta.get_field(field)
+            case_kwargs[field] = Case(
+                *(
+                    When(
+                        pk=pk,
+                        then=update_kwargs[field]
+                        if hasattr(update_kwargs[field], "resolve_expression")
+                        else Value(update_kwargs[field], output_field=output_field),
+                    )
+                    for pk, update_kwargs in update_kwargs_by_id.items()
+                    if field in update_kwargs
+                ),
+                default=F(field),
+                output_field=output_field,
+            )
+
+        # Unlike `process`, rows that were deleted by the time we flush buffers
+        # are not created again, the update just won't match them. They could
+        # not be created from their primary key alone anyway.
+        if case_kwargs:
+            model.objects.filter(pk__in=list(update_kwargs_by_id)).update(**case_kwargs)
+
+        # XXX: ``update`` doesn't fire `post_save` signals, so do it ourselves
+        # to keep the group cache up to date, same as `process`.
+        if model is Group and update_kwargs_by_id:
+            for group in Group.objects.filter(id__in=list(update_kwargs_by_id)):
+                post_save.send(sender=Group, instance=group, created=False)
+
+        for model, columns, filters, extra, _ in items:
+            buffer_incr_complete.send_robust(
+                model=model,
+                columns=columns,
+                filters=filters,
+                extra=extra,
+                created=False,
+                sender=model,
+            )
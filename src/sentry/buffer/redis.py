@@ -1,5 +1,7 @@
+import atexit
 import pickle
 import threading
+from collections import defaultdict
 from datetime import datetime
 from time import time
 
@@ -47,17 +49,105 @@ class PendingBuffer:
         return rv
 
 
+class CoalescingBuffer:
+    """
+    Sums increments for the same buffer key in process so that they can be
+    written to Redis in bulk. Counters are summed, extra values are last
+    write wins and signal_only is sticky once set.
+    """
+
+    def __init__(self, size, interval):
+        assert size > 0
+        assert interval > 0
+        self.size = size
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.values = {}
+        self.started = None
+
+    def add(self, key, model, columns, filters, extra=None, signal_only=None):
+        """
+        Adds an increment to the buffer, returning ``True`` when either the
+        size or the time threshold has been reached and the buffer should be
+        flushed.
+        """
+        now = time()
+        with self.lock:
+            if self.started is None:
+                self.started = now
+
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {
+                    "model": model,
+                    "columns": {},
+                    "filters": filters,
+                    "extra": {},
+                    "signal_only": None,
+                }
+
+            for column, amount in columns.items():
+                entry["columns"][column] = entry["columns"].get(column, 0) + amount
+            if extra:
+                entry["extra"].update(extra)
+            if signal_only is True:
+                entry["signal_only"] = True
+
+            return len(self.values) >= self.size or now - self.started >= self.interval
+
+    def get(self, key, column):
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                return 0
+            return entry["columns"].get(column, 0)
+
+    def empty(self):
+        return not self.values
+
+    def flush(self):
+        with self.lock:
+            rv = self.values
+            self.values = {}
+            self.started = None
+        return rv
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self,
+        pending_partitions=1,
+        incr_batch_size=2,
+        incr_coalesce_size=0,
+        incr_coalesce_interval=1.0,
+        bulk_process=False,
+        **options,
+    ):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        # When ``bulk_process`` is set, ``process`` drains a whole batch of
+        # keys with one round trip per host and hands them to
+        # ``Buffer.process_batch`` instead of processing each key on its own.
+        self.bulk_process = bulk_process
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
 
+        # When ``incr_coalesce_size`` is set, ``incr`` calls are summed in
+        # process and written to Redis once either ``incr_coalesce_size``
+        # distinct keys are buffered or ``incr_coalesce_interval`` seconds
+        # have passed since the first buffered increment. A timer flushes the
+        # buffer after ``incr_coalesce_interval`` on workers that go idle.
+        self.coalescing_buffer = None
+        self._flush_timer = None
+        self._flush_timer_lock = threading.Lock()
+        if incr_coalesce_size > 0:
+            self.coalescing_buffer = CoalescingBuffer(incr_coalesce_size, incr_coalesce_interval)
+            atexit.register(self.flush_coalesced)
+
     def validate(self):
         try:
             # wait 10 seconds at most
@@ -106,6 +196,16 @@ class RedisBuffer(Buffer):
     def _make_lock_key(self, key):
         return f"l:{key}"
 
+    def _group_keys_by_host(self, keys):
+        """
+        Returns a mapping of host ID to the keys that are routed to it.
+        """
+        router = self.cluster.get_router()
+        rv = defaultdict(list)
+        for key in keys:
+            rv[router.get_host_for_key(key)].append(key)
+        return rv
+
     def _dump_values(self, values):
         result = {}
         for k, v in values.items():
@@ -157,9 +257,13 @@ class RedisBuffer(Buffer):
             pipe.hget(key, f"i+{col}")
         results = pipe.execute()
 
-        return {
+        rv = {
             col: (int(results[i]) if results[i] is not None else 0) for i, col in enumerate(columns)
         }
+        if self.coalescing_buffer is not None:
+            for col in columns:
+                rv[col] += self.coalescing_buffer.get(key, col)
+        return rv
 
     def incr(self, model, columns, filters, extra=None, signal_only=None, return_incr_results=True):
         """
@@ -170,17 +274,41 @@ class RedisBuffer(Buffer):
             - Perform a set (last write wins) on extra
             - Perform a set on signal_only (only if True)
         - Add hashmap key to pending flushes
+
+        When coalescing is enabled the increment is summed in process and only
+        written to Redis once the coalescing buffer is flushed.
         """
 
         # TODO(dcramer): longer term we'd rather not have to serialize values
         # here (unless it's to JSON)
         key = self._make_key(model, filters)
+
+        if self.coalescing_buffer is not None:
+            if self.coalescing_buffer.add(key, model, columns, filters, extra, signal_only):
+                self.flush_coalesced()
+            else:
+                self._schedule_flush()
+        else:
+            # We can't use conn.map() due to wanting to support multiple pending
+            # keys (one per Redis partition)
+            conn = self.cluster.get_local_client_for_key(key)
+            pipe = conn.pipeline()
+            self._queue_incr(pipe, key, model, columns, filters, extra, signal_only)
+            pipe.execute()
+
+        metrics.incr(
+            "buffer.incr",
+            skip_internal=True,
+            tags={"module": model.__module__, "model": model.__name__},
+        )
+
+    def _queue_incr(self, pipe, key, model, columns, filters, extra=None, signal_only=None):
+        """
+        Queues the commands for a single increment of ``key`` onto ``pipe``,
+        which must be bound to the host owning ``key``.
+        """
         pending_key = self._make_pending_key_from_key(key)
-        # We can't use conn.map() due to wanting to support multiple pending
-        # keys (one per Redis partition)
-        conn = self.cluster.get_local_client_for_key(key)
 
-        pipe = conn.pipeline()
         pipe.hsetnx(key, "m", f"{model.__module__}.{model.__name__}")
         # TODO(dcramer): once this goes live in production, we can kill the pickle path
         # (this is to ensure a zero downtime deploy where we can transition event processing)
@@ -204,13 +332,47 @@ class RedisBuffer(Buffer):
 
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, {key: time()})
-        pipe.execute()
 
-        metrics.incr(
-            "buffer.incr",
-            skip_internal=True,
-            tags={"module": model.__module__, "model": model.__name__},
-        )
+    def _schedule_flush(self):
+        with self._flush_timer_lock:
+            # Timers don't survive a fork, so a timer inherited from the
+            # parent process is not alive in the child.
+            if self._flush_timer is not None and self._flush_timer.is_alive():
+                return
+            self._flush_timer = threading.Timer(
+                self.coalescing_buffer.interval, self._flush_coalesced_from_timer
+            )
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_coalesced_from_timer(self):
+        with self._flush_timer_lock:
+            self._flush_timer = None
+        try:
+            self.flush_coalesced()
+        except Exception:
+            self.logger.exception("buffer.coalesced-flush-failed")
+        # Increments buffered while flushing need another timer.
+        if not self.coalescing_buffer.empty():
+            self._schedule_flush()
+
+    def flush_coalesced(self):
+        """
+        Writes all increments summed in process to Redis, using one pipeline
+        per host.
+        """
+        if self.coalescing_buffer is None or self.coalescing_buffer.empty():
+            return
+
+        values = self.coalescing_buffer.flush()
+
+        for host_id, keys in self._group_keys_by_host(values).items():
+            pipe = self.cluster.get_local_client(host_id).pipeline()
+            for key in keys:
+                self._queue_incr(pipe, key, **values[key])
+            pipe.execute()
+
+        metrics.timing("buffer.coalesced-flush-size", len(values))
 
     def process_pending(self, partition=None):
         if partition is None and self.pending_partitions > 1:
@@ -233,13 +395,18 @@ class RedisBuffer(Buffer):
 
         try:
             keycount = 0
+            oldest = None
             with self.cluster.all() as conn:
-                results = conn.zrange(pending_key, 0, -1)
+                results = conn.zrange(pending_key, 0, -1, withscores=True)
 
             with self.cluster.all() as conn:
-                for host_id, keys in results.value.items():
-                    if not keys:
+                for host_id, items in results.value.items():
+                    if not items:
                         continue
+                    keys = [key for key, _ in items]
+                    host_oldest = min(score for _, score in items)
+                    if oldest is None or host_oldest < oldest:
+                        oldest = host_oldest
                     keycount += len(keys)
                     for key in keys:
                         pending_buffer.append(key.decode("utf-8"))
@@ -251,7 +418,12 @@ class RedisBuffer(Buffer):
             if not pending_buffer.empty():
                 process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
 
-            metrics.timing("buffer.pending-size", keycount)
+            partition_tag = "none" if partition is None else str(partition)
+            metrics.timing("buffer.pending-size", keycount, tags={"partition": partition_tag})
+            if oldest is not None:
+                metrics.timing(
+                    "buffer.pending-lag", time() - oldest, tags={"partition": partition_tag}
+                )
         finally:
             client.delete(lock_key)
 
@@ -262,12 +434,104 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
+        if self.bulk_process:
+            self._process_batch_incr(batch_keys)
+            return
+
         for key in batch_keys:
             self._process_single_incr(key)
 
     def _process(self, model, columns, filters, extra=None, signal_only=None):
         return super().process(model, columns, filters, extra, signal_only)
 
+    def _process_batch(self, batch):
+        return super().process_batch(batch)
+
+    def _process_batch_incr(self, batch_keys):
+        # prevent a stampede due to the way we use celery etas + duplicate
+        # tasks, same as ``_process_single_incr`` but for the whole batch
+        with self.cluster.map() as conn:
+            locks = {
+                key: conn.set(self._make_lock_key(key), "1", nx=True, ex=10) for key in batch_keys
+            }
+        keys = [key for key, locked in locks.items() if locked.value]
+        for key in set(batch_keys) - set(keys):
+            metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+            self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
+
+        if not keys:
+            return
+
+        try:
+            values_by_key = {}
+            for host_id, host_keys in self._group_keys_by_host(keys).items():
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+                    pipe.zrem(self._make_pending_key_from_key(key), key)
+                    pipe.delete(key)
+                results = pipe.execute()
+                for i, key in enumerate(host_keys):
+                    values_by_key[key] = results[i * 3]
+
+            batch = []
+            for key in keys:
+                item = self._load_incr_values(key, values_by_key[key])
+                if item is not None:
+                    batch.append(item)
+
+            metrics.timing("buffer.bulk-process-size", len(batch))
+            if batch:
+                self._process_batch(batch)
+        finally:
+            with self.cluster.map() as conn:
+                for key in keys:
+                    conn.delete(self._make_lock_key(key))
+
+    def _load_incr_values(self, key, values):
+        """
+        Decodes the buffered hash stored at ``key`` into a
+        ``(model, columns, filters, extra, signal_only)`` tuple, or returns
+        ``None`` if nothing was buffered.
+        """
+        # XXX(python3): In python2 this isn't as important since redis will
+        # return string tyes (be it, byte strings), but in py3 we get bytes
+        # back, and really we just want to deal with keys as strings.
+        values = {force_text(k): v for k, v in values.items()}
+
+        if not values:
+            metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+            self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+            return None
+
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
+
     def _process_single_incr(self, key):
         client = self.cluster.get_routing_client()
         lock_key = self._make_lock_key(key)
@@ -288,42 +552,8 @@ class RedisBuffer(Buffer):
             pipe.delete(key)
             values = pipe.execute()[0]
 
-            # XXX(python3): In python2 this isn't as important since redis will
-            # return string tyes (be it, byte strings), but in py3 we get bytes
-            # back, and really we just want to deal with keys as strings.
-            values = {force_text(k): v for k, v in values.items()}
-
-            if not values:
-                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
-                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
-                return
-
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))
-
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            self._process(model, incr_values, filters, extra_values, signal_only)
+            item = self._load_incr_values(key, values)
+            if item is not None:
+                self._process(*item)
         finally:
             client.delete(lock_key)
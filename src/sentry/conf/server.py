@@ -635,6 +635,7 @@ CELERY_IMPORTS = (
     "sentry.tasks.servicehooks",
     "sentry.tasks.store",
     "sentry.tasks.symbolication",
+    "sentry.tasks.tsdb",
     "sentry.tasks.unmerge",
     "sentry.tasks.update_user_reports",
     "sentry.tasks.user_report",
@@ -728,6 +729,7 @@ CELERY_QUEUES = [
         "symbolications.compute_low_priority_projects",
         routing_key="symbolications.compute_low_priority_projects",
     ),
+    Queue("tsdb", routing_key="tsdb"),
     Queue("unmerge", routing_key="unmerge"),
     Queue("update", routing_key="update"),
     Queue("profiles.process", routing_key="profiles.process"),
@@ -786,6 +788,12 @@ CELERYBEAT_SCHEDULE = {
         "schedule": timedelta(seconds=10),
         "options": {"expires": 10, "queue": "buffers.process_pending"},
     },
+    "compact-distinct-counts": {
+        "task": "sentry.tasks.tsdb.compact_distinct_counts",
+        # Run every 1 minute
+        "schedule": crontab(minute="*/1"),
+        "options": {"expires": 60, "queue": "tsdb"},
+    },
     "sync-options": {
         "task": "sentry.tasks.options.sync_options",
         "schedule": timedelta(seconds=10),
@@ -1691,6 +1699,11 @@ SENTRY_SNUBA_CACHE_TTL_SECONDS = 60
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
 SENTRY_NODESTORE_OPTIONS = {}
 
+# Codec applied to node payloads before they are written, e.g.
+# "sentry.nodestore.codecs.ZstdDictionaryCodec" with {"path": ...}
+SENTRY_NODESTORE_CODEC = "sentry.nodestore.codecs.NodeCodec"
+SENTRY_NODESTORE_CODEC_OPTIONS = {}
+
 # Tag storage backend
 SENTRY_TAGSTORE = os.environ.get("SENTRY_TAGSTORE", "sentry.tagstore.snuba.SnubaTagStorage")
 SENTRY_TAGSTORE_OPTIONS = {}
@@ -1741,6 +1754,8 @@ SENTRY_METRICS_INDEXER_SPANNER_OPTIONS = {}
 
 # Rate limits during string indexing for our metrics product.
 # Which cluster to use. Example: {"cluster": "default"}
+# Set "lease_size" to lease quota from Redis in chunks instead of checking it
+# on every batch, see sentry.ratelimits.sliding_windows.
 SENTRY_METRICS_INDEXER_WRITES_LIMITER_OPTIONS = {}
 SENTRY_METRICS_INDEXER_WRITES_LIMITER_OPTIONS_PERFORMANCE = (
     SENTRY_METRICS_INDEXER_WRITES_LIMITER_OPTIONS
@@ -1752,6 +1767,8 @@ SENTRY_METRICS_INDEXER_DEBUG_LOG_SAMPLE_RATE = 0.01
 
 # Cardinality limits during metric bucket ingestion.
 # Which cluster to use. Example: {"cluster": "default"}
+# Set "bloom_filters" to True to track seen timeseries in fixed-size Bloom
+# filters instead of sets, see sentry.ratelimits.cardinality.
 SENTRY_METRICS_INDEXER_CARDINALITY_LIMITER_OPTIONS = {}
 SENTRY_METRICS_INDEXER_CARDINALITY_LIMITER_OPTIONS_PERFORMANCE = {}
 SENTRY_METRICS_INDEXER_ENABLE_SLICED_PRODUCER = False
@@ -3,6 +3,7 @@ from collections import defaultdict
 
 from sentry import eventstore, eventstream, models, nodestore
 from sentry.eventstore.models import Event
+from sentry.grouping.grouphash_cache import invalidate_project_grouphashes
 
 from ..base import BaseDeletionTask, BaseRelation, ModelDeletionTask, ModelRelation
 
@@ -138,6 +139,10 @@ class GroupDeletionTask(ModelDeletionTask):
 
         self.delete_children(child_relations)
 
+        # Grouphashes of the groups may still be cached.
+        for project_id in {group.project_id for group in instance_list}:
+            invalidate_project_grouphashes(project_id)
+
         # Remove group objects with children removed.
         return self.delete_instance_bulk(instance_list)
 
@@ -64,6 +64,7 @@ from sentry.eventtypes import (
     HpkpEvent,
     TransactionEvent,
 )
+from sentry.grouping import grouphash_cache
 from sentry.grouping.api import (
     BackgroundGroupingConfigLoader,
     GroupingConfig,
@@ -1454,13 +1455,22 @@ def _save_aggregate(
     metadata: dict[str, Any],
     received_timestamp: Union[int, float],
     migrate_off_hierarchical: Optional[bool] = False,
+    use_grouphash_cache: bool = True,
     **kwargs: dict[str, Any],
 ) -> Optional[GroupInfo]:
     project = event.project
 
-    flat_grouphashes = [
-        GroupHash.objects.get_or_create(project=project, hash=hash)[0] for hash in hashes.hashes
-    ]
+    # Resolve the flat and hierarchical hashes with one query, and create the
+    # flat hashes that don't exist yet in bulk. Hashes that already belong to
+    # a group are usually served from the grouphash cache.
+    if use_grouphash_cache:
+        grouphashes = grouphash_cache.get_grouphashes(
+            project, [*hashes.hashes, *hashes.hierarchical_hashes]
+        )
+    else:
+        grouphashes = _get_grouphashes(project, [*hashes.hashes, *hashes.hierarchical_hashes])
+    _create_missing_grouphashes(project, hashes.hashes, grouphashes)
+    flat_grouphashes = [grouphashes[hash] for hash in hashes.hashes]
 
     # The root_hierarchical_hash is the least specific hash within the tree, so
     # typically hierarchical_hashes[0], unless a hash `n` has been split in
@@ -1469,13 +1479,12 @@ def _save_aggregate(
     # when groups are created and also relieves contention by locking a more
     # specific hash than `hierarchical_hashes[0]`.
     existing_grouphash, root_hierarchical_hash = _find_existing_grouphash(
-        project, flat_grouphashes, hashes.hierarchical_hashes
+        project, flat_grouphashes, hashes.hierarchical_hashes, grouphashes=grouphashes
     )
 
     if root_hierarchical_hash is not None:
-        root_hierarchical_grouphash = GroupHash.objects.get_or_create(
-            project=project, hash=root_hierarchical_hash
-        )[0]
+        _create_missing_grouphashes(project, [root_hierarchical_hash], grouphashes)
+        root_hierarchical_grouphash = grouphashes[root_hierarchical_hash]
 
         metadata.update(
             hashes.group_metadata_from_hash(
@@ -1532,9 +1541,9 @@ def _save_aggregate(
             )
 
             if root_hierarchical_hash is not None:
-                root_hierarchical_grouphash = GroupHash.objects.get_or_create(
-                    project=project, hash=root_hierarchical_hash
-                )[0]
+                locked_grouphashes = {gh.hash: gh for gh in all_hashes}
+                _create_missing_grouphashes(project, [root_hierarchical_hash], locked_grouphashes)
+                root_hierarchical_grouphash = locked_grouphashes[root_hierarchical_hash]
             else:
                 root_hierarchical_grouphash = None
 
@@ -1565,7 +1574,29 @@ def _save_aggregate(
 
                 return GroupInfo(group, is_new, is_regression)
 
-    group = Group.objects.get(id=existing_grouphash.group_id)
+    try:
+        group = Group.objects.get(id=existing_grouphash.group_id)
+    except Group.DoesNotExist:
+        if not use_grouphash_cache:
+            raise
+        group = None
+
+    if use_grouphash_cache and (group is None or group.project_id != project.id):
+        # The grouphash came from a stale cache entry, drop it and start over
+        # with the rows in Postgres.
+        metrics.incr("grouphash.cache.stale", skip_internal=True)
+        grouphash_cache.invalidate_project_grouphashes(project.id)
+        return _save_aggregate(
+            event,
+            hashes,
+            release,
+            metadata,
+            received_timestamp,
+            migrate_off_hierarchical,
+            use_grouphash_cache=False,
+            **kwargs,
+        )
+
     if group.issue_category != GroupCategory.ERROR:
         logger.info(
             "event_manager.category_mismatch",
@@ -1631,20 +1662,55 @@ def _save_aggregate(
     return GroupInfo(group, is_new, is_regression)
 
 
+def _get_grouphashes(project: Project, hashes: Sequence[str]) -> MutableMapping[str, GroupHash]:
+    if not hashes:
+        return {}
+
+    return {h.hash: h for h in GroupHash.objects.filter(project=project, hash__in=hashes)}
+
+
+def _create_missing_grouphashes(
+    project: Project, hashes: Sequence[str], grouphashes: MutableMapping[str, GroupHash]
+) -> None:
+    """
+    Create the GroupHash rows for the hashes that are not in `grouphashes` yet
+    with one `INSERT ... ON CONFLICT DO NOTHING`, and add them to
+    `grouphashes`. Rows created concurrently by another process are picked up
+    by the subsequent select.
+    """
+    missing_hashes = [hash for hash in dict.fromkeys(hashes) if hash not in grouphashes]
+    if not missing_hashes:
+        return
+
+    GroupHash.objects.bulk_create(
+        [GroupHash(project=project, hash=hash) for hash in missing_hashes],
+        ignore_conflicts=True,
+    )
+    grouphashes.update(_get_grouphashes(project, missing_hashes))
+
+
 def _find_existing_grouphash(
     project: Project,
     flat_grouphashes: Sequence[GroupHash],
     hierarchical_hashes: Optional[Sequence[str]],
+    grouphashes: Optional[Mapping[str, GroupHash]] = None,
 ) -> tuple[Optional[GroupHash], Optional[str]]:
+    """
+    Find the grouphash that determines the group of an event. If `grouphashes`
+    is given, it must contain all existing GroupHash rows for the hierarchical
+    hashes, which saves fetching them again.
+    """
     all_grouphashes = []
     root_hierarchical_hash = None
 
     found_split = False
 
     if hierarchical_hashes:
+        if grouphashes is None:
+            grouphashes = _get_grouphashes(project, hierarchical_hashes)
+
         hierarchical_grouphashes = {
-            h.hash: h
-            for h in GroupHash.objects.filter(project=project, hash__in=hierarchical_hashes)
+            hash: grouphashes[hash] for hash in hierarchical_hashes if hash in grouphashes
         }
 
         # Look for splits:
@@ -1,6 +1,10 @@
 import re
+from hashlib import md5
+from threading import Lock
 from typing import TypedDict
 
+from cachetools import LRUCache
+
 from sentry import options
 from sentry.grouping.component import GroupingComponent
 from sentry.grouping.enhancer import LATEST_VERSION, Enhancements, InvalidEnhancerConfig
@@ -20,6 +24,9 @@ from sentry.grouping.variants import (
     FallbackVariant,
     SaltedComponentVariant,
 )
+from sentry.utils import metrics
+from sentry.utils.canonical import get_canonical_name
+from sentry.utils.lru import OptionSizedLRUCache
 from sentry.utils.safe import get_path
 
 HASH_RE = re.compile(r"^[0-9a-f]{32}$")
@@ -178,7 +185,11 @@ def load_default_grouping_config():
 
 
 def get_fingerprinting_config_for_project(project):
-    from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
+    from sentry.grouping.fingerprinting import (
+        VERSION,
+        FingerprintingRules,
+        InvalidFingerprintingConfig,
+    )
 
     rules = project.get_option("sentry:fingerprinting_rules")
     if not rules:
@@ -187,19 +198,35 @@ def get_fingerprinting_config_for_project(project):
     from sentry.utils.cache import cache
     from sentry.utils.hashlib import md5_text
 
-    cache_key = "fingerprinting-rules:" + md5_text(rules).hexdigest()
+    cache_key = f"fingerprinting-rules:{VERSION}:" + md5_text(rules).hexdigest()
+    with _fingerprinting_rules_cache_lock:
+        rv = _fingerprinting_rules_cache.get(cache_key)
+    if rv is not None:
+        return rv
+
     rv = cache.get(cache_key)
     if rv is not None:
-        return FingerprintingRules.from_json(rv)
+        rv = FingerprintingRules.from_json(rv)
+    else:
+        try:
+            rv = FingerprintingRules.from_config_string(rules)
+        except InvalidFingerprintingConfig:
+            rv = FingerprintingRules([])
+        cache.set(cache_key, rv.to_json())
 
-    try:
-        rv = FingerprintingRules.from_config_string(rules)
-    except InvalidFingerprintingConfig:
-        rv = FingerprintingRules([])
-    cache.set(cache_key, rv.to_json())
+    with _fingerprinting_rules_cache_lock:
+        _fingerprinting_rules_cache[cache_key] = rv
     return rv
 
 
+def warm_grouping_config_cache(project):
+    """Parses the enhancements and fingerprinting rules of the project into
+    the shared cache, so that this doesn't happen while saving the first
+    events after the rules have been changed."""
+    PrimaryGroupingConfigLoader()._get_enhancements(project)
+    get_fingerprinting_config_for_project(project)
+
+
 def apply_server_fingerprinting(event, config, allow_custom_title=True):
     client_fingerprint = event.get("fingerprint")
     rv = config.get_fingerprint_values_for_event(event)
@@ -255,6 +282,53 @@ def _get_calculated_grouping_variants_for_event(event, context):
     return rv
 
 
+# Attributes that grouping strategies never look at, but that tend to differ
+# between events with otherwise identical stack traces.
+_IGNORED_GROUPING_INPUT_KEYS = frozenset(["vars", "pre_context", "post_context", "raw_stacktrace"])
+
+_grouping_variants_cache = OptionSizedLRUCache("grouping.variants-cache-size")
+
+# Parsed fingerprinting rules by option value hash, so that events neither
+# parse nor deserialize the rules of their project again.
+_fingerprinting_rules_cache = LRUCache(maxsize=1000)
+_fingerprinting_rules_cache_lock = Lock()
+
+
+def _hash_grouping_input(h, value):
+    if isinstance(value, dict):
+        h.update(b"\x05%d" % len(value))
+        for k, v in sorted(value.items()):
+            if k not in _IGNORED_GROUPING_INPUT_KEYS:
+                _hash_grouping_input(h, k)
+                _hash_grouping_input(h, v)
+    elif isinstance(value, (list, tuple)):
+        h.update(b"\x04%d" % len(value))
+        for item in value:
+            _hash_grouping_input(h, item)
+    elif isinstance(value, str):
+        h.update(b"\x07" + value.encode("utf-8", "replace") + b"\x00")
+    else:
+        h.update(b"\x08" + repr(value).encode("utf-8") + b"\x00")
+
+
+def _get_grouping_variants_cache_key(event, config, fingerprint, fingerprint_info):
+    """Returns a hash of everything the grouping variants of the event are
+    calculated from: the grouping config, the platform, the resolved
+    fingerprint and the data of the interfaces that the config's strategies
+    are dispatched to."""
+    h = md5()
+    h.update(config.id.encode("utf-8") + b"\x00")
+    h.update(config.enhancements._config_key)
+    _hash_grouping_input(h, [event.platform, fingerprint, fingerprint_info])
+
+    interfaces = {strategy.interface for strategy in config.strategies.values()}
+    for key, value in sorted(event.data.items()):
+        if value is not None and get_canonical_name(key) in interfaces:
+            _hash_grouping_input(h, [key, value])
+
+    return h.hexdigest()
+
+
 def get_grouping_variants_for_event(event, config=None):
     """Returns a dict of all grouping variants for this event."""
     # If a checksum is set the only variant that comes back from this
@@ -285,6 +359,34 @@ def get_grouping_variants_for_event(event, config=None):
 
     if config is None:
         config = load_default_grouping_config()
+
+    # Events with the same grouping inputs, typically the same crash reported
+    # many times in a row, get the same variants. Those are never modified
+    # after they have been calculated, so they can be shared.
+    use_cache = _grouping_variants_cache.enabled()
+    if use_cache:
+        cache_key = _get_grouping_variants_cache_key(
+            event, config, resolve_fingerprint_values(fingerprint, event.data), fingerprint_info
+        )
+        rv = _grouping_variants_cache.get(cache_key)
+        metrics.incr("grouping.variants_cache", tags={"result": "miss" if rv is None else "hit"})
+        if rv is not None:
+            return dict(rv)
+
+    rv = _calculate_grouping_variants_for_event(
+        event, config, fingerprint, fingerprint_info, defaults_referenced
+    )
+
+    if use_cache:
+        _grouping_variants_cache.set(cache_key, rv)
+        return dict(rv)
+
+    return rv
+
+
+def _calculate_grouping_variants_for_event(
+    event, config, fingerprint, fingerprint_info, defaults_referenced
+):
     context = GroupingContext(config)
 
     # At this point we need to calculate the default event values.  If the
@@ -1,16 +1,20 @@
 import base64
 import os
 import zlib
+from threading import Lock
 
 import msgpack
+from cachetools import LRUCache
 from parsimonious.exceptions import ParseError
 from parsimonious.grammar import Grammar, NodeVisitor
 
 from sentry import projectoptions
 from sentry.grouping.component import GroupingComponent
+from sentry.utils.cache import memoize
 from sentry.utils.strings import unescape_string
 
 from .actions import Action, FlagAction, VarAction
+from .compiled import CompiledRules
 from .exceptions import InvalidEnhancerConfig
 from .matchers import (
     CalleeMatch,
@@ -70,6 +74,15 @@ _        = space*
 VERSIONS = [1, 2]
 LATEST_VERSION = VERSIONS[-1]
 
+# Compiled rules are shared between all ``Enhancements`` instances with the
+# same config, since those are loaded again for every event.
+_compiled_rules_cache = LRUCache(maxsize=500)
+_compiled_rules_lock = Lock()
+
+# Loaded configs by their serialized form, which already includes the version.
+_loads_cache = LRUCache(maxsize=500)
+_loads_lock = Lock()
+
 
 class StacktraceState:
     def __init__(self):
@@ -125,10 +138,11 @@ class Enhancements:
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
 
-        for rule in self._modifier_rules:
-            for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
-            ):
+        modifier_rules, _ = self._compiled_rules
+        for rule, actions in modifier_rules.iter_matching_frame_actions(
+            match_frames, platform, exception_data, cache
+        ):
+            for idx, action in actions:
                 action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
 
     def update_frame_components_contributions(self, components, frames, platform, exception_data):
@@ -139,11 +153,11 @@ class Enhancements:
 
         stacktrace_state = StacktraceState()
         # Apply direct frame actions and update the stack state alongside
-        for rule in self._updater_rules:
-
-            for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
-            ):
+        _, updater_rules = self._compiled_rules
+        for rule, actions in updater_rules.iter_matching_frame_actions(
+            match_frames, platform, exception_data, cache
+        ):
+            for idx, action in actions:
                 action.update_frame_components_contributions(components, frames, idx, rule=rule)
                 action.modify_stacktrace_state(stacktrace_state, rule)
 
@@ -202,6 +216,24 @@ class Enhancements:
 
         return component, inverted_hierarchy
 
+    @memoize
+    def _config_key(self):
+        """Identifies the rules of this instance, including its bases."""
+        return msgpack.dumps(self._to_config_structure())
+
+    @memoize
+    def _compiled_rules(self):
+        """The modifier and updater rules compiled into ``CompiledRules``,
+        cached by the serialized config."""
+        key = self._config_key
+        with _compiled_rules_lock:
+            rv = _compiled_rules_cache.get(key)
+        if rv is None:
+            rv = (CompiledRules(self._modifier_rules), CompiledRules(self._updater_rules))
+            with _compiled_rules_lock:
+                _compiled_rules_cache[key] = rv
+        return rv
+
     def as_dict(self, with_rules=False):
         rv = {
             "id": self.id,
@@ -249,16 +281,28 @@ class Enhancements:
 
     @classmethod
     def loads(cls, data):
+        """Loads a config written by ``dumps``. Loaded configs are cached per
+        process and must not be modified."""
         if isinstance(data, str):
             data = data.encode("ascii", "ignore")
+
+        with _loads_lock:
+            rv = _loads_cache.get(data)
+        if rv is not None:
+            return rv
+
         padded = data + b"=" * (4 - (len(data) % 4))
         try:
-            return cls._from_config_structure(
+            rv = cls._from_config_structure(
                 msgpack.loads(zlib.decompress(base64.urlsafe_b64decode(padded)), raw=False)
             )
         except (LookupError, AttributeError, TypeError, ValueError) as e:
             raise ValueError("invalid stack trace rule config: %s" % e)
 
+        with _loads_lock:
+            _loads_cache[data] = rv
+        return rv
+
     @classmethod
     def from_config_string(self, s, bases=None, id=None):
         try:
@@ -312,9 +356,12 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None, cache=None):
+    def get_matching_frame_actions(
+        self, frames, platform, exception_data=None, cache=None, frame_indices=None
+    ):
         """Given a frame returns all the matching actions based on this rule.
-        If the rule does not match `None` is returned.
+        If the rule does not match `None` is returned. `frame_indices` limits
+        the frames that are checked, it must be in ascending order.
         """
         if not self.matchers:
             return []
@@ -326,8 +373,11 @@ class Rule:
 
         rv = []
 
+        if frame_indices is None:
+            frame_indices = range(len(frames))
+
         # 2 - Check if frame matchers match
-        for idx, frame in enumerate(frames):
+        for idx in frame_indices:
             if all(
                 m.matches_frame(frames, idx, platform, exception_data, cache)
                 for m in self._other_matchers
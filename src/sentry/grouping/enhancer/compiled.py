@@ -0,0 +1,134 @@
+"""
+Indexes enhancement rules so that a stack trace is only matched against the
+rules that can possibly apply to it.
+
+Every rule with a non-negated matcher on a frame field that enhancements never
+modify (function, module, package, path and family) gets one such matcher as
+its anchor. Anchors are evaluated once per distinct frame value, and function
+and module globs only for values that start with the literal prefix of the
+pattern. A rule is then evaluated against the frames matched by its anchor
+only, and rules without an anchor against all frames, which yields exactly
+the same actions in the same order as ``Rule.get_matching_frame_actions``.
+"""
+from collections import defaultdict
+
+from .matchers import (
+    CalleeMatch,
+    CallerMatch,
+    ExceptionFieldMatch,
+    FamilyMatch,
+    FunctionMatch,
+    ModuleMatch,
+    PathLikeMatch,
+)
+
+# Characters that end the literal prefix of a glob pattern.
+GLOB_SPECIAL_CHARS = b"*?[]{}\\!"
+
+
+def _get_literal_prefix(pattern):
+    for idx, char in enumerate(pattern):
+        if char in GLOB_SPECIAL_CHARS:
+            return pattern[:idx]
+    return pattern
+
+
+def _get_anchor_score(matcher):
+    if isinstance(matcher, (FunctionMatch, ModuleMatch)):
+        return 3 if _get_literal_prefix(matcher._encoded_pattern) else 1
+    if isinstance(matcher, PathLikeMatch):
+        return 2
+    if isinstance(matcher, FamilyMatch):
+        return 0
+    return None
+
+
+def _get_anchor(rule):
+    best_score = best_matcher = None
+    for matcher in rule.matchers:
+        if isinstance(matcher, (CallerMatch, CalleeMatch, ExceptionFieldMatch)):
+            continue
+        if matcher.negated:
+            continue
+        score = _get_anchor_score(matcher)
+        if score is not None and (best_score is None or score > best_score):
+            best_score, best_matcher = score, matcher
+    return best_matcher
+
+
+class CompiledRules:
+    def __init__(self, rules):
+        self.rules = [(rule, _get_anchor(rule)) for rule in rules if rule.matchers]
+
+        # field -> [(prefix length, {prefix: anchors})], by ascending length
+        self._prefixed_anchors = {}
+        # field -> anchors that have to be checked against every value
+        self._other_anchors = defaultdict(list)
+
+        prefixed_anchors = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        for anchor in {anchor for _, anchor in self.rules if anchor is not None}:
+            prefix = b""
+            if isinstance(anchor, (FunctionMatch, ModuleMatch)):
+                prefix = _get_literal_prefix(anchor._encoded_pattern)
+            if prefix:
+                prefixed_anchors[anchor.key][len(prefix)][prefix].append(anchor)
+            else:
+                self._other_anchors[anchor.key].append(anchor)
+
+        for field, by_length in prefixed_anchors.items():
+            self._prefixed_anchors[field] = sorted(
+                (length, dict(prefixes)) for length, prefixes in by_length.items()
+            )
+        self._fields = set(self._prefixed_anchors) | set(self._other_anchors)
+
+    def _match_anchors(self, match_frames, platform, exception_data, cache):
+        """Returns the indices of the frames matched by every anchor."""
+        rv = defaultdict(list)
+
+        for field in self._fields:
+            prefixed_anchors = self._prefixed_anchors.get(field, ())
+            other_anchors = self._other_anchors.get(field, ())
+            matches_by_value = {}
+
+            for idx, match_frame in enumerate(match_frames):
+                value = match_frame[field]
+                matches = matches_by_value.get(value)
+                if matches is None:
+                    candidates = list(other_anchors)
+                    if value is not None:
+                        for length, prefixes in prefixed_anchors:
+                            if len(value) < length:
+                                break
+                            candidates.extend(prefixes.get(value[:length], ()))
+                    matches = matches_by_value[value] = [
+                        anchor
+                        for anchor in candidates
+                        if anchor._positive_frame_match(
+                            match_frame, platform, exception_data, cache
+                        )
+                    ]
+
+                for anchor in matches:
+                    rv[anchor].append(idx)
+
+        return rv
+
+    def iter_matching_frame_actions(self, match_frames, platform, exception_data, cache):
+        """Yields every rule together with its matching frame actions, as
+        returned by ``Rule.get_matching_frame_actions``. The actions of a rule
+        are only computed once the actions of the previous rule have been
+        applied, so rules see the modifications of the rules before them.
+        """
+        anchor_frames = self._match_anchors(match_frames, platform, exception_data, cache)
+        all_frames = range(len(match_frames))
+
+        for rule, anchor in self.rules:
+            frame_indices = all_frames if anchor is None else anchor_frames.get(anchor)
+            if not frame_indices:
+                continue
+
+            actions = rule.get_matching_frame_actions(
+                match_frames, platform, exception_data, cache, frame_indices=frame_indices
+            )
+            if actions:
+                yield rule, actions
@@ -0,0 +1,186 @@
+"""
+Cache of the ``GroupHash`` rows looked up for every saved error event.
+
+A hash rarely changes its group once it has one, so rows that are attached to
+a group or a tombstone are cached in two tiers: an in-process LRU per thread
+and the shared default cache. Rows without a group and rows that are locked
+by an unmerge are never cached, since they are about to change.
+
+Both tiers are keyed by a per-project generation kept in the shared cache.
+Every code path that reassigns, tombstones, splits, locks or deletes
+grouphashes must call ``invalidate_grouphashes`` (or
+``invalidate_project_grouphashes``) once the change is done, which moves the
+project to a new generation. That reaches the local tier of every process,
+and rows read from Postgres before the change are stored under the old
+generation, where they are never read again.
+"""
+from __future__ import annotations
+
+from threading import local
+from typing import TYPE_CHECKING, Collection, MutableMapping, NamedTuple, Optional, Sequence
+from uuid import uuid4
+
+from cachetools import TTLCache
+
+from sentry import options
+from sentry.models import GroupHash
+from sentry.utils import metrics
+from sentry.utils.cache import cache
+
+if TYPE_CHECKING:
+    from sentry.models import Project
+
+
+class CachedGroupHash(NamedTuple):
+    id: int
+    group_id: Optional[int]
+    group_tombstone_id: Optional[int]
+    state: Optional[int]
+
+
+_local = local()
+
+# The generation key outlives the cached rows, should it get evicted anyway the
+# project just starts over with a new generation.
+GENERATION_TTL = 24 * 60 * 60
+
+
+def _get_local_cache() -> Optional[TTLCache]:
+    size = options.get("grouphash.local-cache-size")
+    if not size:
+        return None
+
+    # One LRU per thread, which keeps us clear of TTLCache not being
+    # thread-safe.
+    local_cache = getattr(_local, "cache", None)
+    if local_cache is None:
+        local_cache = _local.cache = TTLCache(size, options.get("grouphash.local-cache-ttl"))
+    return local_cache
+
+
+def _get_generation_key(project_id: int) -> str:
+    return f"grouphash-generation:{project_id}"
+
+
+def _get_generation(project_id: int) -> str:
+    key = _get_generation_key(project_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid4().hex, GENERATION_TTL)
+        generation = cache.get(key)
+    return generation
+
+
+def _get_cache_key(project_id: int, generation: str, hash: str) -> str:
+    return f"grouphash:{project_id}:{generation}:{hash}"
+
+
+def _is_cacheable(grouphash: GroupHash) -> bool:
+    return (
+        grouphash.group_id is not None or grouphash.group_tombstone_id is not None
+    ) and grouphash.state != GroupHash.State.LOCKED_IN_MIGRATION
+
+
+def _track_cache_lookup(tier: str, hits: int, misses: int) -> None:
+    if hits:
+        metrics.incr("grouphash.cache", amount=hits, tags={"tier": tier, "result": "hit"})
+    if misses:
+        metrics.incr("grouphash.cache", amount=misses, tags={"tier": tier, "result": "miss"})
+
+
+def get_grouphashes(project: Project, hashes: Sequence[str]) -> MutableMapping[str, GroupHash]:
+    """
+    Returns the existing ``GroupHash`` rows for `hashes`, keyed by hash.
+    Rows served from the cache are unsaved instances carrying the primary key
+    and the fields needed to find the group of an event, they must only be
+    used to read those fields or to filter by ``id``.
+    """
+    hashes = list(dict.fromkeys(hashes))
+    cached: dict[str, CachedGroupHash] = {}
+
+    local_cache = _get_local_cache()
+    cache_ttl = options.get("grouphash.cache-ttl")
+    if local_cache is None and not cache_ttl:
+        return {
+            grouphash.hash: grouphash
+            for grouphash in GroupHash.objects.filter(project=project, hash__in=hashes)
+        }
+
+    # The generation has to be read before the rows are, so that rows changed
+    # concurrently are cached under a generation that is already outdated.
+    generation = _get_generation(project.id)
+
+    if local_cache is not None:
+        for hash in hashes:
+            value = local_cache.get((project.id, generation, hash))
+            if value is not None:
+                cached[hash] = value
+        _track_cache_lookup("local", hits=len(cached), misses=len(hashes) - len(cached))
+
+    missing = [hash for hash in hashes if hash not in cached]
+    if cache_ttl and missing:
+        keys = {_get_cache_key(project.id, generation, hash): hash for hash in missing}
+        shared = {keys[key]: CachedGroupHash(*value) for key, value in cache.get_many(keys).items()}
+        _track_cache_lookup("shared", hits=len(shared), misses=len(missing) - len(shared))
+        if local_cache is not None:
+            for hash, value in shared.items():
+                local_cache[(project.id, generation, hash)] = value
+        cached.update(shared)
+        missing = [hash for hash in missing if hash not in shared]
+
+    grouphashes = {
+        hash: GroupHash(
+            id=value.id,
+            project=project,
+            hash=hash,
+            group_id=value.group_id,
+            group_tombstone_id=value.group_tombstone_id,
+            state=value.state,
+        )
+        for hash, value in cached.items()
+    }
+    if not missing:
+        return grouphashes
+
+    to_cache = {}
+    for grouphash in GroupHash.objects.filter(project=project, hash__in=missing):
+        grouphashes[grouphash.hash] = grouphash
+        if _is_cacheable(grouphash):
+            to_cache[grouphash.hash] = CachedGroupHash(
+                grouphash.id, grouphash.group_id, grouphash.group_tombstone_id, grouphash.state
+            )
+
+    if to_cache:
+        if local_cache is not None:
+            for hash, value in to_cache.items():
+                local_cache[(project.id, generation, hash)] = value
+        if cache_ttl:
+            cache.set_many(
+                {
+                    _get_cache_key(project.id, generation, hash): tuple(v)
+                    for hash, v in to_cache.items()
+                },
+                cache_ttl,
+            )
+
+    return grouphashes
+
+
+def invalidate_grouphashes(project_id: int, hashes: Collection[str]) -> None:
+    """
+    Invalidates the cached rows of `hashes`, along with all other cached
+    grouphashes of the project. Call this after the rows have been changed,
+    with the hashes collected before the change if it detaches them from
+    their group.
+    """
+    if not hashes:
+        return
+
+    invalidate_project_grouphashes(project_id)
+
+
+def invalidate_project_grouphashes(project_id: int) -> None:
+    """
+    Invalidates all cached grouphashes of a project, in every process.
+    """
+    cache.set(_get_generation_key(project_id), uuid4().hex, GENERATION_TTL)
@@ -1,6 +1,7 @@
 import sentry_sdk
 from symbolic import ProguardMapper, SourceView
 
+from sentry import options
 from sentry.lang.java.processing import deobfuscate_exception_value
 from sentry.lang.java.utils import (
     deobfuscate_view_hierarchy,
@@ -12,10 +13,18 @@ from sentry.lang.javascript.processor import get_source_context, trim_line
 from sentry.models import ArtifactBundleArchive, EventError, ProjectDebugFile
 from sentry.plugins.base.v2 import Plugin2
 from sentry.reprocessing import report_processing_issue
-from sentry.stacktraces.processing import StacktraceProcessor
+from sentry.stacktraces.processing import (
+    StacktraceProcessor,
+    compact_frame_result,
+    expand_frame_result,
+)
+from sentry.utils import metrics
 
 
 class JavaStacktraceProcessor(StacktraceProcessor):
+    # Frames are only remapped through the mapping views opened in preprocess_step.
+    supports_concurrent_processing = True
+
     def __init__(self, *args, **kwargs):
         StacktraceProcessor.__init__(self, *args, **kwargs)
 
@@ -131,6 +140,9 @@ class JavaStacktraceProcessor(StacktraceProcessor):
 # obfuscated by ProGuard or similar. It then tries to look up source context
 # for either the de-obfuscated stack frame or the stack frame that was passed in.
 class JavaSourceLookupStacktraceProcessor(StacktraceProcessor):
+    # Source context is only read from the archives opened in preprocess_step.
+    supports_concurrent_processing = True
+
     def __init__(self, *args, **kwargs):
         StacktraceProcessor.__init__(self, *args, **kwargs)
         self.proguard_processor = JavaStacktraceProcessor(*args, **kwargs)
@@ -139,6 +151,9 @@ class JavaSourceLookupStacktraceProcessor(StacktraceProcessor):
         self.images = get_jvm_images(self.data)
         self._archives = []
         self.available = len(self.images) > 0
+        # Whether all mapping files and source bundles of the event were found,
+        # only results computed with all of them are put into the frame cache.
+        self._frame_cache_complete = False
 
     def close(self):
         for archive in self._archives:
@@ -153,6 +168,24 @@ class JavaSourceLookupStacktraceProcessor(StacktraceProcessor):
         self._handles_frame = platform == "java" and self.available and "module" in frame
         return self._proguard_processor_handles_frame or self._handles_frame
 
+    def preprocess_frame(self, processable_frame):
+        if not options.get("processing.frame-result-cache-ttl"):
+            return
+
+        # Mapping files and source bundles never change for a debug id, so
+        # the result only depends on the frame and on which of them we use.
+        processable_frame.set_cache_key_from_values(
+            [
+                self.project.id,
+                self.data.get("platform"),
+                sorted(self.proguard_processor.images),
+                sorted(self.images),
+                self._proguard_processor_handles_frame,
+                self._handles_frame,
+                processable_frame.frame,
+            ]
+        )
+
     def preprocess_step(self, processing_task):
         proguard_processor_preprocess_rv = False
         if self._proguard_processor_handles_frame:
@@ -161,8 +194,16 @@ class JavaSourceLookupStacktraceProcessor(StacktraceProcessor):
             )
 
         if not self.available:
+            self._frame_cache_complete = self._has_all_debug_files()
             return proguard_processor_preprocess_rv
 
+        # Source bundles are only needed for frames missing from the frame cache.
+        if all(
+            processable_frame.cache_value is not None
+            for processable_frame in processing_task.iter_processable_frames(self)
+        ):
+            return True
+
         difs = ProjectDebugFile.objects.find_by_debug_ids(self.project, self.images)
         for key, dif in difs.items():
             try:
@@ -171,8 +212,16 @@ class JavaSourceLookupStacktraceProcessor(StacktraceProcessor):
             except Exception:
                 pass
 
+        self._frame_cache_complete = self._has_all_debug_files()
         return proguard_processor_preprocess_rv or self.available
 
+    def _has_all_debug_files(self):
+        if len(self._archives) != len(self.images):
+            return False
+        if not self._proguard_processor_handles_frame:
+            return True
+        return len(self.proguard_processor.mapping_views) == len(self.proguard_processor.images)
+
     def process_exception(self, exception):
         if self._proguard_processor_handles_frame:
             return self.proguard_processor.process_exception(exception)
@@ -217,6 +266,25 @@ class JavaSourceLookupStacktraceProcessor(StacktraceProcessor):
         return "~/" + source_file_name
 
     def process_frame(self, processable_frame, processing_task):
+        if processable_frame.cache_key is not None:
+            cache_hit = processable_frame.cache_value is not None
+            metrics.incr(
+                "proguard.frame_cache",
+                tags={"result": "hit" if cache_hit else "miss"},
+                skip_internal=True,
+            )
+            if cache_hit:
+                return expand_frame_result(processable_frame.frame, processable_frame.cache_value)
+
+        rv = self._process_frame(processable_frame, processing_task)
+        if self._frame_cache_complete:
+            processable_frame.set_cache_value(
+                compact_frame_result(processable_frame.frame, rv),
+                options.get("processing.frame-result-cache-ttl"),
+            )
+        return rv
+
+    def _process_frame(self, processable_frame, processing_task):
         new_frames = None
         raw_frames = None
         processing_errors = None
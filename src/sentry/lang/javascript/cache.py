@@ -1,8 +1,13 @@
+from hashlib import sha1
+
+from symbolic import SourceMapCache as SmCache
 from symbolic import SourceView
 
+from sentry.utils import metrics
+from sentry.utils.lru import OptionSizedLRUCache
 from sentry.utils.strings import codec_lookup
 
-__all__ = ["SourceCache", "SourceMapCache"]
+__all__ = ["SourceCache", "SourceMapCache", "get_or_build_sourcemap_cache"]
 
 
 def is_utf8(codec):
@@ -90,3 +95,34 @@ class SourceMapCache:
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+# Parsed sourcemaps shared by all events processed in this process, keyed by
+# the hashes of their inputs and bounded by the size of those inputs.
+_sourcemap_caches = OptionSizedLRUCache(
+    "processing.sourcemap-cache-size", getsizeof=lambda value: value[1]
+)
+
+
+def get_or_build_sourcemap_cache(source, sourcemap):
+    """
+    Returns the ``SmCache`` for the given minified source and sourcemap.
+    Building it is by far the most expensive step of sourcemap processing,
+    so it is only done once per process for the same inputs.
+    """
+    if not _sourcemap_caches.enabled():
+        return SmCache.from_bytes(source, sourcemap)
+
+    cache_key = (sha1(source).hexdigest(), sha1(sourcemap).hexdigest())
+    value = _sourcemap_caches.get(cache_key)
+    metrics.incr(
+        "sourcemaps.parsed_cache",
+        tags={"result": "miss" if value is None else "hit"},
+        skip_internal=True,
+    )
+    if value is not None:
+        return value[0]
+
+    sourcemap_cache = SmCache.from_bytes(source, sourcemap)
+    _sourcemap_caches.set(cache_key, (sourcemap_cache, len(source) + len(sourcemap)))
+    return sourcemap_cache
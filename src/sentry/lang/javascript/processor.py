@@ -5,7 +5,9 @@ import logging
 import re
 import sys
 import time
+import uuid
 import zlib
+from collections import namedtuple
 from datetime import datetime
 from enum import Enum
 from io import BytesIO
@@ -19,11 +21,11 @@ from django.conf import settings
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 from requests.utils import get_encoding_from_headers
-from symbolic import SourceMapCache as SmCache
 from symbolic import SourceView
 
 from sentry import features, http, options
 from sentry.event_manager import set_tag
+from sentry.lang.javascript.cache import get_or_build_sourcemap_cache
 from sentry.models import (
     NULL_STRING,
     ArtifactBundle,
@@ -33,8 +35,17 @@ from sentry.models import (
     ReleaseFile,
     SourceFileType,
 )
+from sentry.models.artifactbundle import (
+    IndexedArtifactBundleArchive,
+    cache_artifact_bundle_index,
+    get_artifact_bundle_indexes,
+)
 from sentry.models.releasefile import ARTIFACT_INDEX_FILENAME, ReleaseArchive, read_artifact_index
-from sentry.stacktraces.processing import StacktraceProcessor
+from sentry.stacktraces.processing import (
+    StacktraceProcessor,
+    compact_frame_result,
+    expand_frame_result,
+)
 from sentry.utils import json, metrics
 
 # separate from either the source cache or the source maps cache, this is for
@@ -87,6 +98,14 @@ MAX_RESOURCE_FETCHES = 100
 
 CACHE_MAX_VALUE_SIZE = settings.SENTRY_CACHE_MAX_VALUE_SIZE
 
+# How long the generation of the frame cache of a release is kept.  Losing it
+# only drops the cached frames of the release.
+FRAME_CACHE_GENERATION_TTL = 86400
+
+# Stands in for the token of a frame restored from the frame cache, which only
+# needs to provide the name used by `get_function_for_token` for the next frame.
+CachedToken = namedtuple("CachedToken", ["name"])
+
 logger = logging.getLogger(__name__)
 
 
@@ -210,6 +229,33 @@ def get_artifact_bundle_cache_key(artifact_bundle_id):
     return f"artifactbundle:v1:{artifact_bundle_id}"
 
 
+def get_frame_cache_generation_key(organization_id, release):
+    return f"jsframes:generation:{organization_id}:{md5_text(release).hexdigest()}"
+
+
+def get_frame_cache_generation(organization_id, release):
+    """
+    Returns the generation that is part of the frame cache keys of all events
+    in the given release.
+    """
+    cache_key = get_frame_cache_generation_key(organization_id, release)
+    generation = cache.get(cache_key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(cache_key, generation, FRAME_CACHE_GENERATION_TTL):
+            generation = cache.get(cache_key) or generation
+    return generation
+
+
+def invalidate_frame_cache(organization_id, release):
+    """
+    Drops the cached frames of all events in the given release by starting a
+    new generation.  This needs to happen whenever artifacts of the release
+    are uploaded, replaced or deleted.
+    """
+    cache.delete(get_frame_cache_generation_key(organization_id, release))
+
+
 MAX_FETCH_ATTEMPTS = 3
 
 
@@ -779,6 +825,20 @@ class Fetcher:
         artifact_bundle_file.seek(0)
         return artifact_bundle_file
 
+    @staticmethod
+    def _index_artifact_bundle(artifact_bundle_id, archive, artifact_bundle_file):
+        """
+        Stores the index of a bundle that was uploaded before bundles were indexed, or whose index was evicted.
+        """
+        # Only bundles loaded from the cache are held in memory, indexing others could fetch the whole file.
+        if not isinstance(artifact_bundle_file, BytesIO):
+            return
+
+        try:
+            cache_artifact_bundle_index(artifact_bundle_id, archive)
+        except Exception as exc:
+            logger.debug("Failed to index artifact bundle %s", artifact_bundle_id, exc_info=exc)
+
     def _open_artifact_bundle_archive(self, debug_id, source_file_type):
         """
         Opens an ArtifactBundle as a .zip file and returns an ArtifactBundleArchive object that allows the caller
@@ -821,6 +881,13 @@ class Fetcher:
 
                 return cached_open_archive
 
+            # If the bundle was indexed we can read single files from it without fetching the whole bundle.
+            index = get_artifact_bundle_indexes([artifact_bundle_id]).get(artifact_bundle_id)
+            if index is not None:
+                archive = IndexedArtifactBundleArchive(artifact_bundle.file, index)
+                self.open_archives[artifact_bundle_id] = archive
+                return archive
+
             # In case the local cache doesn't have the archive, we will try to load it from memcached and then directly
             # from the source.
             artifact_bundle_file = self._fetch_artifact_bundle_file(artifact_bundle)
@@ -843,6 +910,7 @@ class Fetcher:
                 # archive is closed before the processing ends.
                 archive = ArtifactBundleArchive(artifact_bundle_file)
                 self.open_archives[artifact_bundle_id] = archive
+                self._index_artifact_bundle(artifact_bundle_id, archive, artifact_bundle_file)
             except Exception as exc:
                 artifact_bundle_file.seek(0)
                 logger.debug(
@@ -964,6 +1032,13 @@ class Fetcher:
                 return cached_open_archive
 
             artifact_bundles = self._get_artifact_bundle_entries_by_release_dist_pair()
+            indexes = get_artifact_bundle_indexes(
+                [
+                    artifact_bundle.id
+                    for artifact_bundle in artifact_bundles
+                    if artifact_bundle.id not in self.open_archives
+                ]
+            )
             for artifact_bundle in artifact_bundles:
                 cached_open_archive = self.open_archives.get(artifact_bundle.id)
 
@@ -976,6 +1051,14 @@ class Fetcher:
                 if cached_open_archive is not None:
                     return cached_open_archive
 
+                # Indexed bundles are only fetched partially once we read a file from them.
+                index = indexes.get(artifact_bundle.id)
+                if index is not None:
+                    self.open_archives[artifact_bundle.id] = IndexedArtifactBundleArchive(
+                        artifact_bundle.file, index
+                    )
+                    continue
+
                 try:
                     # In case we didn't find the archive in the cache, we want to fetch the artifact bundle to put later
                     # in the cache.
@@ -1012,6 +1095,7 @@ class Fetcher:
                 try:
                     archive = ArtifactBundleArchive(artifact_bundle_file)
                     self.open_archives[artifact_bundle_id] = archive
+                    self._index_artifact_bundle(artifact_bundle_id, archive, artifact_bundle_file)
                 except Exception as exc:
                     artifact_bundle_file.seek(0)
                     logger.debug(
@@ -1351,6 +1435,9 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         # Contains a mapping between the debug id and the sourcemap url resolved with that debug id.
         self.sourcemap_debug_id_to_sourcemap_url = {}
 
+        # The values all frame cache keys of this event start with, see `preprocess_frame`.
+        self._frame_cache_values = None
+
         # Component responsible for fetching the files.
         self.fetcher = Fetcher(
             organization=self.organization,
@@ -1401,6 +1488,15 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         ):
             self.build_abs_path_debug_id_cache()
 
+        # Frames restored from the frame cache do not need their sources.
+        cached_frames = {
+            id(processable_frame.frame)
+            for processable_frame in processing_task.iter_processable_frames(self)
+            if processable_frame.cache_value is not None
+        }
+        if cached_frames:
+            frames = [frame for frame in frames if id(frame) not in cached_frames]
+
         with sentry_sdk.start_span(
             op="JavaScriptStacktraceProcessor.preprocess_step.populate_source_cache"
         ):
@@ -1417,10 +1513,78 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         # frames for function name resolution by call site.
         processable_frame.data = {"token": None}
 
+        cache_values = self._get_frame_cache_values()
+        if cache_values is None:
+            return
+
+        # The result of a frame depends on the whole frame and on the token of
+        # the frame before it, see `get_function_for_token`.
+        frame = processable_frame.frame
+        debug_id = self.abs_path_debug_id.get(frame.get("abs_path"))
+        # Without a release or debug id all sources are scraped, and there is
+        # nothing that would invalidate their cached frames.
+        if debug_id is None and not self.data.get("release"):
+            return
+
+        previous_frame = processable_frame.previous_frame
+        if previous_frame is not None:
+            previous_frame = [
+                self.abs_path_debug_id.get(previous_frame.get("abs_path")),
+                previous_frame.get("abs_path"),
+                previous_frame.get("lineno"),
+                previous_frame.get("colno"),
+            ]
+        processable_frame.set_cache_key_from_values(
+            cache_values + [debug_id, frame, previous_frame]
+        )
+
+    def _get_frame_cache_values(self):
+        """
+        Returns the values shared by the frame cache keys of this event, or
+        `None` if the frame cache is disabled.
+        """
+        if not options.get("processing.frame-result-cache-ttl"):
+            return None
+
+        if self._frame_cache_values is None:
+            # `preprocess_frame` runs before `preprocess_step`.
+            self.build_abs_path_debug_id_cache()
+
+            release = self.data.get("release")
+            dist = self.data.get("dist")
+            generation = None
+            if release:
+                generation = get_frame_cache_generation(self.organization.id, release)
+            self._frame_cache_values = [
+                self.project.id,
+                self.data.get("platform"),
+                release,
+                dist,
+                generation,
+            ]
+        return self._frame_cache_values
+
+    def _process_cached_frame(self, processable_frame):
+        value, token_name = processable_frame.cache_value
+        processable_frame.data["token"] = CachedToken(token_name)
+        new_frames, raw_frames, errors = expand_frame_result(processable_frame.frame, value)
+        self.tag_suspected_console_errors(new_frames)
+        return new_frames, raw_frames, errors
+
     def process_frame(self, processable_frame, processing_task):
         """
         Attempt to demangle the given frame.
         """
+        if processable_frame.cache_key is not None:
+            cache_hit = processable_frame.cache_value is not None
+            metrics.incr(
+                "sourcemaps.frame_cache",
+                tags={"result": "hit" if cache_hit else "miss"},
+                skip_internal=True,
+            )
+            if cache_hit:
+                return self._process_cached_frame(processable_frame)
+
         frame = processable_frame.frame
 
         all_errors = []
@@ -1665,6 +1829,15 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
             new_frames = [new_frame]
             raw_frames = [raw_frame] if changed_raw else None
 
+            # Only results without any errors are cached, so that uploading a
+            # missing artifact takes effect right away.
+            token = processable_frame.data["token"]
+            if sourcemap_applied and not all_errors and token is not None:
+                processable_frame.set_cache_value(
+                    (compact_frame_result(frame, (new_frames, raw_frames, None)), token.name),
+                    options.get("processing.frame-result-cache-ttl"),
+                )
+
             try:
                 if features.has(
                     "organizations:javascript-console-error-tag", self.organization, actor=None
@@ -1916,7 +2089,7 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                     # We want to keep track of the sourcemap url of the sourcemap resolved with this specific debug id.
                     self.sourcemap_debug_id_to_sourcemap_url[debug_id] = result.url
                     # This is an expensive operation that should be executed as few times as possible.
-                    return SmCache.from_bytes(
+                    return get_or_build_sourcemap_cache(
                         minified_sourceview.get_source().encode("utf-8"), result.body
                     )
             except Exception as exc:
@@ -2007,7 +2180,7 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 op="JavaScriptStacktraceProcessor.fetch_sourcemap_view_by_url.SmCache.from_bytes"
             ):
                 # This is an expensive operation that should be executed as few times as possible.
-                return SmCache.from_bytes(source, body)
+                return get_or_build_sourcemap_cache(source, body)
         except Exception as exc:
             # This is in debug because the product shows an error already.
             logger.debug(str(exc), exc_info=True)
@@ -20,9 +20,15 @@ from sentry.lang.native.sources import (
 from sentry.models import Project
 from sentry.net.http import Session
 from sentry.utils import json, metrics
+from sentry.utils.cache import cache
+from sentry.utils.hashlib import md5_text
 
 MAX_ATTEMPTS = 3
 REQUEST_CACHE_TIMEOUT = 3600
+BATCH_CACHE_TIMEOUT = 600
+
+# Result of a batch for members that have to send their own request.
+BATCH_FALLBACK = "fallback"
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +37,10 @@ def _task_id_cache_key_for_event(project_id, event_id):
     return f"symbolicator:{event_id}:{project_id}"
 
 
+def _batch_member_cache_key_for_event(project_id, event_id):
+    return f"symbolicator:batch-member:{event_id}:{project_id}"
+
+
 @dataclass(frozen=True)
 class SymbolicatorTaskKind:
     is_js: bool = False
@@ -65,6 +75,7 @@ class Symbolicator:
         assert base_url
 
         self.project = project
+        self.event_id = event_id
         self.sess = SymbolicatorSession(
             url=base_url,
             project_id=str(project.id),
@@ -158,9 +169,27 @@ class Symbolicator:
         if signal:
             json["signal"] = signal
 
-        res = self._process("symbolicate_stacktraces", "symbolicate", json=json)
+        batch_window = options.get("symbolicator.batch-window")
+        if batch_window > 0:
+            res = self._process_batched(json, batch_window)
+        else:
+            res = self._process("symbolicate_stacktraces", "symbolicate", json=json)
         return process_response(res)
 
+    def _process_batched(self, payload, window):
+        batch = SymbolicatorBatch.join(self, payload, window)
+        if batch is None:
+            return self._process("symbolicate_stacktraces", "symbolicate", json=payload)
+        if batch.index is None:
+            # This event gave up on its batch before, it keeps polling its own
+            # request until that is done.
+            res = self._process("symbolicate_stacktraces", "symbolicate", json=payload)
+            batch.leave()
+            return res
+        if batch.index == 1:
+            return batch.send(self, payload)
+        return batch.wait(self, payload)
+
     def process_js(self, stacktraces, modules, release, dist, allow_scraping=True):
         source = get_internal_artifact_lookup_source(self.project)
 
@@ -179,6 +208,169 @@ class Symbolicator:
         return self._process("symbolicate_js_stacktraces", "symbolicate-js", json=json)
 
 
+class SymbolicatorBatch:
+    """
+    Sends the ``symbolicate`` requests of the events of a project that arrive
+    within the same time window as one request, which saves Symbolicator from
+    loading the same modules over and over during crash spikes.
+
+    Only events with the same modules, signal and sources end up in the same
+    batch, since those apply to all stacktraces of a request. Identical
+    stacktraces are sent only once and their result is handed to every event
+    that has them.
+
+    The first event to join a batch becomes its leader. It waits for the
+    window to close, sends the stacktraces of all members and stores the
+    result of each member in the cache. The other members poll the cache for
+    their result. Waiting happens by raising ``RetrySymbolication`` like for
+    pending Symbolicator requests, so the symbolication task loop does the
+    sleeping. Members that do not get a result in time, or for which the
+    batch failed, send their own request instead.
+    """
+
+    def __init__(self, member_key, key=None, index=None, deadline=None):
+        self.member_key = member_key
+        self.key = key
+        self.index = index
+        self.deadline = deadline
+
+    @classmethod
+    def join(cls, symbolicator, payload, window):
+        project_id = symbolicator.project.id
+        member_key = _batch_member_cache_key_for_event(project_id, symbolicator.event_id)
+        member = cache.get(member_key)
+        if member is not None:
+            return cls(member_key, *member)
+
+        group = md5_text(
+            symbolicator.sess.url,
+            json.dumps({k: v for k, v in payload.items() if k != "stacktraces"}),
+        ).hexdigest()
+        slot = int(time.time() / window)
+        key = f"symbolicator:batch:{project_id}:{group}:{slot}"
+
+        cache.add(f"{key}:members", 0, BATCH_CACHE_TIMEOUT)
+        try:
+            index = cache.incr(f"{key}:members")
+        except ValueError:
+            # The counter got evicted right away, we are better off alone.
+            return None
+
+        deadline = (slot + 1) * window
+        cache.set_many(
+            {
+                f"{key}:request:{index}": payload["stacktraces"],
+                member_key: (key, index, deadline),
+            },
+            BATCH_CACHE_TIMEOUT,
+        )
+        return cls(member_key, key, index, deadline)
+
+    def leave(self):
+        cache.delete(self.member_key)
+
+    def fall_back(self, symbolicator, payload, reason):
+        metrics.incr("events.symbolicator.batch.fallback", tags={"reason": reason})
+        cache.set(self.member_key, (None, None, None), BATCH_CACHE_TIMEOUT)
+        self.index = None
+        res = symbolicator._process("symbolicate_stacktraces", "symbolicate", json=payload)
+        self.leave()
+        return res
+
+    def send(self, symbolicator, payload):
+        # Give members that joined right before the window closed the time to
+        # store their request.
+        window = options.get("symbolicator.batch-window")
+        remaining = self.deadline + window - time.time()
+        if remaining > 0:
+            raise RetrySymbolication(retry_after=remaining)
+
+        # The members are fixed once the leader sends the first request, so the
+        # request stays the same when it has to be sent again.
+        members = cache.get(f"{self.key}:sent")
+        if members is None:
+            size = cache.get(f"{self.key}:members") or 1
+            request_keys = [f"{self.key}:request:{index}" for index in range(1, size + 1)]
+            requests = cache.get_many(request_keys)
+            members = [index for index, k in enumerate(request_keys, 1) if k in requests]
+            cache.set(f"{self.key}:sent", members, BATCH_CACHE_TIMEOUT)
+        else:
+            requests = cache.get_many([f"{self.key}:request:{index}" for index in members])
+
+        stacktraces = []
+        positions = {}
+        positions_by_member = {}
+        for index in members:
+            positions_by_member[index] = []
+            for stacktrace in requests.get(f"{self.key}:request:{index}") or ():
+                stacktrace_key = md5_text(json.dumps(stacktrace)).hexdigest()
+                if stacktrace_key not in positions:
+                    positions[stacktrace_key] = len(stacktraces)
+                    stacktraces.append(stacktrace)
+                positions_by_member[index].append(positions[stacktrace_key])
+
+        if self.index not in positions_by_member:
+            # Our own request got evicted, which most likely happened to the
+            # whole batch.
+            return self.fall_back(symbolicator, payload, "evicted")
+
+        batch_payload = dict(payload, stacktraces=stacktraces)
+        try:
+            res = symbolicator._process(
+                "symbolicate_stacktraces", "symbolicate", json=batch_payload
+            )
+        except RetrySymbolication:
+            raise
+        except Exception:
+            self._store_results({index: BATCH_FALLBACK for index in members})
+            self.leave()
+            raise
+
+        metrics.timing("events.symbolicator.batch.size", len(members))
+        metrics.timing("events.symbolicator.batch.stacktraces", len(stacktraces))
+
+        if res.get("status") == "completed":
+            results = {
+                index: dict(res, stacktraces=[res["stacktraces"][p] for p in member_positions])
+                for index, member_positions in positions_by_member.items()
+            }
+        else:
+            results = {index: BATCH_FALLBACK for index in members}
+            results[self.index] = res
+
+        self._store_results(results)
+        self.leave()
+        return results[self.index]
+
+    def _store_results(self, results):
+        cache.set_many(
+            {
+                f"{self.key}:result:{index}": result
+                for index, result in results.items()
+                if index != self.index
+            },
+            BATCH_CACHE_TIMEOUT,
+        )
+
+    def wait(self, symbolicator, payload):
+        result = cache.get(f"{self.key}:result:{self.index}")
+        if result == BATCH_FALLBACK:
+            return self.fall_back(symbolicator, payload, "failed")
+
+        if result is None:
+            members = cache.get(f"{self.key}:sent")
+            if members is not None and self.index not in members:
+                return self.fall_back(symbolicator, payload, "late")
+            timeout = options.get("symbolicator.batch-timeout")
+            if time.time() > self.deadline + timeout:
+                return self.fall_back(symbolicator, payload, "timeout")
+            raise RetrySymbolication(retry_after=options.get("symbolicator.batch-window"))
+
+        cache.delete(f"{self.key}:result:{self.index}")
+        self.leave()
+        return result
+
+
 class TaskIdNotFound(Exception):
     pass
 
@@ -1,5 +1,8 @@
+import struct
 import zipfile
+import zlib
 from enum import Enum
+from io import BytesIO
 from typing import IO, Callable, Dict, List, Optional, Tuple
 
 from django.db import models
@@ -7,6 +10,7 @@ from django.db.models.signals import post_delete
 from django.utils import timezone
 from symbolic import SymbolicError, normalize_debug_id
 
+from sentry import options
 from sentry.db.models import (
     BoundedBigIntegerField,
     BoundedPositiveIntegerField,
@@ -15,10 +19,15 @@ from sentry.db.models import (
     region_silo_only_model,
 )
 from sentry.utils import json
+from sentry.utils.cache import cache
 
 NULL_UUID = "00000000-00000000-00000000-00000000"
 NULL_STRING = ""
 
+# Size of the fixed part of a local file header in a zip archive, which is followed
+# by the file name and the extra field before the data of the file.
+ZIP_LOCAL_HEADER_SIZE = 30
+
 
 class SourceFileType(Enum):
     SOURCE = 1
@@ -149,6 +158,9 @@ class ArtifactBundleArchive:
         self._zip_file.close()
         self._fileobj.close()
 
+    def _open(self, file_path: str) -> IO:
+        return self._zip_file.open(file_path)
+
     def info(self, filename: str) -> zipfile.ZipInfo:
         return self._zip_file.getinfo(filename)
 
@@ -202,18 +214,18 @@ class ArtifactBundleArchive:
 
     def get_file_by_url(self, url: str) -> Tuple[IO, dict]:
         file_path, info = self._entries_by_url[url]
-        return self._zip_file.open(file_path), info.get("headers", {})
+        return self._open(file_path), info.get("headers", {})
 
     def get_file_by_debug_id(
         self, debug_id: str, source_file_type: SourceFileType
     ) -> Tuple[IO, dict]:
         file_path, _, info = self._entries_by_debug_id[debug_id, source_file_type]
-        return self._zip_file.open(file_path), info.get("headers", {})
+        return self._open(file_path), info.get("headers", {})
 
     def get_file(self, file_path: str) -> Tuple[IO, dict]:
         files = self.manifest.get("files", {})
         file_info = files.get(file_path, {})
-        return self._zip_file.open(file_path), file_info.get("headers", {})
+        return self._open(file_path), file_info.get("headers", {})
 
     def get_files_by(self, block: Callable[[str, dict], bool]) -> Dict[str, dict]:
         files = self.manifest.get("files", {})
@@ -272,3 +284,123 @@ class ArtifactBundleArchive:
         files = self.manifest.get("files", {})
         file_info = files.get(file_path, {})
         return file_info.get("url")
+
+    def build_index(self) -> Optional[dict]:
+        """
+        Returns the manifest of the bundle together with the position of every
+        file within the zip archive, which allows `IndexedArtifactBundleArchive`
+        to read single files without opening the archive.
+
+        Returns `None` if a file is stored in a way that requires the archive.
+        """
+        files = {}
+        for file_path in self.manifest.get("files", {}):
+            info = self.get_file_info(file_path)
+            if info is None:
+                continue
+            if info.flag_bits & 0x1 or info.compress_type not in (
+                zipfile.ZIP_STORED,
+                zipfile.ZIP_DEFLATED,
+            ):
+                return None
+
+            # The local header can have a different extra field than the central
+            # directory, so the offset of the data has to be read from it.
+            self._fileobj.seek(info.header_offset)
+            header = self._fileobj.read(ZIP_LOCAL_HEADER_SIZE)
+            name_length, extra_length = struct.unpack("<HH", header[26:30])
+            files[file_path] = (
+                info.header_offset + ZIP_LOCAL_HEADER_SIZE + name_length + extra_length,
+                info.compress_size,
+                info.compress_type,
+                info.file_size,
+                info.CRC,
+            )
+
+        return {"manifest": self.manifest, "files": files}
+
+
+class IndexedArtifactBundleArchive(ArtifactBundleArchive):
+    """
+    Read-only view of an uploaded artifact bundle that reads files directly at
+    the positions stored in an index built by `ArtifactBundleArchive.build_index`.
+
+    The bundle file is only opened once a file is read, and only the parts of
+    the bundle that hold that file are fetched.
+    """
+
+    def __init__(self, file, index: dict):
+        self._file = file
+        self._fileobj = None
+        self._files = index["files"]
+        self.manifest = index["manifest"]
+        self._build_memory_maps()
+
+    def close(self):
+        if self._fileobj is not None:
+            self._fileobj.close()
+
+    def _open(self, file_path: str) -> IO:
+        offset, compressed_size, compress_type, _, _ = self._files[file_path]
+        if self._fileobj is None:
+            self._fileobj = self._file.getfile()
+
+        self._fileobj.seek(offset)
+        data = self._fileobj.read(compressed_size)
+        if compress_type == zipfile.ZIP_DEFLATED:
+            data = zlib.decompress(data, -zlib.MAX_WBITS)
+        return BytesIO(data)
+
+    def read(self, filename: str) -> bytes:
+        return self._open(filename).read()
+
+    def info(self, filename: str) -> zipfile.ZipInfo:
+        try:
+            _, compressed_size, compress_type, file_size, crc = self._files[filename]
+        except KeyError:
+            raise KeyError(f"There is no item named {filename!r} in the archive")
+
+        info = zipfile.ZipInfo(filename)
+        info.compress_size = compressed_size
+        info.compress_type = compress_type
+        info.file_size = file_size
+        info.CRC = crc
+        return info
+
+    def get_file_info(self, file_path: Optional[str]) -> Optional[zipfile.ZipInfo]:
+        try:
+            return self.info(file_path)
+        except KeyError:
+            return None
+
+    def build_index(self) -> Optional[dict]:
+        return {"manifest": self.manifest, "files": self._files}
+
+
+def get_artifact_bundle_index_cache_key(artifact_bundle_id: int) -> str:
+    return f"artifactbundle-index:v2:{artifact_bundle_id}"
+
+
+def cache_artifact_bundle_index(artifact_bundle_id: int, archive: ArtifactBundleArchive) -> None:
+    """
+    Stores the index of an artifact bundle for `get_artifact_bundle_indexes`.
+    """
+    timeout = options.get("processing.artifact-bundle-index-ttl")
+    if not timeout:
+        return
+
+    index = archive.build_index()
+    if index is not None:
+        cache.set(get_artifact_bundle_index_cache_key(artifact_bundle_id), index, timeout)
+
+
+def get_artifact_bundle_indexes(artifact_bundle_ids: List[int]) -> Dict[int, dict]:
+    """
+    Returns the stored indexes of the given artifact bundles by id. Bundles
+    without an index have to be opened as `ArtifactBundleArchive`.
+    """
+    if not artifact_bundle_ids or not options.get("processing.artifact-bundle-index-ttl"):
+        return {}
+
+    keys = {get_artifact_bundle_index_cache_key(id): id for id in artifact_bundle_ids}
+    return {keys[key]: index for key, index in cache.get_many(list(keys)).items()}
@@ -20,6 +20,7 @@ ISSUE_OWNERS_DEBOUNCE_DURATION = 60 * 60 * 24
 ASSIGNEE_EXISTS_KEY = lambda group_id: f"assignee_exists:1:{group_id}"
 ASSIGNEE_EXISTS_DURATION = 60 * 60 * 24
 ASSIGNEE_DOES_NOT_EXIST_DURATION = 60
+AUTO_ASSIGNMENT_DEBOUNCE_KEY = lambda group_id: f"auto_assignment_debounce:1:{group_id}"
 
 
 class GroupOwnerType(Enum):
@@ -163,6 +164,7 @@ class GroupOwner(Model):
             if not group_ids:
                 break
             cache_keys = [ISSUE_OWNERS_DEBOUNCE_KEY(group_id) for group_id in group_ids]
+            cache_keys += [AUTO_ASSIGNMENT_DEBOUNCE_KEY(group_id) for group_id in group_ids]
             cache.delete_many(cache_keys)
 
     @classmethod
@@ -181,6 +183,7 @@ class GroupOwner(Model):
             if not group_ids:
                 break
             cache_keys = [ASSIGNEE_EXISTS_KEY(group_id) for group_id in group_ids]
+            cache_keys += [AUTO_ASSIGNMENT_DEBOUNCE_KEY(group_id) for group_id in group_ids]
             cache.delete_many(cache_keys)
 
 
@@ -11,6 +11,7 @@ from sentry.db.models.fields import FlexibleForeignKey, JSONField
 from sentry.models import Activity, ActorTuple
 from sentry.models.groupowner import OwnerRuleType
 from sentry.models.project import Project
+from sentry.ownership.compiled import get_compiled_schema
 from sentry.ownership.grammar import Rule, load_schema, resolve_actors
 from sentry.types.activity import ActivityType
 from sentry.utils import metrics
@@ -346,6 +347,10 @@ class ProjectOwnership(Model):
         rules = []
 
         if ownership.schema is not None:
+            compiled_schema = get_compiled_schema(ownership.project_id, ownership.schema)
+            if compiled_schema is not None:
+                return compiled_schema.get_matching_rules(data)
+
             for rule in load_schema(ownership.schema):
                 if rule.test(data):
                     rules.append(rule)
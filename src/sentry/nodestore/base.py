@@ -1,10 +1,15 @@
+import struct
 from threading import local
 
 import sentry_sdk
+from cachetools import TTLCache
+from django.conf import settings
 from django.core.cache import InvalidCacheBackendError, caches
 
-from sentry.utils import json
+from sentry import options
+from sentry.utils import json, metrics
 from sentry.utils.cache import memoize
+from sentry.utils.imports import import_string
 from sentry.utils.services import Service
 
 # Cache an instance of the encoder we want to use
@@ -22,6 +27,13 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json._default_decoder.decode
 
+# Payloads in the segmented layout start with this header, followed by one
+# segment per subkey: a `SEGMENT_PREFIX` with the key and value lengths, the
+# ASCII key (empty for the main payload) and the codec-encoded JSON value. The
+# header can't be mistaken for JSON, a pickle or a zstd frame.
+SEGMENTS_HEADER = b"\x00ns\x01"
+SEGMENT_PREFIX = struct.Struct("<HI")
+
 
 class NodeStorage(local, Service):
     """
@@ -56,6 +68,11 @@ class NodeStorage(local, Service):
 
     This is used in reprocessing to store a snapshot of the event from multiple
     stages of the pipeline.
+
+    Reads of the main payload are cached in two tiers: an optional, size
+    bounded in-process LRU (see the ``nodedata.local-cache-*`` options) in
+    front of the shared ``nodedata`` Django cache. Both tiers are updated on
+    writes and invalidated on deletes.
     """
 
     __all__ = (
@@ -92,6 +109,38 @@ class NodeStorage(local, Service):
         if value is None:
             return None
 
+        if value.startswith(SEGMENTS_HEADER):
+            return self._decode_segment(value, subkey=subkey)
+
+        return self._decode_payload(self.codec.decode(value), subkey=subkey)
+
+    def _decode_segment(self, value, subkey):
+        """
+        Decode a single subkey from a payload in the segmented layout, skipping
+        over all other segments without decoding them.
+        """
+        key = subkey.encode("ascii") if subkey is not None else b""
+        for segment_key, segment in self._iter_segments(value):
+            if segment_key == key:
+                return json_loads(self.codec.decode(segment.tobytes()))
+        return None
+
+    def _iter_segments(self, value):
+        """
+        Yield the key (empty for the main payload) and the still encoded value
+        of every segment of a payload in the segmented layout.
+        """
+        view = memoryview(value)
+        offset = len(SEGMENTS_HEADER)
+        while offset < len(view):
+            key_length, value_length = SEGMENT_PREFIX.unpack_from(view, offset)
+            offset += SEGMENT_PREFIX.size
+            key = view[offset : offset + key_length]
+            offset += key_length
+            yield key, view[offset : offset + value_length]
+            offset += value_length
+
+    def _decode_payload(self, value, subkey):
         lines_iter = iter(value.splitlines())
         try:
             if subkey is not None:
@@ -201,12 +250,34 @@ class NodeStorage(local, Service):
         >>> _encode({"unprocessed": {}, None: {"stacktrace": {}}})
         b'{"stacktrace": {}}\nunprocessed\n{}'
         """
-        lines = [json_dumps(data.pop(None)).encode("utf8")]
+        main = data.pop(None)
+        platform = main.get("platform") if isinstance(main, dict) else None
+
+        if options.get("nodedata.segmented-layout"):
+            return self._encode_segments(main, data, platform)
+
+        lines = [json_dumps(main).encode("utf8")]
         for key, value in data.items():
             lines.append(key.encode("ascii"))
             lines.append(json_dumps(value).encode("utf8"))
 
-        return b"\n".join(lines)
+        return self.codec.encode(b"\n".join(lines), platform=platform)
+
+    def _encode_segments(self, main, data, platform):
+        """
+        Encode the main payload and its subkeys as length-prefixed segments,
+        each passed through the codec on its own so that `get` with a subkey
+        only has to decode that one segment.
+        """
+        parts = [SEGMENTS_HEADER]
+        for key, value in [(None, main), *data.items()]:
+            key = key.encode("ascii") if key is not None else b""
+            value = self.codec.encode(json_dumps(value).encode("utf8"), platform=platform)
+            parts.append(SEGMENT_PREFIX.pack(len(key), len(value)))
+            parts.append(key)
+            parts.append(value)
+
+        return b"".join(parts)
 
     def _set_bytes(self, id, data, ttl=None):
         """
@@ -253,30 +324,97 @@ class NodeStorage(local, Service):
         raise NotImplementedError
 
     def _get_cache_item(self, id):
+        if self.local_cache is not None:
+            item = self._get_local_cache_items([id]).get(id)
+            if item is not None:
+                return item
+
         if self.cache:
-            return self.cache.get(id)
+            item = self.cache.get(id)
+            self._track_cache_lookup("shared", hits=int(item is not None), misses=int(item is None))
+            if item is not None:
+                self._set_local_cache_items({id: item})
+            return item
 
     def _get_cache_items(self, id_list):
-        if self.cache:
-            return self.cache.get_many(id_list)
-        return {}
+        items = {}
+        if self.local_cache is not None:
+            items = self._get_local_cache_items(id_list)
+            id_list = [id for id in id_list if id not in items]
+
+        if self.cache and id_list:
+            shared_items = self.cache.get_many(id_list)
+            self._track_cache_lookup(
+                "shared", hits=len(shared_items), misses=len(id_list) - len(shared_items)
+            )
+            self._set_local_cache_items(shared_items)
+            items.update(shared_items)
+
+        return items
 
     def _set_cache_item(self, id, data):
+        if data:
+            self._set_local_cache_items({id: data})
         if self.cache and data:
             self.cache.set(id, data)
 
     def _set_cache_items(self, items):
+        self._set_local_cache_items(items)
         if self.cache:
             self.cache.set_many(items)
 
     def _delete_cache_item(self, id):
+        if self.local_cache is not None:
+            self.local_cache.pop(id, None)
         if self.cache:
             self.cache.delete(id)
 
     def _delete_cache_items(self, id_list):
+        if self.local_cache is not None:
+            for id in id_list:
+                self.local_cache.pop(id, None)
         if self.cache:
             self.cache.delete_many([id for id in id_list])
 
+    def _get_local_cache_items(self, id_list):
+        items = {}
+        for id in id_list:
+            value = self.local_cache.get(id)
+            if value is not None:
+                # Values are kept serialized so that callers mutating the
+                # returned payload can't change what is cached.
+                items[id] = json_loads(value)
+        self._track_cache_lookup("local", hits=len(items), misses=len(id_list) - len(items))
+        return items
+
+    def _set_local_cache_items(self, items):
+        if self.local_cache is None:
+            return
+        for id, data in items.items():
+            if data:
+                self.local_cache[id] = json_dumps(data)
+
+    def _track_cache_lookup(self, tier, hits, misses):
+        if hits:
+            metrics.incr("nodestore.cache", amount=hits, tags={"tier": tier, "result": "hit"})
+        if misses:
+            metrics.incr("nodestore.cache", amount=misses, tags={"tier": tier, "result": "miss"})
+
+    @memoize
+    def local_cache(self):
+        # NodeStorage is a ``threading.local``, so this is one LRU per thread
+        # which also keeps us clear of TTLCache not being thread-safe.
+        size = options.get("nodedata.local-cache-size")
+        if not size:
+            return None
+        return TTLCache(maxsize=size, ttl=options.get("nodedata.local-cache-ttl"))
+
+    @memoize
+    def codec(self):
+        return import_string(settings.SENTRY_NODESTORE_CODEC)(
+            **settings.SENTRY_NODESTORE_CODEC_OPTIONS
+        )
+
     @memoize
     def cache(self):
         try:
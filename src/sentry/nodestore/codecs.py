@@ -0,0 +1,117 @@
+"""
+Codecs turn the encoded subkey payload produced by ``NodeStorage._encode``
+into the bytes that get written to the backend, and back.
+
+The default codec stores payloads as they are. ``ZstdDictionaryCodec``
+compresses payloads with zstd dictionaries trained per platform (see
+``sentry nodestore train-dictionaries``). Every codec must be able to read
+payloads written by the default codec, so switching codecs never requires a
+migration of existing nodes.
+"""
+import os
+import re
+from zlib import crc32
+
+import zstandard
+
+# Dictionaries are stored as ``<platform>-<version>.zdict``.
+DICTIONARY_FILENAME_RE = re.compile(r"^(?P<platform>[\w.]+)-(?P<version>\d+)\.zdict$")
+
+# Used for platforms without a dictionary of their own.
+DEFAULT_PLATFORM = "default"
+
+
+def get_dictionary_id(platform, version):
+    """
+    Returns the zstd dictionary ID for a platform and dictionary version.
+    The ID is written into every frame so that the matching dictionary can be
+    found when decoding, which is why it has to be stable.
+    """
+    # Dictionary IDs below 32768 and above 2^31 are reserved by zstd.
+    return 32768 + crc32(f"{platform}:{version}".encode()) % (2**31 - 32768)
+
+
+def get_dictionary_filename(platform, version):
+    return f"{platform}-{version}.zdict"
+
+
+class NodeCodec:
+    """
+    Stores payloads as they are.
+    """
+
+    def encode(self, value, platform=None):
+        return value
+
+    def decode(self, value):
+        return value
+
+
+class ZstdDictionaryCodec(NodeCodec):
+    """
+    Compresses payloads with the latest dictionary trained for the event
+    platform, falling back to the ``default`` dictionary and then to plain
+    zstd. Old dictionary versions must be kept in ``path`` for as long as
+    nodes compressed with them are retained.
+
+    >>> ZstdDictionaryCodec(path='/etc/sentry/nodestore-dictionaries', level=3)
+    """
+
+    def __init__(self, path, level=3):
+        self.level = level
+        self.dictionaries = {}
+        self.latest = {}
+
+        latest_versions = {}
+        for filename in sorted(os.listdir(path)):
+            match = DICTIONARY_FILENAME_RE.match(filename)
+            if match is None:
+                continue
+
+            with open(os.path.join(path, filename), "rb") as f:
+                dictionary = zstandard.ZstdCompressionDict(f.read())
+
+            platform, version = match.group("platform"), int(match.group("version"))
+            self.dictionaries[dictionary.dict_id()] = dictionary
+            if version > latest_versions.get(platform, -1):
+                latest_versions[platform] = version
+                self.latest[platform] = dictionary
+
+        self._compressors = {}
+        self._decompressors = {}
+
+    def _get_compressor(self, dictionary):
+        dict_id = dictionary.dict_id() if dictionary is not None else 0
+        compressor = self._compressors.get(dict_id)
+        if compressor is None:
+            compressor = self._compressors[dict_id] = zstandard.ZstdCompressor(
+                level=self.level, dict_data=dictionary
+            )
+        return compressor
+
+    def _get_decompressor(self, dict_id):
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            dictionary = None
+            if dict_id:
+                dictionary = self.dictionaries.get(dict_id)
+                if dictionary is None:
+                    raise ValueError(f"Unknown nodestore dictionary: {dict_id}")
+            decompressor = self._decompressors[dict_id] = zstandard.ZstdDecompressor(
+                dict_data=dictionary
+            )
+        return decompressor
+
+    def encode(self, value, platform=None):
+        dictionary = self.latest.get(platform) or self.latest.get(DEFAULT_PLATFORM)
+        return self._get_compressor(dictionary).compress(value)
+
+    def decode(self, value):
+        # Uncompressed payloads start with a JSON object (or a pickle for
+        # very old Django nodes), neither of which can be mistaken for a
+        # zstd frame.
+        if not value.startswith(zstandard.FRAME_HEADER):
+            return value
+
+        dict_id = zstandard.get_frame_parameters(value).dict_id
+        return self._get_decompressor(dict_id).decompress(value)
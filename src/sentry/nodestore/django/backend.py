@@ -1,3 +1,4 @@
+import base64
 import logging
 import math
 import pickle
@@ -5,13 +6,18 @@ import pickle
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
-from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.base import SEGMENTS_HEADER, NodeStorage
+from sentry.nodestore.codecs import NodeCodec
 from sentry.utils.strings import compress, decompress
 
 from .models import Node
 
 logger = logging.getLogger("sentry")
 
+# Nodes whose payloads are already compressed by the nodestore codec are only
+# base64 encoded, behind a prefix that can't start a base64 string.
+UNCOMPRESSED_PREFIX = "raw:"
+
 
 class DjangoNodeStorage(NodeStorage):
     def delete(self, id):
@@ -23,8 +29,12 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
         try:
+            if value.startswith(SEGMENTS_HEADER):
+                return self._decode_segment(value, subkey=subkey)
+
+            value = self.codec.decode(value)
             if value.startswith(b"{"):
-                return NodeStorage._decode(self, value, subkey=subkey)
+                return self._decode_payload(value, subkey=subkey)
 
             if subkey is None:
                 return pickle.loads(value)
@@ -34,22 +44,35 @@ class DjangoNodeStorage(NodeStorage):
             logger.exception(e)
             return {}
 
+    def _compress(self, data):
+        # zlib would only spend CPU on payloads the codec already compressed.
+        if type(self.codec) is NodeCodec:
+            return compress(data)
+        return UNCOMPRESSED_PREFIX + base64.b64encode(data).decode("utf-8")
+
+    def _decompress(self, data):
+        if data.startswith(UNCOMPRESSED_PREFIX):
+            return base64.b64decode(data[len(UNCOMPRESSED_PREFIX) :])
+        return decompress(data)
+
     def _get_bytes(self, id):
         try:
             data = Node.objects.get(id=id).data
-            return decompress(data)
+            return self._decompress(data)
         except Node.DoesNotExist:
             return None
 
     def _get_bytes_multi(self, id_list):
-        return {n.id: decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
+        return {n.id: self._decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
 
     def delete_multi(self, id_list):
         Node.objects.filter(id__in=id_list).delete()
         self._delete_cache_items(id_list)
 
     def _set_bytes(self, id, data, ttl=None):
-        create_or_update(Node, id=id, values={"data": compress(data), "timestamp": timezone.now()})
+        create_or_update(
+            Node, id=id, values={"data": self._compress(data), "timestamp": timezone.now()}
+        )
 
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
@@ -385,6 +385,12 @@ register("outcomes.tsdb-in-consumer-sample-rate", default=0.0)  # unused
 # Node data save rate
 register("nodedata.cache-sample-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
 register("nodedata.cache-on-save", default=False, flags=FLAG_PRIORITIZE_DISK)
+# In-process LRU in front of the nodedata cache, 0 disables it
+register("nodedata.local-cache-size", default=0, flags=FLAG_PRIORITIZE_DISK)
+register("nodedata.local-cache-ttl", default=60, flags=FLAG_PRIORITIZE_DISK)
+# Write node payloads as length-prefixed segments so that subkeys can be read
+# without decoding the whole payload. Only enable once all readers support it.
+register("nodedata.segmented-layout", default=False, flags=FLAG_PRIORITIZE_DISK)
 
 # Use nodestore for eventstore.get_events
 register("eventstore.use-nodestore", default=False, flags=FLAG_PRIORITIZE_DISK)
@@ -431,6 +437,56 @@ register("store.reprocessing-force-disable", default=False)
 
 register("store.race-free-group-creation-force-disable", default=False)
 
+# Caching of grouphashes that belong to a group (see sentry.grouping.grouphash_cache).
+# The shared tier is disabled with a TTL of 0, the in-process LRU with a size of 0.
+register("grouphash.cache-ttl", default=0, flags=FLAG_PRIORITIZE_DISK)
+register("grouphash.local-cache-size", default=0, flags=FLAG_PRIORITIZE_DISK)
+register("grouphash.local-cache-ttl", default=10, flags=FLAG_PRIORITIZE_DISK)
+
+# Maximum number of threads used to process the stacktraces of one event whose
+# stacktrace processors all support concurrent processing, 1 processes serially
+register("processing.stacktrace-thread-pool-size", default=1, flags=FLAG_PRIORITIZE_DISK)
+
+# How long the results of stacktrace processors are kept in the frame cache, shared
+# by all events of a release or debug file. 0 disables the frame cache.
+register("processing.frame-result-cache-ttl", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# Total size in bytes of the sourcemaps whose parsed form is kept in memory by every
+# event processing worker, 0 disables the cache.
+register("processing.sourcemap-cache-size", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# How long the index of an artifact bundle, which allows reading single files from the
+# bundle without fetching all of it, is kept in the cache. 0 disables the index.
+register("processing.artifact-bundle-index-ttl", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# Length in seconds of the window in which the native stacktraces of the events of a
+# project are collected into one Symbolicator request, 0 sends one request per event.
+register("symbolicator.batch-window", default=0.0, flags=FLAG_PRIORITIZE_DISK)
+# Seconds after the end of its window an event waits for the result of its batch
+# before sending its own Symbolicator request.
+register("symbolicator.batch-timeout", default=30, flags=FLAG_PRIORITIZE_DISK)
+
+# Number of compiled ownership and CODEOWNERS schemas (see sentry.ownership.compiled)
+# kept in memory by every post processing worker, 0 matches rules one by one.
+register("ownership.compiled-schema-cache-size", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# Seconds for which auto-assignment of a group is evaluated for one event only, any
+# value but 0 also lets only one event of a group evaluate its issue owners at a time.
+register("post_process.owner-assignment-coalesce-window", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# Seconds for which results of issue alert frequency conditions are shared by the events
+# of a group, 0 only shares them between the rules evaluated for one event.
+register("rules.frequency-result-cache-ttl", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# Number of compiled issue alert rule sets (see sentry.rules.processor.RulePlan) kept
+# in memory by every post processing worker, 0 compiles the rules for every event.
+register("rules.processor.plan-cache-size", default=0, flags=FLAG_PRIORITIZE_DISK)
+
+# Keep the time issue alert rules last fired for a group in Redis and write it to the
+# database through the buffer. All post processing workers have to agree on this, rules
+# may fire twice within their frequency while it is being switched.
+register("rules.processor.buffered-rule-status", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # Option to enable dart deobfuscation on ingest
 register("processing.view-hierarchies-dart-deobfuscation", default=0.0)
 
@@ -461,6 +517,10 @@ register("store.background-grouping-sample-rate", default=0.0)
 # True if background grouping should run before secondary and primary grouping
 register("store.background-grouping-before", default=False)
 
+# Number of grouping variants kept in the in-process cache keyed by the grouping
+# inputs of an event, 0 disables the cache
+register("grouping.variants-cache-size", default=0, flags=FLAG_PRIORITIZE_DISK)
+
 # Store release files bundled as zip files
 register("processing.save-release-archives", default=False)  # unused
 
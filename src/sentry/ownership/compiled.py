@@ -0,0 +1,254 @@
+"""
+Indexes ownership rules so that an event is only matched against the rules
+that can possibly apply to it.
+
+``Matcher.test`` collects (and munges) the frames of the event for every rule
+and then calls into the glob matcher for every frame and key, which adds up to
+millions of calls per event for projects with large CODEOWNERS files.
+
+A compiled schema collects the values that path, codeowners, module and url
+matchers look at once per event, and tests each distinct pattern against the
+distinct values only. A pattern can only match a value that contains every
+literal run of the pattern (the characters between its wildcards), ignoring
+case and path separators. Patterns are indexed by the rarest trigram of their
+literal runs, and are only tested against the values containing all of their
+literal runs if that trigram occurs in any of the values. Patterns and values
+that cannot be reduced like this, and tag matchers, are always tested. Every
+test uses the same match function as ``Matcher.test``, and the matching rules
+are returned in schema order, so the result is exactly the one of testing
+every rule.
+"""
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from sentry.ownership.grammar import (
+    CODEOWNERS,
+    MODULE,
+    PATH,
+    URL,
+    Matcher,
+    Rule,
+    codeowners_path_match,
+    load_schema,
+    path_match,
+    url_match,
+)
+from sentry.utils import json, metrics
+from sentry.utils.event_frames import find_stack_frames
+from sentry.utils.hashlib import md5_text
+from sentry.utils.lru import OptionSizedLRUCache
+
+MATCH_FUNCS: Mapping[str, Callable[[Optional[str], str], bool]] = {
+    URL: url_match,
+    PATH: path_match,
+    MODULE: path_match,
+    CODEOWNERS: codeowners_path_match,
+}
+
+# Characters that do not match themselves in glob and CODEOWNERS patterns,
+# and characters that may start a construct in which no character does.
+WILDCARD_CHARS = frozenset("*?!\\")
+UNSUPPORTED_CHARS = frozenset("[]{}")
+
+NGRAM_SIZE = 3
+
+_strip_path_separators = str.maketrans("", "", "/\\")
+
+
+def _normalize(value: str) -> Optional[str]:
+    # Case insensitive matching also folds some non-ASCII characters into
+    # ASCII ones, such values are not reduced.
+    if not value.isascii():
+        return None
+    return value.lower().translate(_strip_path_separators)
+
+
+def _get_literals(pattern: str) -> Optional[Sequence[str]]:
+    if not pattern.isascii() or UNSUPPORTED_CHARS.intersection(pattern):
+        return None
+
+    literals = []
+    start = 0
+    for idx, char in enumerate(pattern + "*"):
+        if char in WILDCARD_CHARS:
+            literal = _normalize(pattern[start:idx])
+            if literal:
+                literals.append(literal)
+            start = idx + 1
+    return literals
+
+
+def _get_ngrams(value: str) -> Set[str]:
+    return {value[idx : idx + NGRAM_SIZE] for idx in range(len(value) - NGRAM_SIZE + 1)}
+
+
+def _get_frame_values(
+    frames: Sequence[Mapping[str, Any]], keys: Sequence[str]
+) -> Optional[Sequence[str]]:
+    """Returns the distinct values ``Matcher.test_frames`` tests patterns
+    against, or None if any of them is not a string."""
+    values = []
+    for frame in frames:
+        if not isinstance(frame, Mapping):
+            continue
+        for key in keys:
+            value = frame.get(key)
+            if not value:
+                continue
+            if not isinstance(value, str):
+                return None
+            values.append(value)
+    return list(dict.fromkeys(values))
+
+
+class CompiledPatterns:
+    """The distinct patterns of all matchers of one type."""
+
+    def __init__(self, match_func: Callable[[Optional[str], str], bool], patterns: Sequence[str]):
+        self.match_func = match_func
+        self.patterns = list(dict.fromkeys(patterns))
+
+        literals_by_pattern = {pattern: _get_literals(pattern) for pattern in self.patterns}
+        ngram_counts = Counter(
+            ngram
+            for literals in literals_by_pattern.values()
+            for ngram in {ngram for literal in literals or () for ngram in _get_ngrams(literal)}
+        )
+
+        # ngram -> [(pattern, literals)], every pattern is indexed by one ngram only
+        self._indexed: Dict[str, List[Tuple[str, Sequence[str]]]] = defaultdict(list)
+        # patterns without a long enough literal run, with their literal runs if any
+        self._unindexed: List[Tuple[str, Optional[Sequence[str]]]] = []
+
+        for pattern, literals in literals_by_pattern.items():
+            ngrams = {ngram for literal in literals or () for ngram in _get_ngrams(literal)}
+            if ngrams:
+                ngram = min(ngrams, key=lambda ngram: (ngram_counts[ngram], ngram))
+                self._indexed[ngram].append((pattern, literals))
+            else:
+                self._unindexed.append((pattern, literals))
+
+    def _test(self, pattern: str, values: Sequence[str]) -> bool:
+        return any(self.match_func(value, pattern) for value in values)
+
+    def get_matching_patterns(self, values: Sequence[str]) -> Set[str]:
+        normalized_values = {}
+        # Values that could not be normalized have to be tested against every pattern.
+        other_values = []
+        for value in values:
+            normalized_value = _normalize(value)
+            if normalized_value is None:
+                other_values.append(value)
+            else:
+                normalized_values[value] = normalized_value
+
+        def get_candidates(literals: Optional[Sequence[str]]) -> Sequence[str]:
+            if literals is None:
+                return values
+            return [
+                value
+                for value, normalized_value in normalized_values.items()
+                if all(literal in normalized_value for literal in literals)
+            ] + other_values
+
+        rv = set()
+        for pattern, literals in self._unindexed:
+            if self._test(pattern, get_candidates(literals)):
+                rv.add(pattern)
+
+        ngrams = set()
+        for normalized_value in normalized_values.values():
+            ngrams.update(_get_ngrams(normalized_value))
+
+        for ngram in ngrams.intersection(self._indexed):
+            for pattern, literals in self._indexed[ngram]:
+                if self._test(pattern, get_candidates(literals)):
+                    rv.add(pattern)
+
+        # Patterns whose ngram occurs in none of the normalized values can still
+        # match values that could not be normalized.
+        if other_values:
+            for ngram in set(self._indexed).difference(ngrams):
+                for pattern, _ in self._indexed[ngram]:
+                    if self._test(pattern, other_values):
+                        rv.add(pattern)
+
+        return rv
+
+
+class CompiledSchema:
+    def __init__(self, schema: Mapping[str, Any]):
+        self.rules = load_schema(schema)
+
+        patterns_by_type = defaultdict(list)
+        for rule in self.rules:
+            if rule.matcher.type in MATCH_FUNCS:
+                patterns_by_type[rule.matcher.type].append(rule.matcher.pattern)
+
+        self._patterns = {
+            type: CompiledPatterns(MATCH_FUNCS[type], patterns)
+            for type, patterns in patterns_by_type.items()
+        }
+
+    def _get_values(self, type: str, data: Mapping[str, Any]) -> Optional[Sequence[str]]:
+        if type == URL:
+            if not isinstance(data, Mapping):
+                return []
+            try:
+                url = data["request"]["url"]
+            except KeyError:
+                return []
+            if not url:
+                return []
+            return [url] if isinstance(url, str) else None
+        elif type == MODULE:
+            return _get_frame_values(find_stack_frames(data), ["module"])
+        return _get_frame_values(*Matcher.munge_if_needed(data))
+
+    def get_matching_rules(self, data: Mapping[str, Any]) -> Sequence[Rule]:
+        """Returns the rules matching the event `data`, in schema order."""
+        matching_patterns: Dict[str, Optional[Set[str]]] = {}
+        for type, patterns in self._patterns.items():
+            values = self._get_values(type, data)
+            # Values that are not strings are left to the matchers.
+            matching_patterns[type] = (
+                patterns.get_matching_patterns(values) if values is not None else None
+            )
+
+        rv = []
+        for rule in self.rules:
+            patterns = matching_patterns.get(rule.matcher.type)
+            if patterns is None:
+                if rule.test(data):
+                    rv.append(rule)
+            elif rule.matcher.pattern in patterns:
+                rv.append(rule)
+        return rv
+
+
+# Compiled schemas shared by all events processed in this process, keyed by
+# the project and the hash of the schema.
+_compiled_schemas = OptionSizedLRUCache("ownership.compiled-schema-cache-size")
+
+
+def get_compiled_schema(project_id: int, schema: Mapping[str, Any]) -> Optional[CompiledSchema]:
+    """
+    Returns the compiled form of the ownership `schema` of a project, or None
+    if compiled schemas are disabled.
+    """
+    if not _compiled_schemas.enabled():
+        return None
+
+    cache_key = (project_id, md5_text(json.dumps(schema)).hexdigest())
+    compiled_schema: Optional[CompiledSchema] = _compiled_schemas.get(cache_key)
+    metrics.incr(
+        "ownership.compiled_schema_cache",
+        tags={"result": "miss" if compiled_schema is None else "hit"},
+        skip_internal=True,
+    )
+    if compiled_schema is None:
+        compiled_schema = CompiledSchema(schema)
+        _compiled_schemas.set(cache_key, compiled_schema)
+    return compiled_schema
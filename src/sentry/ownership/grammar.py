@@ -75,6 +75,18 @@ _       = space*
 )
 
 
+def url_match(value: Optional[str], pattern: str) -> bool:
+    return bool(glob_match(value, pattern, ignorecase=True))
+
+
+def path_match(value: Optional[str], pattern: str) -> bool:
+    return bool(glob_match(value, pattern, ignorecase=True, path_normalize=True))
+
+
+def codeowners_path_match(value: Optional[str], pattern: str) -> bool:
+    return bool(codeowners_match(value, pattern))
+
+
 class Rule(namedtuple("Rule", "matcher owners")):
     """
     A Rule represents a single line in an Ownership file.
@@ -155,7 +167,7 @@ class Matcher(namedtuple("Matcher", "type pattern")):
                 # As such we need to match it using gitignore logic.
                 # See syntax documentation here:
                 # https://docs.github.com/en/github/creating-cloning-and-archiving-repositories/creating-a-repository-on-github/about-code-owners
-                match_frame_value_func=lambda val, pattern: bool(codeowners_match(val, pattern)),
+                match_frame_value_func=codeowners_path_match,
             )
         return False
 
@@ -167,15 +179,13 @@ class Matcher(namedtuple("Matcher", "type pattern")):
             url = data["request"]["url"]
         except KeyError:
             return False
-        return url and bool(glob_match(url, self.pattern, ignorecase=True))
+        return url and url_match(url, self.pattern)
 
     def test_frames(
         self,
         frames: Sequence[Mapping[str, Any]],
         keys: Sequence[str],
-        match_frame_value_func: Callable[[Optional[str], str], bool] = lambda val, pattern: bool(
-            glob_match(val, pattern, ignorecase=True, path_normalize=True)
-        ),
+        match_frame_value_func: Callable[[Optional[str], str], bool] = path_match,
     ) -> bool:
         for frame in (f for f in frames if isinstance(f, Mapping)):
             for key in keys:
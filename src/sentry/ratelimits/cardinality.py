@@ -1,7 +1,20 @@
+import itertools
+import math
 import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from typing import Collection, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from typing import (
+    Any,
+    Collection,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 import rb
 
@@ -383,6 +396,223 @@ class RedisCardinalityLimiter(CardinalityLimiter):
         self.backend.run_use_quotas(unit_keys_to_set, set_keys_to_add, set_keys_ttl)
 
 
+def _mix_hash(value: int) -> int:
+    """
+    Scramble a unit hash into 64 well-distributed bits (the splitmix64
+    finalizer), since unit hashes are not guaranteed to be uniformly
+    distributed.
+    """
+    value &= 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+
+class BloomFilterParameters(NamedTuple):
+    # The number of bits in the filter.
+    num_bits: int
+
+    # The number of bits set per unit hash.
+    num_hashes: int
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilterParameters":
+        capacity = max(1, capacity)
+        num_bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def get_offsets(self, hash: Hash) -> Sequence[int]:
+        # Kirsch-Mitzenmacher double hashing: k offsets from two 32 bit halves
+        value = _mix_hash(hash)
+        h1, h2 = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+
+class RedisBloomCardinalityLimiter(CardinalityLimiter):
+    """
+    A cardinality limiter that keeps a Bloom filter (to tell whether a unit
+    hash has been seen) and a HyperLogLog (to count the hashes seen) per
+    prefix and time bucket, instead of a key per unit hash and sets of hashes
+    like `RedisCardinalityLimiter` does. Filters are sized for the quota limit
+    and HyperLogLogs never exceed 12kB, so Redis memory is bounded by the
+    number of prefixes and quotas, no matter how many distinct unit hashes
+    come in.
+
+    As with the sets of `RedisCardinalityLimiter`, granted hashes are added to
+    all time buckets in the window, so that checking a request only has to
+    read the oldest one.
+
+    A false positive makes the limiter treat a new unit hash as already seen,
+    which admits it even if the quota has been reached. With
+    `false_positive_rate=0.01`, a full quota can therefore be exceeded by
+    about 1% of the hashes that would have been rejected.
+    """
+
+    def __init__(
+        self,
+        cluster: str = "default",
+        false_positive_rate: float = 0.01,
+        metric_tags: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        """
+        :param cluster: Name of the redis cluster to use, to be configured with
+            the `redis.clusters` Sentry option (like any other redis cluster in
+            Sentry).
+        :param false_positive_rate: The rate of false positives of a filter
+            that contains as many unit hashes as the quota limit. Lower rates
+            make for larger filters.
+        """
+        is_redis_cluster, client, _ = redis.get_dynamic_cluster_from_options(
+            "", {"cluster": cluster}
+        )
+
+        self.backend: RedisBackend = (
+            RedisClusterBackend(client) if is_redis_cluster else RedisBlasterBackend(client)
+        )
+
+        assert 0 < false_positive_rate < 1
+        self.false_positive_rate = false_positive_rate
+        self.metric_tags = metric_tags or {}
+        super().__init__()
+
+    def _get_filter_parameters(self, quota: Quota) -> BloomFilterParameters:
+        return BloomFilterParameters.for_capacity(quota.limit, self.false_positive_rate)
+
+    def _get_filter_key(
+        self, request: RequestedQuota, parameters: BloomFilterParameters, time_bucket: int
+    ) -> str:
+        # The filter size is part of the key, so that changing the limit or
+        # the false positive rate starts out with new, empty filters.
+        return (
+            f"cardinality:bloom:{request.prefix}-{parameters.num_bits}-"
+            f"{parameters.num_hashes}-{time_bucket}"
+        )
+
+    @staticmethod
+    def _get_hll_key(request: RequestedQuota, time_bucket: int) -> str:
+        return f"cardinality:hll:{request.prefix}-{time_bucket}"
+
+    def check_within_quotas(
+        self, requests: Sequence[RequestedQuota], timestamp: Optional[Timestamp] = None
+    ) -> Tuple[Timestamp, Sequence[GrantedQuota]]:
+        if timestamp is None:
+            timestamp = int(time.time())
+        else:
+            timestamp = int(timestamp)
+
+        if not requests:
+            return timestamp, []
+
+        bits_to_get: Mapping[str, List[int]] = defaultdict(list)
+        read_keys = []
+
+        for request in requests:
+            parameters = self._get_filter_parameters(request.quota)
+            oldest_time_bucket = list(request.quota.iter_window(timestamp))[-1]
+            key = self._get_filter_key(request, parameters, oldest_time_bucket)
+            hll_key = self._get_hll_key(request, oldest_time_bucket)
+            read_keys.append((key, hll_key))
+            for hash in request.unit_hashes:
+                bits_to_get[key].extend(parameters.get_offsets(hash))
+
+        bits, set_counts = self.backend.run_check_within_filters(
+            bits_to_get, [hll_key for _, hll_key in read_keys]
+        )
+
+        grants = []
+        offsets_read: Mapping[str, int] = defaultdict(int)
+        for request, (key, hll_key) in zip(requests, read_keys):
+            parameters = self._get_filter_parameters(request.quota)
+            set_count = set_counts[hll_key]
+
+            metrics.timing(
+                key="ratelimits.cardinality.set_size",
+                value=set_count,
+                tags=self.metric_tags,
+            )
+
+            remaining_limit_running = max(0, request.quota.limit - set_count)
+            granted_hashes = []
+            reached_quota = None
+
+            # Same as `RedisCardinalityLimiter`, hashes that are (probably)
+            # already in the filter come at no cost.
+            for hash in request.unit_hashes:
+                start = offsets_read[key]
+                offsets_read[key] += parameters.num_hashes
+
+                if all(bits[key][start : start + parameters.num_hashes]):
+                    granted_hashes.append(hash)
+                elif remaining_limit_running > 0:
+                    granted_hashes.append(hash)
+                    remaining_limit_running -= 1
+                else:
+                    reached_quota = request.quota
+
+            grants.append(
+                GrantedQuota(
+                    request=request,
+                    granted_unit_hashes=granted_hashes,
+                    reached_quota=reached_quota,
+                )
+            )
+
+        return timestamp, grants
+
+    def use_quotas(
+        self,
+        grants: Sequence[GrantedQuota],
+        timestamp: Timestamp,
+    ) -> None:
+        bits_to_set: Mapping[str, List[int]] = defaultdict(list)
+        hll_keys_to_add: Mapping[str, Set[int]] = defaultdict(set)
+        keys_ttl = {}
+
+        for grant in grants:
+            if not grant.granted_unit_hashes:
+                continue
+
+            parameters = self._get_filter_parameters(grant.request.quota)
+            offsets = list(
+                itertools.chain.from_iterable(
+                    parameters.get_offsets(hash) for hash in grant.granted_unit_hashes
+                )
+            )
+
+            for time_bucket in grant.request.quota.iter_window(timestamp):
+                key = self._get_filter_key(grant.request, parameters, time_bucket)
+                bits_to_set[key].extend(offsets)
+                keys_ttl[key] = grant.request.quota.window_seconds
+
+                hll_key = self._get_hll_key(grant.request, time_bucket)
+                hll_keys_to_add[hll_key].update(grant.granted_unit_hashes)
+                keys_ttl[hll_key] = grant.request.quota.window_seconds
+
+        if not bits_to_set:
+            # If there are no keys to mutate (i.e. there are no quotas to
+            # enforce), we can save the redis call entirely.
+            return
+
+        self.backend.run_use_filters(bits_to_set, hll_keys_to_add, keys_ttl)
+
+
+def _bitfield_arguments(offsets: Sequence[int], set_bits: bool = False) -> Iterator[List[Any]]:
+    """
+    Yield the arguments of BITFIELD commands that read (or set) the bits at
+    `offsets`. Like SADD, we don't want to pass too many arguments to a single
+    command.
+    """
+    for i in range(0, len(offsets), 200):
+        arguments: List[Any] = []
+        for offset in offsets[i : i + 200]:
+            if set_bits:
+                arguments.extend(("SET", "u1", offset, 1))
+            else:
+                arguments.extend(("GET", "u1", offset))
+        yield arguments
+
+
 class RedisBackend(ABC):
     @abstractmethod
     def run_check_within_quotas(
@@ -399,6 +629,21 @@ class RedisBackend(ABC):
     ) -> None:
         ...
 
+    @abstractmethod
+    def run_check_within_filters(
+        self, bits_to_get: Mapping[str, Sequence[int]], hll_keys_to_count: Sequence[str]
+    ) -> Tuple[Mapping[str, Sequence[int]], Mapping[str, int]]:
+        ...
+
+    @abstractmethod
+    def run_use_filters(
+        self,
+        bits_to_set: Mapping[str, Sequence[int]],
+        hll_keys_to_add: Mapping[str, Collection[int]],
+        keys_ttl: Mapping[str, int],
+    ) -> None:
+        ...
+
 
 class RedisClusterBackend(RedisBackend):
     def __init__(self, client: redis.RedisCluster) -> None:
@@ -448,6 +693,52 @@ class RedisClusterBackend(RedisBackend):
 
             pipeline.execute()
 
+    def run_check_within_filters(
+        self, bits_to_get: Mapping[str, Sequence[int]], hll_keys_to_count: Sequence[str]
+    ) -> Tuple[Mapping[str, Sequence[int]], Mapping[str, int]]:
+        with self.client.pipeline(transaction=False) as pipeline:
+            commands = []
+            for key, offsets in bits_to_get.items():
+                for arguments in _bitfield_arguments(offsets):
+                    pipeline.execute_command("BITFIELD", key, *arguments)
+                    commands.append(key)
+
+            for key in hll_keys_to_count:
+                pipeline.pfcount(key)
+
+            results = iter(pipeline.execute())
+
+            bits: Mapping[str, List[int]] = defaultdict(list)
+            for key in commands:
+                bits[key].extend(next(results))
+
+            set_counts = dict(zip(hll_keys_to_count, results))
+
+        return bits, set_counts
+
+    def run_use_filters(
+        self,
+        bits_to_set: Mapping[str, Sequence[int]],
+        hll_keys_to_add: Mapping[str, Collection[int]],
+        keys_ttl: Mapping[str, int],
+    ) -> None:
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key, offsets in bits_to_set.items():
+                for arguments in _bitfield_arguments(offsets, set_bits=True):
+                    pipeline.execute_command("BITFIELD", key, *arguments)
+
+                pipeline.expire(key, keys_ttl[key])
+
+            for key, items in hll_keys_to_add.items():
+                items_list = list(items)
+                while items_list:
+                    pipeline.pfadd(key, *items_list[:200])
+                    items_list = items_list[200:]
+
+                pipeline.expire(key, keys_ttl[key])
+
+            pipeline.execute()
+
 
 class RedisBlasterBackend(RedisBackend):
     def __init__(self, client: rb.Cluster) -> None:
@@ -486,3 +777,46 @@ class RedisBlasterBackend(RedisBackend):
                     items_list = items_list[200:]
 
                 pipeline.expire(key, set_keys_ttl[key])
+
+    def run_check_within_filters(
+        self, bits_to_get: Mapping[str, Sequence[int]], hll_keys_to_count: Sequence[str]
+    ) -> Tuple[Mapping[str, Sequence[int]], Mapping[str, int]]:
+        # rb does not know how to route BITFIELD, so the commands are sent to
+        # the host of their key explicitly.
+        with self.client.fanout() as client:
+            bitfield_results = [
+                (key, client.target_key(key).execute_command("BITFIELD", key, *arguments))
+                for key, offsets in bits_to_get.items()
+                for arguments in _bitfield_arguments(offsets)
+            ]
+
+            pfcount_results = [client.target_key(key).pfcount(key) for key in hll_keys_to_count]
+
+        bits: Mapping[str, List[int]] = defaultdict(list)
+        for key, promise in bitfield_results:
+            bits[key].extend(promise.value)
+
+        set_counts = dict(zip(hll_keys_to_count, (p.value for p in pfcount_results)))
+
+        return bits, set_counts
+
+    def run_use_filters(
+        self,
+        bits_to_set: Mapping[str, Sequence[int]],
+        hll_keys_to_add: Mapping[str, Collection[int]],
+        keys_ttl: Mapping[str, int],
+    ) -> None:
+        with self.client.fanout() as client:
+            for key, offsets in bits_to_set.items():
+                for arguments in _bitfield_arguments(offsets, set_bits=True):
+                    client.target_key(key).execute_command("BITFIELD", key, *arguments)
+
+                client.target_key(key).expire(key, keys_ttl[key])
+
+            for key, items in hll_keys_to_add.items():
+                items_list = list(items)
+                while items_list:
+                    client.target_key(key).pfadd(key, *items_list[:200])
+                    items_list = items_list[200:]
+
+                client.target_key(key).expire(key, keys_ttl[key])
@@ -73,12 +73,28 @@ When using the quotas, the keys change as follows:
     sliding-window-rate-limit:123:3:902 = 1
     sliding-window-rate-limit:123:30:90 = 2
 
+Leasing
+=======
+
+Checking quotas costs one Redis round trip per call, which adds up when a
+consumer calls the rate limiter for every batch. With `lease_size` set,
+`RedisSlidingWindowRateLimiter` instead reserves a chunk of each quota at a
+time by incrementing the current granule in Redis upfront. Grants are then
+served from that local lease until it is used up, or until the granule it was
+reserved in ends, at which point any unused remainder is given back to Redis.
+
+Other processes see leased quota as used, so leasing does not let the quota be
+exceeded any more than the check/use split already does: concurrent processes
+may each lease up to `lease_size` more than what is left. Quota that is leased
+but not used yet is unavailable to other processes until it is given back.
+
 """
 
+import threading
 from collections import defaultdict
 from dataclasses import dataclass
 from time import time
-from typing import Any, Iterator, MutableMapping, Optional, Sequence, Tuple
+from typing import Any, Iterator, Mapping, MutableMapping, Optional, Sequence, Tuple
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.utils import redis
@@ -171,6 +187,20 @@ class GrantedQuota:
 Timestamp = int
 
 
+@dataclass
+class _Lease:
+    # How much of the leased quota has not been used yet.
+    remaining: int
+
+    # The request timestamp at which the granule the lease was reserved in
+    # ends. Leases are only valid within their granule, since that is the
+    # granule that was incremented in Redis.
+    expires_at: Timestamp
+
+    # The TTL of the Redis key the lease was reserved in.
+    window_seconds: int
+
+
 class SlidingWindowRateLimiter(Service):
     def __init__(self, **options: Any) -> None:
         pass
@@ -277,6 +307,13 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
     def __init__(self, **options: Any) -> None:
         cluster_key = options.get("cluster", "default")
         self.client = redis.redis_clusters.get(cluster_key)
+
+        # How much quota to lease from Redis at a time, see "Leasing" above.
+        # Leasing is disabled if this is 0.
+        self.lease_size = int(options.get("lease_size", 0))
+        self._leases: MutableMapping[str, _Lease] = {}
+        self._leases_lock = threading.Lock()
+
         super().__init__(**options)
 
     def validate(self) -> None:
@@ -315,6 +352,9 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
         else:
             timestamp = int(timestamp)
 
+        if self.lease_size:
+            return timestamp, self._check_within_leases(requests, timestamp)
+
         keys_to_fetch = set()
         for request in requests:
             # We could potentially run this check inside of __post__init__ of
@@ -414,17 +454,37 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
         keys_to_incr: MutableMapping[str, int] = {}
         keys_ttl: MutableMapping[str, int] = {}
 
-        for request, grant in zip(requests, grants):
-            assert request.prefix == grant.prefix
-
-            for quota in request.quotas:
-                # Only incr most recent granule
-                granule = next(quota.iter_window(timestamp))
-                key = self._build_redis_key(request=request, quota=quota, granule=granule)
-                keys_to_incr.setdefault(key, 0)
-                keys_to_incr[key] += grant.granted
-                keys_ttl[key] = quota.window_seconds
-
+        with self._leases_lock:
+            for request, grant in zip(requests, grants):
+                assert request.prefix == grant.prefix
+
+                for quota in request.quotas:
+                    # Only incr most recent granule
+                    granule = next(quota.iter_window(timestamp))
+                    key = self._build_redis_key(request=request, quota=quota, granule=granule)
+
+                    # Leased quota has already been added to Redis. If the
+                    # lease has been given back in the meantime, the grant is
+                    # counted in Redis as usual, and so is whatever the grant
+                    # uses beyond what is left on the lease (grants can race
+                    # for the same remainder).
+                    granted = grant.granted
+                    lease = self._leases.get(key)
+                    if lease is not None:
+                        leased = min(lease.remaining, granted)
+                        lease.remaining -= leased
+                        granted -= leased
+                        if not granted:
+                            continue
+
+                    keys_to_incr.setdefault(key, 0)
+                    keys_to_incr[key] += granted
+                    keys_ttl[key] = quota.window_seconds
+
+        if keys_to_incr:
+            self._incr_keys(keys_to_incr, keys_ttl)
+
+    def _incr_keys(self, keys_to_incr: Mapping[str, int], keys_ttl: Mapping[str, int]) -> None:
         with self.client.pipeline(transaction=False) as pipeline:
             for key, value in keys_to_incr.items():
                 pipeline.incrby(key, value)
@@ -435,3 +495,131 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
                 pipeline.expire(key, keys_ttl[key])
 
             pipeline.execute()
+
+    def _check_within_leases(
+        self, requests: Sequence[RequestedQuota], timestamp: Timestamp
+    ) -> Sequence[GrantedQuota]:
+        """
+        Compute grants from local leases, renewing all leases that cannot
+        cover the batch in one go.
+        """
+        with self._leases_lock:
+            # Sum up how much of each quota the batch could use, so that a
+            # lease only has to be acquired once per batch.
+            needed: MutableMapping[str, int] = defaultdict(int)
+            quotas: MutableMapping[str, Tuple[RequestedQuota, Quota]] = {}
+            for request in requests:
+                assert request.quotas
+
+                for quota in request.quotas:
+                    granule = next(quota.iter_window(timestamp))
+                    key = self._build_redis_key(request=request, quota=quota, granule=granule)
+                    needed[key] += request.requested
+                    quotas[key] = (request, quota)
+
+            missing = {}
+            for key, amount in needed.items():
+                lease = self._leases.get(key)
+                remaining = lease.remaining if lease is not None else 0
+                if remaining < amount:
+                    missing[key] = amount - remaining
+
+            if missing:
+                self._acquire_leases(missing, quotas, timestamp)
+
+            results = []
+
+            # Leases are shared by all requests in the batch that use the
+            # same quota (e.g. global quotas), so we keep track of how much of
+            # each lease has been granted within this function call.
+            lease_used_cache: MutableMapping[str, int] = defaultdict(int)
+
+            for request in requests:
+                granted_quota = request.requested
+                reached_quotas = []
+
+                keys = []
+                for quota in request.quotas:
+                    granule = next(quota.iter_window(timestamp))
+                    key = self._build_redis_key(request=request, quota=quota, granule=granule)
+                    keys.append(key)
+
+                    lease = self._leases.get(key)
+                    remaining_quota = max(
+                        0, (lease.remaining if lease is not None else 0) - lease_used_cache[key]
+                    )
+
+                    if remaining_quota < granted_quota:
+                        granted_quota = remaining_quota
+                        reached_quotas.append(quota)
+
+                for key in keys:
+                    lease_used_cache[key] += granted_quota
+
+                results.append(
+                    GrantedQuota(
+                        prefix=request.prefix, granted=granted_quota, reached_quotas=reached_quotas
+                    )
+                )
+
+            return results
+
+    def _acquire_leases(
+        self,
+        missing: Mapping[str, int],
+        quotas: Mapping[str, Tuple[RequestedQuota, Quota]],
+        timestamp: Timestamp,
+    ) -> None:
+        """
+        Lease at least the missing amount (but no less than `lease_size`) of
+        each quota, as far as the quota allows. Unused leases of past granules
+        are given back first, in the same round trip that reads the current
+        usage of the quotas.
+        """
+        ordered_keys = list(missing)
+
+        with self.client.pipeline(transaction=False) as pipeline:
+            returned = 0
+            for key, lease in list(self._leases.items()):
+                if timestamp < lease.expires_at:
+                    continue
+
+                del self._leases[key]
+                if lease.remaining:
+                    pipeline.decrby(key, lease.remaining)
+                    pipeline.expire(key, lease.window_seconds)
+                    returned += 2
+
+            for key in ordered_keys:
+                request, quota = quotas[key]
+                for granule in quota.iter_window(timestamp):
+                    pipeline.get(
+                        self._build_redis_key(request=request, quota=quota, granule=granule)
+                    )
+
+            results = iter(pipeline.execute()[returned:])
+
+        amounts = {}
+        for key in ordered_keys:
+            request, quota = quotas[key]
+            used_quota = sum(int(next(results) or 0) for _ in quota.iter_window(timestamp))
+            remaining_quota = max(0, quota.limit - used_quota)
+            amounts[key] = min(remaining_quota, max(missing[key], self.lease_size))
+
+        keys_to_incr = {key: amount for key, amount in amounts.items() if amount}
+        if keys_to_incr:
+            self._incr_keys(
+                keys_to_incr, {key: quotas[key][1].window_seconds for key in keys_to_incr}
+            )
+
+        for key, amount in amounts.items():
+            request, quota = quotas[key]
+            lease = self._leases.get(key)
+            if lease is None:
+                granule = next(quota.iter_window(timestamp))
+                lease = self._leases[key] = _Lease(
+                    remaining=0,
+                    expires_at=(granule + 2) * quota.granularity_seconds,
+                    window_seconds=quota.window_seconds,
+                )
+            lease.remaining += amount
@@ -1,7 +1,7 @@
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError, transaction
 from django.db.models import F
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.utils import timezone
 
 from sentry import analytics
@@ -18,6 +18,8 @@ from sentry.models import (
     Project,
     PullRequest,
     Release,
+    ReleaseArtifactBundle,
+    ReleaseFile,
     ReleaseProject,
     Repository,
     remove_group_from_inbox,
@@ -250,6 +252,22 @@ def resolved_in_pull_request(instance, created, **kwargs):
                 )
 
 
+def invalidate_release_file_frame_cache(instance, **kwargs):
+    from sentry.lang.javascript.processor import invalidate_frame_cache
+
+    version = (
+        Release.objects.filter(id=instance.release_id).values_list("version", flat=True).first()
+    )
+    if version is not None:
+        invalidate_frame_cache(instance.organization_id, version)
+
+
+def invalidate_release_artifact_bundle_frame_cache(instance, **kwargs):
+    from sentry.lang.javascript.processor import invalidate_frame_cache
+
+    invalidate_frame_cache(instance.organization_id, instance.release_name)
+
+
 pre_save.connect(
     validate_release_empty_version,
     sender=Release,
@@ -261,6 +279,34 @@ post_save.connect(
     resolve_group_resolutions, sender=Release, dispatch_uid="resolve_group_resolutions", weak=False
 )
 
+post_save.connect(
+    invalidate_release_file_frame_cache,
+    sender=ReleaseFile,
+    dispatch_uid="invalidate_release_file_frame_cache_on_save",
+    weak=False,
+)
+
+post_delete.connect(
+    invalidate_release_file_frame_cache,
+    sender=ReleaseFile,
+    dispatch_uid="invalidate_release_file_frame_cache_on_delete",
+    weak=False,
+)
+
+post_save.connect(
+    invalidate_release_artifact_bundle_frame_cache,
+    sender=ReleaseArtifactBundle,
+    dispatch_uid="invalidate_release_artifact_bundle_frame_cache_on_save",
+    weak=False,
+)
+
+post_delete.connect(
+    invalidate_release_artifact_bundle_frame_cache,
+    sender=ReleaseArtifactBundle,
+    dispatch_uid="invalidate_release_artifact_bundle_frame_cache_on_delete",
+    weak=False,
+)
+
 post_save.connect(resolved_in_commit, sender=Commit, dispatch_uid="resolved_in_commit", weak=False)
 
 post_save.connect(
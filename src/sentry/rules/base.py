@@ -3,7 +3,7 @@ from __future__ import annotations
 import abc
 import logging
 from collections import namedtuple
-from typing import Any, Callable, Dict, MutableMapping, Sequence, Type
+from typing import TYPE_CHECKING, Any, Callable, Dict, MutableMapping, Sequence, Type
 
 from django import forms
 
@@ -13,6 +13,9 @@ from sentry.snuba.dataset import Dataset
 from sentry.types.condition_activity import ConditionActivity
 from sentry.types.rules import RuleFuture
 
+if TYPE_CHECKING:
+    from sentry.rules.conditions.event_frequency import FrequencyResultCache
+
 """
 Rules apply either before an event gets stored, or immediately after.
 
@@ -121,8 +124,11 @@ class EventState:
         is_regression: bool,
         is_new_group_environment: bool,
         has_reappeared: bool,
+        frequency_results: FrequencyResultCache | None = None,
     ) -> None:
         self.is_new = is_new
         self.is_regression = is_regression
         self.is_new_group_environment = is_new_group_environment
         self.has_reappeared = has_reappeared
+        # Shared by the frequency conditions of all rules evaluated for the event.
+        self.frequency_results = frequency_results
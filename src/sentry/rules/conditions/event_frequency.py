@@ -5,13 +5,13 @@ import contextlib
 import logging
 import re
 from datetime import datetime, timedelta
-from typing import Any, Dict, Mapping, Tuple
+from typing import Any, Callable, Dict, Mapping, Tuple
 
 from django import forms
 from django.core.cache import cache
 from django.utils import timezone
 
-from sentry import release_health, tsdb
+from sentry import options, release_health, tsdb
 from sentry.eventstore.models import GroupEvent
 from sentry.issues.constants import get_issue_tsdb_group_model, get_issue_tsdb_user_group_model
 from sentry.receivers.rules import DEFAULT_RULE_LABEL
@@ -88,6 +88,48 @@ class EventFrequencyForm(forms.Form):  # type: ignore
         return cleaned_data
 
 
+class FrequencyResultCache:
+    """
+    Results of the frequency condition queries made for one event, so that all
+    rules of the project using the same condition type, interval and
+    environment share a single tsdb query.
+
+    If `rules.frequency-result-cache-ttl` is set, results are also shared
+    through the default cache with the other events of the group that are
+    processed within that many seconds.
+    """
+
+    def __init__(self) -> None:
+        self._results: Dict[str, int] = {}
+
+    def get_or_query(self, key: str, query: Callable[[], int]) -> int:
+        result = self._results.get(key)
+        if result is not None:
+            metrics.incr(
+                "rules.conditions.frequency_result_cache",
+                tags={"tier": "local", "result": "hit"},
+                skip_internal=True,
+            )
+            return result
+
+        ttl = options.get("rules.frequency-result-cache-ttl")
+        if ttl:
+            result = cache.get(key)
+            metrics.incr(
+                "rules.conditions.frequency_result_cache",
+                tags={"tier": "shared", "result": "miss" if result is None else "hit"},
+                skip_internal=True,
+            )
+
+        if result is None:
+            result = query()
+            if ttl:
+                cache.set(key, result, ttl)
+
+        self._results[key] = result
+        return result
+
+
 class BaseEventFrequencyCondition(EventCondition, abc.ABC):
     intervals = standard_intervals
     form_cls = EventFrequencyForm
@@ -126,7 +168,12 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
             return False
 
         # TODO(mgaeta): Bug: Rule is optional.
-        current_value = self.get_rate(event, interval, self.rule.environment_id)  # type: ignore
+        current_value = self.get_rate(
+            event,
+            interval,
+            self.rule.environment_id,  # type: ignore
+            result_cache=state.frequency_results,
+        )
         logging.info(f"event_frequency_rule current: {current_value}, threshold: {value}")
         return current_value > value
 
@@ -173,13 +220,54 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         )
         return query_result
 
+    def _get_result_cache_key(
+        self, event: GroupEvent, duration: timedelta, offset: timedelta, environment_id: str
+    ) -> str:
+        return "r.c.freq:{}:{}:{}:{}:{}".format(
+            self.__class__.__name__,
+            event.group_id,
+            environment_id,
+            int(duration.total_seconds()),
+            int(offset.total_seconds()),
+        )
+
+    def query_cached(
+        self,
+        event: GroupEvent,
+        end: datetime,
+        duration: timedelta,
+        offset: timedelta,
+        environment_id: str,
+        result_cache: FrequencyResultCache | None = None,
+    ) -> int:
+        """
+        Returns the result of the query for the `duration` ending `offset`
+        before `end`, from `result_cache` if given.
+        """
+
+        def query() -> int:
+            return self.query(
+                event, end - offset - duration, end - offset, environment_id=environment_id
+            )
+
+        if result_cache is None:
+            return query()
+        cache_key = self._get_result_cache_key(event, duration, offset, environment_id)
+        return result_cache.get_or_query(cache_key, query)
+
     def query_hook(
         self, event: GroupEvent, start: datetime, end: datetime, environment_id: str
     ) -> int:
         """ """
         raise NotImplementedError  # subclass must implement
 
-    def get_rate(self, event: GroupEvent, interval: str, environment_id: str) -> int:
+    def get_rate(
+        self,
+        event: GroupEvent,
+        interval: str,
+        environment_id: str,
+        result_cache: FrequencyResultCache | None = None,
+    ) -> int:
         _, duration = self.intervals[interval]
         end = timezone.now()
         # For conditions with interval >= 1 hour we don't need to worry about read your writes
@@ -188,16 +276,19 @@ class BaseEventFrequencyCondition(EventCondition, abc.ABC):
         if duration >= timedelta(hours=1):
             option_override_cm = options_override({"consistent": False})
         with option_override_cm:
-            result: int = self.query(event, end - duration, end, environment_id=environment_id)
+            result: int = self.query_cached(
+                event, end, duration, timedelta(), environment_id, result_cache=result_cache
+            )
             comparison_type = self.get_option("comparisonType", COMPARISON_TYPE_COUNT)
             if comparison_type == COMPARISON_TYPE_PERCENT:
                 comparison_interval = comparison_intervals[self.get_option("comparisonInterval")][1]
-                comparison_end = end - comparison_interval
-                # TODO: Figure out if there's a way we can do this less frequently. All queries are
-                # automatically cached for 10s. We could consider trying to cache this and the main
-                # query for 20s to reduce the load.
-                comparison_result = self.query(
-                    event, comparison_end - duration, comparison_end, environment_id=environment_id
+                comparison_result = self.query_cached(
+                    event,
+                    end,
+                    duration,
+                    comparison_interval,
+                    environment_id,
+                    result_cache=result_cache,
                 )
                 result = percent_increase(result, comparison_result)
 
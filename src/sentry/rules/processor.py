@@ -1,23 +1,37 @@
 from __future__ import annotations
 
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
 from random import randrange
-from typing import Any, Callable, Iterable, List, Mapping, MutableMapping, Sequence, Set, Tuple
+from typing import Callable, Iterable, List, Mapping, MutableMapping, Sequence, Set, Tuple
 
+from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
 
-from sentry import analytics
+from sentry import analytics, options
 from sentry.eventstore.models import GroupEvent
 from sentry.models import Environment, GroupRuleStatus, Rule
-from sentry.rules import EventState, history, rules
+from sentry.rules import EventState, RuleBase, history, rules
+from sentry.rules.conditions.event_frequency import FrequencyResultCache
+from sentry.tasks.process_buffer import buffer_incr
 from sentry.types.rules import RuleFuture
-from sentry.utils.hashlib import hash_values
+from sentry.utils import json, metrics, redis
+from sentry.utils.dates import to_timestamp
+from sentry.utils.hashlib import hash_values, md5_text
+from sentry.utils.lru import OptionSizedLRUCache
+from sentry.utils.redis import RetryingRedisCluster
 from sentry.utils.safe import safe_execute
 
 SLOW_CONDITION_MATCHES = ["event_frequency"]
 
+set_last_active = redis.load_script("rules/set_last_active.lua")
+
+
+def get_redis_client() -> RetryingRedisCluster:
+    cluster_key = getattr(settings, "SENTRY_RULE_STATUS_REDIS_CLUSTER", "default")
+    return redis.redis_clusters.get(cluster_key)
+
 
 def get_match_function(match_name: str) -> Callable[..., bool] | None:
     if match_name == "all":
@@ -29,6 +43,65 @@ def get_match_function(match_name: str) -> Callable[..., bool] | None:
     return None
 
 
+class RulePlan:
+    """
+    The filters and conditions of a rule, instantiated once and ordered so that
+    cheap predicates run before slow ones.
+    """
+
+    def __init__(
+        self,
+        rule: Rule,
+        predicates: Sequence[Tuple[str, RuleBase | None]],
+        match_names: Mapping[str, str],
+    ) -> None:
+        self.rule = rule
+        # (name, predicate), where name is "filter" or "condition" and the predicate is None if
+        # it is not registered
+        self.predicates = predicates
+        # The match of every name that has predicates
+        self.match_names = match_names
+
+    def passes(self, event: GroupEvent, state: EventState) -> bool:
+        """
+        Returns whether the filters and conditions of the rule pass, evaluating
+        predicates only until the outcome is known.
+        """
+        # The matches of the names that are not decided yet
+        pending = dict(self.match_names)
+        for name, predicate in self.predicates:
+            match = pending.get(name)
+            if match is None:
+                continue
+
+            passes = predicate is not None and safe_execute(
+                predicate.passes, event, state, _with_transaction=False
+            )
+            if passes and match == "any":
+                del pending[name]
+            elif (not passes and match == "all") or (passes and match == "none"):
+                return False
+
+        return "any" not in pending.values()
+
+
+# Rule plans shared by all events processed in this process, keyed by the
+# project and the hash of its rules. Saving or deleting a rule clears the
+# cached rules of the project, so its plans are recompiled on the next event.
+_rule_plans = OptionSizedLRUCache("rules.processor.plan-cache-size")
+
+
+def _get_rules_hash(rules_: Sequence[Rule]) -> str:
+    return md5_text(
+        json.dumps(
+            [
+                [rule.id, rule.environment_id, rule.label, rule.date_added, rule.data]
+                for rule in rules_
+            ]
+        )
+    ).hexdigest()
+
+
 class RuleProcessor:
     logger = logging.getLogger("sentry.rules")
 
@@ -49,6 +122,7 @@ class RuleProcessor:
         self.is_new_group_environment = is_new_group_environment
         self.has_reappeared = has_reappeared
 
+        self.frequency_results = FrequencyResultCache()
         self.grouped_futures: MutableMapping[
             str, Tuple[Callable[[GroupEvent, Sequence[RuleFuture]], None], List[RuleFuture]]
         ] = {}
@@ -119,28 +193,99 @@ class RuleProcessor:
 
         return rule_statuses
 
-    def condition_matches(
-        self, condition: Mapping[str, Any], state: EventState, rule: Rule
-    ) -> bool | None:
-        condition_cls = rules.get(condition["id"])
-        if condition_cls is None:
-            self.logger.warning("Unregistered condition %r", condition["id"])
-            return None
-
-        condition_inst = condition_cls(self.project, data=condition, rule=rule)
-        passes: bool = safe_execute(
-            condition_inst.passes, self.event, state, _with_transaction=False
+    def compile_rule(self, rule: Rule) -> RulePlan:
+        predicates = []
+        for predicate in rule.data.get("conditions", ()):
+            predicate_cls = rules.get(predicate["id"])
+            if predicate_cls is None:
+                self.logger.warning("Unregistered condition or filter %r", predicate["id"])
+                predicates.append((False, "filter", None))
+                continue
+
+            is_slow = any(match in predicate["id"] for match in SLOW_CONDITION_MATCHES)
+            name = "condition" if predicate_cls.rule_type == "condition/event" else "filter"
+            predicate_inst = predicate_cls(self.project, data=predicate, rule=rule)
+            predicates.append((is_slow, name, predicate_inst))
+
+        # Sort predicates so that the most expensive ones run last, and filters before
+        # conditions otherwise.
+        predicates.sort(key=lambda item: (item[0], item[1] == "condition"))
+
+        match_names = {
+            "filter": rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH,
+            "condition": rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH,
+        }
+        return RulePlan(
+            rule,
+            [(name, predicate_inst) for _, name, predicate_inst in predicates],
+            {name: match_names[name] for _, name, _ in predicates},
         )
-        return passes
 
-    def get_rule_type(self, condition: Mapping[str, Any]) -> str | None:
-        rule_cls = rules.get(condition["id"])
-        if rule_cls is None:
-            self.logger.warning("Unregistered condition or filter %r", condition["id"])
-            return None
+    def get_rule_plans(self) -> Sequence[RulePlan]:
+        """
+        Get the compiled rules of this project, from the plans shared by all events of
+        the project in this process if enabled.
+        """
+        rules_ = self.get_rules()
+        if not _rule_plans.enabled():
+            return [self.compile_rule(rule) for rule in rules_]
+
+        cache_key = (self.project.id, _get_rules_hash(rules_))
+        plans: Sequence[RulePlan] | None = _rule_plans.get(cache_key)
+        metrics.incr(
+            "rules.processor.rule_plans_cache",
+            tags={"result": "miss" if plans is None else "hit"},
+            skip_internal=True,
+        )
+        if plans is None:
+            plans = [self.compile_rule(rule) for rule in rules_]
+            _rule_plans.set(cache_key, plans)
+        return plans
+
+    def _build_last_active_key(self, rule_id: int) -> str:
+        return f"grouprulestatus:last_active:{self.group.id}:{rule_id}"
+
+    def update_last_active(
+        self, status: GroupRuleStatus, now: datetime, freq_offset: datetime, frequency: int
+    ) -> bool:
+        """
+        Sets the time the rule of `status` last fired to `now`, unless it
+        fired after `freq_offset` already. Returns whether it was set, only
+        one of many concurrent events can set it.
+
+        With buffered rule statuses the time is set in Redis and written to
+        the database through the buffer.
+        """
+        if not options.get("rules.processor.buffered-rule-status"):
+            updated = (
+                GroupRuleStatus.objects.filter(id=status.id)
+                .exclude(last_active__gt=freq_offset)
+                .update(last_active=now)
+            )
+            return bool(updated)
+
+        # The key only has to outlive the frequency of the rule, any time before
+        # that passes the check.
+        updated = set_last_active(
+            get_redis_client(),
+            [self._build_last_active_key(status.rule_id)],
+            [
+                to_timestamp(now),
+                to_timestamp(freq_offset),
+                to_timestamp(status.last_active) if status.last_active else 0,
+                frequency * 60,
+            ],
+        )
+        if not updated:
+            return False
 
-        rule_type: str = rule_cls.rule_type
-        return rule_type
+        buffer_incr(
+            model=GroupRuleStatus,
+            columns={},
+            filters={"id": status.id},
+            extra={"last_active": now},
+        )
+        return True
 
     def get_state(self) -> EventState:
         return EventState(
@@ -148,18 +293,17 @@ class RuleProcessor:
             is_regression=self.is_regression,
             is_new_group_environment=self.is_new_group_environment,
             has_reappeared=self.has_reappeared,
+            frequency_results=self.frequency_results,
         )
 
-    def apply_rule(self, rule: Rule, status: GroupRuleStatus) -> None:
+    def apply_rule(self, plan: RulePlan, status: GroupRuleStatus) -> None:
         """
         If all conditions and filters pass, execute every action.
 
-        :param rule: `Rule` object
+        :param plan: `RulePlan` of the rule
         :return: void
         """
-        condition_match = rule.data.get("action_match") or Rule.DEFAULT_CONDITION_MATCH
-        filter_match = rule.data.get("filter_match") or Rule.DEFAULT_FILTER_MATCH
-        rule_condition_list = rule.data.get("conditions", ())
+        rule = plan.rule
         frequency = rule.data.get("frequency") or Rule.DEFAULT_FREQUENCY
 
         try:
@@ -175,47 +319,15 @@ class RuleProcessor:
         if status.last_active and status.last_active > freq_offset:
             return
 
-        state = self.get_state()
-
-        condition_list = []
-        filter_list = []
-        for rule_cond in rule_condition_list:
-            if self.get_rule_type(rule_cond) == "condition/event":
-                condition_list.append(rule_cond)
-            else:
-                filter_list.append(rule_cond)
-
-        # Sort `condition_list` so that most expensive conditions run last.
-        condition_list.sort(
-            key=lambda condition: any(
-                condition_match in condition["id"] for condition_match in SLOW_CONDITION_MATCHES
-            )
-        )
-
-        for predicate_list, match, name in (
-            (filter_list, filter_match, "filter"),
-            (condition_list, condition_match, "condition"),
-        ):
-            if not predicate_list:
-                continue
-            predicate_iter = (self.condition_matches(f, state, rule) for f in predicate_list)
-            predicate_func = get_match_function(match)
-            if predicate_func:
-                if not predicate_func(predicate_iter):
-                    return
-            else:
-                self.logger.error(
-                    f"Unsupported {name}_match {match!r} for rule {rule.id}", filter_match, rule.id
-                )
+        for name, match in plan.match_names.items():
+            if get_match_function(match) is None:
+                self.logger.error(f"Unsupported {name}_match {match!r} for rule {rule.id}")
                 return
 
-        updated = (
-            GroupRuleStatus.objects.filter(id=status.id)
-            .exclude(last_active__gt=freq_offset)
-            .update(last_active=now)
-        )
+        if not plan.passes(self.event, self.get_state()):
+            return
 
-        if not updated:
+        if not self.update_last_active(status, now, freq_offset, frequency):
             return
 
         if randrange(10) == 0:
@@ -263,9 +375,9 @@ class RuleProcessor:
             return {}.values()
 
         self.grouped_futures.clear()
-        rules = self.get_rules()
-        rule_statuses = self.bulk_get_rule_status(rules)
-        for rule in rules:
-            self.apply_rule(rule, rule_statuses[rule.id])
+        plans = self.get_rule_plans()
+        rule_statuses = self.bulk_get_rule_status([plan.rule for plan in plans])
+        for plan in plans:
+            self.apply_rule(plan, rule_statuses[plan.rule.id])
 
         return self.grouped_futures.values()
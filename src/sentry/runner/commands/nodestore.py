@@ -0,0 +1,85 @@
+import os
+import random
+from collections import defaultdict
+
+import click
+
+from sentry.runner.decorators import configuration
+
+
+@click.group()
+def nodestore():
+    """Tools for managing node storage."""
+
+
+@nodestore.command("train-dictionaries")
+@click.argument("path", type=click.Path(exists=True, file_okay=False))
+@click.argument("output", type=click.Path(file_okay=False))
+@click.option("--version", type=click.INT, required=True, help="Version of the new dictionaries.")
+@click.option("--sample-size", default=10000, help="Maximum number of nodes to sample.")
+@click.option("--dict-size", default=112640, help="Maximum dictionary size in bytes.")
+@click.option(
+    "--min-samples",
+    default=100,
+    help="Platforms with fewer samples are folded into the default dictionary.",
+)
+@configuration
+def train_dictionaries(path, output, version, sample_size, dict_size, min_samples):
+    """
+    Train zstd dictionaries for nodestore payloads.
+
+    Samples nodes from the filesystem nodestore at PATH, groups them by event
+    platform and writes one dictionary per platform to OUTPUT, to be used with
+    the ZstdDictionaryCodec. Existing dictionaries in OUTPUT are left in place
+    since they are still needed to read nodes written with them.
+    """
+    import zstandard
+
+    from sentry.nodestore.base import SEGMENTS_HEADER, NodeStorage
+    from sentry.nodestore.codecs import DEFAULT_PLATFORM, get_dictionary_filename, get_dictionary_id
+
+    filenames = [f for f in os.listdir(path) if f.endswith(".json")]
+    if len(filenames) > sample_size:
+        filenames = random.sample(filenames, sample_size)
+
+    # Decode with the configured codec so that nodes written with an
+    # existing dictionary are sampled in their uncompressed form.
+    ns = NodeStorage()
+
+    samples = defaultdict(list)
+    for filename in filenames:
+        with open(os.path.join(path, filename), "rb") as f:
+            value = f.read()
+        if value.startswith(SEGMENTS_HEADER):
+            # Segments are passed through the codec one by one, so each of
+            # them is a sample of its own.
+            main = ns._decode_segment(value, subkey=None)
+            payloads = [
+                ns.codec.decode(segment.tobytes()) for _, segment in ns._iter_segments(value)
+            ]
+        else:
+            payloads = [ns.codec.decode(value)]
+            main = ns._decode_payload(payloads[0], subkey=None)
+        platform = main.get("platform") if isinstance(main, dict) else None
+        samples[platform or DEFAULT_PLATFORM].extend(payloads)
+
+    for platform, payloads in list(samples.items()):
+        if platform != DEFAULT_PLATFORM and len(payloads) < min_samples:
+            samples[DEFAULT_PLATFORM].extend(samples.pop(platform))
+
+    os.makedirs(output, exist_ok=True)
+    for platform, payloads in sorted(samples.items()):
+        if len(payloads) < min_samples:
+            click.echo(f"Skipping {platform}: only {len(payloads)} samples", err=True)
+            continue
+
+        filename = os.path.join(output, get_dictionary_filename(platform, version))
+        if os.path.exists(filename):
+            raise click.ClickException(f"{filename} already exists, pick a new --version.")
+
+        dictionary = zstandard.train_dictionary(
+            dict_size, payloads, dict_id=get_dictionary_id(platform, version)
+        )
+        with open(filename, "wb") as f:
+            f.write(dictionary.as_bytes())
+        click.echo(f"Wrote {filename} from {len(payloads)} samples")
@@ -0,0 +1,19 @@
+-- Set the time an alert rule last fired for a group, unless it already fired
+-- after the given cutoff.
+assert(#KEYS == 1, "provide exactly one last active key")
+assert(#ARGV == 4, "provide the current time, a cutoff, a fallback last active time and a TTL")
+
+local key = KEYS[1]
+local now = ARGV[1]
+local cutoff = tonumber(ARGV[2])
+local ttl = ARGV[4]
+
+-- The fallback is the time stored in the database, for groups whose rule has
+-- not fired since the key expired.
+local last_active = tonumber(redis.call("GET", key) or ARGV[3])
+if last_active > cutoff then
+    return 0
+end
+
+redis.call("SET", key, now, "EX", ttl)
+return 1
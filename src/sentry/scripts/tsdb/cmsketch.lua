@@ -53,6 +53,15 @@ To query the top 10 items from the first sketch:
 
     EVALSHA $SHA 2 1:i 1:e RANKED 5 64 50 10
 
+Several commands can be evaluated in one script call with BATCH. Each command
+is preceded by the number of keys and the number of arguments (including the
+command name and sketch parameters) that it takes, and the keys for all
+commands are concatenated in order. The result is a sequence containing the
+result of each command. To query the top 10 items from the first sketch and
+estimate "foo" in the second one:
+
+    EVALSHA $SHA 4 1:i 1:e 2:i 2:e BATCH 2 5 RANKED 5 64 50 10 2 5 ESTIMATE 5 64 50 foo
+
 ]]--
 
 --[[ Helpers ]]--
@@ -201,7 +210,8 @@ function Sketch:coordinates(value)
 end
 
 function Sketch:exists()
-    return redis.call('EXISTS', self.index)
+    -- ``EXISTS`` returns an integer, and 0 is truthy in Lua.
+    return redis.call('EXISTS', self.index) == 1
 end
 
 function Sketch:observations(coordinates)
@@ -469,7 +479,7 @@ function Router:new(commands)
 end
 
 
-return Router:new({
+local router = Router:new({
 
     --[[
     Increment the number of observations for each item in all sketches.
@@ -646,4 +656,39 @@ return Router:new({
         end
     ),
 
-})(KEYS, ARGV)
+})
+
+
+local function slice(t, start, length)
+    local result = {}
+    for i = 1, length do
+        result[i] = t[start + i - 1]
+    end
+    return result
+end
+
+
+local function batch(keys, arguments)
+    local results = {}
+    local k = 1
+    local a = 2  -- skip the BATCH command name
+    while a <= #arguments do
+        local key_count = tonumber(arguments[a])
+        local argument_count = tonumber(arguments[a + 1])
+        a = a + 2
+        table.insert(
+            results,
+            router(slice(keys, k, key_count), slice(arguments, a, argument_count))
+        )
+        k = k + key_count
+        a = a + argument_count
+    end
+    return results
+end
+
+
+if ARGV[1]:upper() == 'BATCH' then
+    return batch(KEYS, ARGV)
+end
+
+return router(KEYS, ARGV)
@@ -9,6 +9,7 @@ from sentry.ratelimits.cardinality import (
     CardinalityLimiter,
     GrantedQuota,
     Quota,
+    RedisBloomCardinalityLimiter,
     RedisCardinalityLimiter,
     RequestedQuota,
     Timestamp,
@@ -159,9 +160,13 @@ class TimeseriesCardinalityLimiterFactory:
     def get_ratelimiter(self, config: MetricsIngestConfiguration) -> TimeseriesCardinalityLimiter:
         namespace = config.cardinality_limiter_namespace
         if namespace not in self.rate_limiters:
-            limiter = TimeseriesCardinalityLimiter(
-                namespace, RedisCardinalityLimiter(**config.cardinality_limiter_cluster_options)
-            )
+            options = dict(config.cardinality_limiter_cluster_options)
+            backend: CardinalityLimiter
+            if options.pop("bloom_filters", False):
+                backend = RedisBloomCardinalityLimiter(**options)
+            else:
+                backend = RedisCardinalityLimiter(**options)
+            limiter = TimeseriesCardinalityLimiter(namespace, backend)
             self.rate_limiters[namespace] = limiter
 
         return self.rate_limiters[namespace]
@@ -1,10 +1,13 @@
 import logging
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import sentry_sdk
 from django.utils import timezone
+from sentry_sdk import Hub
 
+from sentry import options
 from sentry.models import Project, Release
 from sentry.stacktraces.functions import set_in_app, trim_function_name
 from sentry.utils.cache import cache
@@ -62,9 +65,9 @@ class ProcessableFrame:
             return
         return self.processable_frames[last_idx]
 
-    def set_cache_value(self, value):
+    def set_cache_value(self, value, timeout=3600):
         if self.cache_key is not None:
-            cache.set(self.cache_key, value, 3600)
+            cache.set(self.cache_key, value, timeout)
             return True
         return False
 
@@ -73,11 +76,60 @@ class ProcessableFrame:
             self.cache_key = None
             return
 
-        h = hash_values(values, seed=self.processor.__class__.__name__)
+        try:
+            h = hash_values(values, seed=self.processor.__class__.__name__)
+        except TypeError:
+            # Values that cannot be hashed (such as floats in frame vars)
+            # leave the frame uncached.
+            self.cache_key = None
+            return
         self.cache_key = rv = "pf:%s" % h
         return rv
 
 
+def _diff_frame(frame, new_frame):
+    changed = {key: value for key, value in new_frame.items() if frame.get(key) != value}
+    removed = [key for key in frame if key not in new_frame]
+    return changed, removed
+
+
+def _apply_frame_diff(frame, diff):
+    changed, removed = diff
+    new_frame = dict(frame, **changed)
+    for key in removed:
+        new_frame.pop(key, None)
+    return new_frame
+
+
+def compact_frame_result(frame, result):
+    """Turns the ``(frames, raw_frames, errors)`` result of `process_frame`
+    for `frame` into a compact value for the frame cache.  Only the fields
+    that differ from `frame` are stored, which makes it necessary that the
+    cache key covers all fields of `frame`.
+    """
+    processed_frames, raw_frames, errors = result or (None, None, None)
+    return (
+        None
+        if processed_frames is None
+        else [_diff_frame(frame, new_frame) for new_frame in processed_frames],
+        None if raw_frames is None else [_diff_frame(frame, raw) for raw in raw_frames],
+        errors or None,
+    )
+
+
+def expand_frame_result(frame, value):
+    """Restores the result of `process_frame` for `frame` from a value
+    created by `compact_frame_result`."""
+    processed_diffs, raw_diffs, errors = value
+    return (
+        None
+        if processed_diffs is None
+        else [_apply_frame_diff(frame, diff) for diff in processed_diffs],
+        None if raw_diffs is None else [_apply_frame_diff(frame, diff) for diff in raw_diffs],
+        list(errors or ()),
+    )
+
+
 class StacktraceProcessingTask:
     def __init__(self, processable_stacktraces, processors):
         self.processable_stacktraces = processable_stacktraces
@@ -101,6 +153,11 @@ class StacktraceProcessingTask:
 
 
 class StacktraceProcessor:
+    #: Set to `True` if `process_frame` can be called for the frames of
+    #: different stacktraces from several threads at once.  It still runs
+    #: after `preprocess_step` and `process_exception` have completed.
+    supports_concurrent_processing = False
+
     def __init__(self, data, stacktrace_infos, project=None):
         self.data = data
         self.stacktrace_infos = stacktrace_infos
@@ -441,10 +498,9 @@ def get_crash_frame_from_event_data(data, frame_filter=None):
 
 
 def lookup_frame_cache(keys):
-    rv = {}
-    for key in keys:
-        rv[key] = cache.get(key)
-    return rv
+    if not keys:
+        return {}
+    return cache.get_many(list(keys))
 
 
 def get_stacktrace_processing_task(infos, processors):
@@ -489,6 +545,53 @@ def dedup_errors(errors):
     return rv
 
 
+def _process_single_stacktrace_in_span(processing_task, stacktrace_info, processable_frames):
+    with sentry_sdk.start_span(
+        op="stacktraces.processing.process_stacktraces.process_single_stacktrace"
+    ) as span:
+        rv = process_single_stacktrace(processing_task, stacktrace_info, processable_frames)
+        if rv[0] is not None:
+            span.set_data("data_changed", True)
+    return rv
+
+
+def get_stacktrace_thread_pool_size(processing_task, stacktraces):
+    """Returns the number of threads to process the given stacktraces with.
+    Stacktraces are only processed concurrently if there is more than one of
+    them and all processors of the task support it.
+    """
+    if len(stacktraces) < 2:
+        return 1
+    for processor in processing_task.iter_processors():
+        if not processor.supports_concurrent_processing:
+            return 1
+    return max(1, min(options.get("processing.stacktrace-thread-pool-size"), len(stacktraces)))
+
+
+def process_independent_stacktraces(processing_task, stacktraces):
+    """Runs `process_single_stacktrace` for every ``(stacktrace_info,
+    processable_frames)`` pair and returns the results in the same order,
+    regardless of whether they were processed on a thread pool.
+    """
+    pool_size = get_stacktrace_thread_pool_size(processing_task, stacktraces)
+    if pool_size <= 1:
+        return [
+            _process_single_stacktrace_in_span(processing_task, stacktrace_info, frames)
+            for stacktrace_info, frames in stacktraces
+        ]
+
+    hub = Hub.current
+
+    def _process(stacktrace):
+        stacktrace_info, frames = stacktrace
+        with Hub(hub):
+            return _process_single_stacktrace_in_span(processing_task, stacktrace_info, frames)
+
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        # `map` yields results in the order of its input.
+        return list(executor.map(_process, stacktraces))
+
+
 def process_stacktraces(data, make_processors=None, set_raw_stacktrace=True):
     infos = find_stacktraces_in_data(data, with_exceptions=True)
     if make_processors is None:
@@ -517,9 +620,9 @@ def process_stacktraces(data, make_processors=None, set_raw_stacktrace=True):
                     changed = True
                     span.set_data("data_changed", True)
 
-        # Process all stacktraces
+        # Let the stacktrace processors touch the exceptions
+        stacktraces = []
         for stacktrace_info, processable_frames in processing_task.iter_processable_stacktraces():
-            # Let the stacktrace processors touch the exception
             if stacktrace_info.is_exception and stacktrace_info.container:
                 for processor in processing_task.iter_processors():
                     with sentry_sdk.start_span(
@@ -531,18 +634,15 @@ def process_stacktraces(data, make_processors=None, set_raw_stacktrace=True):
                             span.set_data("data_changed", True)
 
             # If the stacktrace is empty we skip it for processing
-            if not stacktrace_info.stacktrace:
-                continue
-            with sentry_sdk.start_span(
-                op="stacktraces.processing.process_stacktraces.process_single_stacktrace"
-            ) as span:
-                new_frames, new_raw_frames, errors = process_single_stacktrace(
-                    processing_task, stacktrace_info, processable_frames
-                )
-                if new_frames is not None:
-                    stacktrace_info.stacktrace["frames"] = new_frames
-                    changed = True
-                    span.set_data("data_changed", True)
+            if stacktrace_info.stacktrace:
+                stacktraces.append((stacktrace_info, processable_frames))
+
+        # Process all stacktraces
+        results = process_independent_stacktraces(processing_task, stacktraces)
+        for (stacktrace_info, _), (new_frames, new_raw_frames, errors) in zip(stacktraces, results):
+            if new_frames is not None:
+                stacktrace_info.stacktrace["frames"] = new_frames
+                changed = True
             if (
                 set_raw_stacktrace
                 and new_raw_frames is not None
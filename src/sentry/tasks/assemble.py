@@ -15,10 +15,12 @@ from sentry.db.models.fields import uuid
 from sentry.models import File, Organization, Release, ReleaseFile
 from sentry.models.artifactbundle import (
     ArtifactBundle,
+    ArtifactBundleArchive,
     DebugIdArtifactBundle,
     ProjectArtifactBundle,
     ReleaseArtifactBundle,
     SourceFileType,
+    cache_artifact_bundle_index,
 )
 from sentry.models.releasefile import ReleaseArchive, update_artifact_index
 from sentry.tasks.base import instrumented_task
@@ -350,12 +352,28 @@ def _create_artifact_bundle(
                 )
 
             _remove_duplicate_artifact_bundles(artifact_bundle, bundle_id)
+            _index_artifact_bundle(artifact_bundle, archive_file)
         else:
             raise AssembleArtifactsError(
                 "uploading a bundle without debug ids or release is prohibited"
             )
 
 
+def _index_artifact_bundle(artifact_bundle: ArtifactBundle, archive_file: File):
+    if not options.get("processing.artifact-bundle-index-ttl"):
+        return
+
+    # The index only saves work when reading the bundle, it must never fail the upload.
+    try:
+        archive = ArtifactBundleArchive(archive_file.getfile(), build_memory_map=False)
+        try:
+            cache_artifact_bundle_index(artifact_bundle.id, archive)
+        finally:
+            archive.close()
+    except Exception as exc:
+        logger.error("Unable to index artifact bundle", exc_info=exc)
+
+
 def handle_assemble_for_release_file(bundle, archive, organization, version):
     manifest = archive.manifest
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from contextlib import nullcontext
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING, List, Mapping, Optional, Sequence, Tuple, TypedDict, Union
 
@@ -8,7 +9,7 @@ import sentry_sdk
 from django.conf import settings
 from django.utils import timezone
 
-from sentry import features
+from sentry import features, options
 from sentry.exceptions import PluginError
 from sentry.issues.grouptype import GroupCategory
 from sentry.issues.issue_occurrence import IssueOccurrence
@@ -34,6 +35,8 @@ logger = logging.getLogger(__name__)
 locks = LockManager(build_instance_from_options(settings.SENTRY_POST_PROCESS_LOCKS_BACKEND_OPTIONS))
 
 ISSUE_OWNERS_PER_PROJECT_PER_MIN_RATELIMIT = 50
+# Seconds an event waits for the owners of its group to be evaluated by another event.
+ISSUE_OWNERS_EVALUATION_WAIT = 5
 
 
 class PostProcessJob(TypedDict, total=False):
@@ -144,6 +147,10 @@ def should_issue_owners_ratelimit(project_id, group_id):
     return len(groups) > ISSUE_OWNERS_PER_PROJECT_PER_MIN_RATELIMIT
 
 
+def record_skipped_owner_work(stage, reason):
+    metrics.incr("post_process.owner_assignment.skipped", tags={"stage": stage, "reason": reason})
+
+
 def handle_owner_assignment(job):
     if job["is_reprocessed"]:
         return
@@ -232,37 +239,61 @@ def handle_owner_assignment(job):
                         metrics.incr("sentry.tasks.post_process.handle_owner_assignment.debounce")
                         return
 
-                with metrics.timer("post_process.process_owner_assignments.duration"):
-                    with sentry_sdk.start_span(
-                        op="post_process.handle_owner_assignment.get_issue_owners"
-                    ):
-                        if killswitch_matches_context(
-                            "post_process.get-autoassign-owners",
-                            {
-                                "project_id": project.id,
-                            },
-                        ):
-                            # see ProjectOwnership.get_issue_owners
-                            issue_owners = []
-                        else:
-
-                            issue_owners = ProjectOwnership.get_issue_owners(project.id, event.data)
+                coalesce_window = options.get("post_process.owner-assignment-coalesce-window")
+
+                evaluation_lock = nullcontext()
+                if coalesce_window:
+                    # Only one event of a group evaluates its owners at a time, the
+                    # others wait for it and then find the debounce key set.
+                    try:
+                        evaluation_lock = locks.get(
+                            f"issue_owners_evaluation:{group.id}",
+                            duration=10,
+                            name="issue_owners_evaluation",
+                        ).blocking_acquire(0.05, ISSUE_OWNERS_EVALUATION_WAIT)
+                    except UnableToAcquireLock:
+                        record_skipped_owner_work("issue_owners", "in_flight")
+                        return
 
-                            # Cache for 1 day after we calculated. We don't need to move that fast.
-                            cache.set(
-                                issue_owners_key,
-                                True,
-                                ISSUE_OWNERS_DEBOUNCE_DURATION,
-                            )
+                with evaluation_lock:
+                    if coalesce_window and cache.get(issue_owners_key):
+                        record_skipped_owner_work("issue_owners", "coalesced")
+                        return
 
-                    with sentry_sdk.start_span(
-                        op="post_process.handle_owner_assignment.handle_group_owners"
-                    ):
-                        if issue_owners:
-                            try:
-                                handle_group_owners(project, group, issue_owners)
-                            except Exception:
-                                logger.exception("Failed to store group owners")
+                    with metrics.timer("post_process.process_owner_assignments.duration"):
+                        with sentry_sdk.start_span(
+                            op="post_process.handle_owner_assignment.get_issue_owners"
+                        ):
+                            if killswitch_matches_context(
+                                "post_process.get-autoassign-owners",
+                                {
+                                    "project_id": project.id,
+                                },
+                            ):
+                                # see ProjectOwnership.get_issue_owners
+                                issue_owners = []
+                            else:
+
+                                issue_owners = ProjectOwnership.get_issue_owners(
+                                    project.id, event.data
+                                )
+
+                                # Cache for 1 day after we calculated. We don't need to move
+                                # that fast.
+                                cache.set(
+                                    issue_owners_key,
+                                    True,
+                                    ISSUE_OWNERS_DEBOUNCE_DURATION,
+                                )
+
+                        with sentry_sdk.start_span(
+                            op="post_process.handle_owner_assignment.handle_group_owners"
+                        ):
+                            if issue_owners:
+                                try:
+                                    handle_group_owners(project, group, issue_owners)
+                                except Exception:
+                                    logger.exception("Failed to store group owners")
 
         except Exception:
             logger.exception("Failed to handle owner assignments")
@@ -274,7 +305,12 @@ def handle_group_owners(project, group, issue_owners):
     `GroupOwner` model, and handles any diffing/changes of which owners we're keeping.
     :return:
     """
-    from sentry.models.groupowner import GroupOwner, GroupOwnerType, OwnerRuleType
+    from sentry.models.groupowner import (
+        AUTO_ASSIGNMENT_DEBOUNCE_KEY,
+        GroupOwner,
+        GroupOwnerType,
+        OwnerRuleType,
+    )
     from sentry.models.team import Team
     from sentry.models.user import User
     from sentry.services.hybrid_cloud.user import RpcUser
@@ -354,6 +390,9 @@ def handle_group_owners(project, group, issue_owners):
             if new_group_owners:
                 GroupOwner.objects.bulk_create(new_group_owners)
 
+            # Let the next event auto-assign the group to its new owners.
+            cache.delete(AUTO_ASSIGNMENT_DEBOUNCE_KEY(group.id))
+
     except UnableToAcquireLock:
         pass
 
@@ -870,9 +909,19 @@ def handle_auto_assignment(job: PostProcessJob) -> None:
     if job["is_reprocessed"]:
         return
 
-    from sentry.models import ProjectOwnership
+    from sentry.models import AUTO_ASSIGNMENT_DEBOUNCE_KEY, ProjectOwnership
 
     event = job["event"]
+
+    # The outcome only changes with the owners or the assignee of the group,
+    # which clear the debounce key, so one event per window is enough.
+    coalesce_window = options.get("post_process.owner-assignment-coalesce-window")
+    if coalesce_window and not cache.add(
+        AUTO_ASSIGNMENT_DEBOUNCE_KEY(event.group_id), True, coalesce_window
+    ):
+        record_skipped_owner_work("auto_assignment", "debounced")
+        return
+
     try:
         with metrics.timer("post_process.handle_auto_assignment.duration"):
             ProjectOwnership.handle_auto_assignment(event.project.id, event)
@@ -0,0 +1,23 @@
+import logging
+
+from sentry.tasks.base import instrumented_task
+from sentry.utils.locking import UnableToAcquireLock
+
+logger = logging.getLogger(__name__)
+
+
+@instrumented_task(name="sentry.tasks.tsdb.compact_distinct_counts", queue="tsdb")
+def compact_distinct_counts():
+    """
+    Fold closed distinct counter intervals into compacted rollups.
+    """
+    from sentry import tsdb
+    from sentry.locks import locks
+
+    lock = locks.get("tsdb:compact-distinct-counts", duration=60, name="compact_distinct_counts")
+
+    try:
+        with lock.acquire():
+            tsdb.compact_distinct_counts()
+    except UnableToAcquireLock as error:
+        logger.warning("compact_distinct_counts.fail", extra={"error": error})
@@ -8,6 +8,7 @@ from django.db import transaction
 from sentry import eventstore, similarity, tsdb
 from sentry.constants import DEFAULT_LOGGER_NAME, LOG_LEVELS_MAP
 from sentry.event_manager import generate_culprit
+from sentry.grouping.grouphash_cache import invalidate_grouphashes
 from sentry.models import (
     Activity,
     Environment,
@@ -450,7 +451,9 @@ def lock_hashes(project_id, source_id, fingerprints):
             state=GroupHash.State.LOCKED_IN_MIGRATION
         )
 
-    return [h.hash for h in eligible_hashes]
+    locked_hashes = [h.hash for h in eligible_hashes]
+    invalidate_grouphashes(project_id, locked_hashes)
+    return locked_hashes
 
 
 def unlock_hashes(project_id, locked_primary_hashes):
@@ -459,6 +462,7 @@ def unlock_hashes(project_id, locked_primary_hashes):
         hash__in=locked_primary_hashes,
         state=GroupHash.State.LOCKED_IN_MIGRATION,
     ).update(state=GroupHash.State.UNLOCKED)
+    invalidate_grouphashes(project_id, locked_primary_hashes)
 
 
 @instrumented_task(name="sentry.tasks.unmerge", queue="unmerge")
@@ -139,6 +139,7 @@ class BaseTSDB(Service):
     __all__ = (
         frozenset(
             [
+                "compact_distinct_counts",
                 "get_earliest_timestamp",
                 "get_optimal_rollup",
                 "get_optimal_rollup_series",
@@ -498,6 +499,13 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def compact_distinct_counts(self, timestamp=None):
+        """
+        Fold distinct counters of closed intervals into the coarser rollups
+        that are precomputed from them. This is a no-op for backends that
+        don't precompute any rollups.
+        """
+
     def record_frequency_multi(self, requests, timestamp=None, environment_id=None):
         """
         Record items in a frequency table.
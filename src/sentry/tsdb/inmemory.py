@@ -1,11 +1,182 @@
-from collections import Counter, defaultdict
+import struct
+from collections import defaultdict
 
 from django.utils import timezone
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.tsdb.redis import RedisTSDB
 from sentry.utils.dates import to_datetime, to_timestamp
 
 
+def mmh3(key, seed):
+    """
+    32-bit MurmurHash3 of ``key`` (bytes), returned as a signed integer to
+    match the implementation in ``cmsketch.lua``.
+    """
+    c1 = 0xCC9E2D51
+    c2 = 0x1B873593
+
+    def rotl(x, r):
+        return ((x << r) | (x >> (32 - r))) & 0xFFFFFFFF
+
+    hash = seed & 0xFFFFFFFF
+    remainder = len(key) % 4
+
+    for i in range(0, len(key) - remainder, 4):
+        (k,) = struct.unpack_from("<I", key, i)
+        k = rotl((k * c1) & 0xFFFFFFFF, 15)
+        hash ^= (k * c2) & 0xFFFFFFFF
+        hash = rotl(hash, 13)
+        hash = (hash * 5 + 0xE6546B64) & 0xFFFFFFFF
+
+    if remainder:
+        k = int.from_bytes(key[len(key) - remainder :], "little")
+        k = rotl((k * c1) & 0xFFFFFFFF, 15)
+        hash ^= (k * c2) & 0xFFFFFFFF
+
+    hash ^= len(key)
+    hash ^= hash >> 16
+    hash = (hash * 0x85EBCA6B) & 0xFFFFFFFF
+    hash ^= hash >> 13
+    hash = (hash * 0xC2B2AE35) & 0xFFFFFFFF
+    hash ^= hash >> 16
+
+    return hash - (1 << 32) if hash & 0x80000000 else hash
+
+
+class CountMinSketch:
+    """
+    An in-memory port of the Count-Min sketch with a top-N index implemented
+    in ``cmsketch.lua``, returning the same results as the Redis version for
+    the same sequence of operations. The index mirrors a Redis sorted set and
+    the estimates mirror the estimation matrix hash.
+    """
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.index = {}
+        self.estimates = {}
+
+    def exists(self):
+        return bool(self.index)
+
+    def ranked_index(self):
+        # Sorted set order: ascending by score, then by member bytes.
+        return sorted(self.index.items(), key=lambda item: (item[1], item[0].encode("utf-8")))
+
+    def trim(self):
+        capacity = self.parameters.capacity
+        if len(self.index) > capacity:
+            for member, _ in self.ranked_index()[: len(self.index) - capacity]:
+                del self.index[member]
+
+    def coordinates(self, value):
+        value = value.encode("utf-8")
+        return [
+            (d, mmh3(value, d) % self.parameters.width + 1)
+            for d in range(1, self.parameters.depth + 1)
+        ]
+
+    def observations(self, coordinates):
+        return self.estimates.get(coordinates, 0.0)
+
+    def estimate(self, value):
+        if not self.exists():
+            return 0.0
+        score = self.index.get(value)
+        if score is not None:
+            return score
+        return min(self.observations(c) for c in self.coordinates(value))
+
+    def update_estimates(self, coordinates, estimates, score):
+        for c, estimate in zip(coordinates, estimates):
+            update = max(score, estimate)
+            if estimate != update:
+                self.estimates[c] = update
+
+    def increment(self, items):
+        capacity = self.parameters.capacity
+        usage = len(self.index)
+        if capacity > usage:
+            added = 0
+            for value, delta in items:
+                score = self.index[value] = self.index.get(value, 0.0) + delta
+                if score == delta:
+                    added += 1
+
+            if added + usage >= capacity:
+                for value, score in self.ranked_index():
+                    coordinates = self.coordinates(value)
+                    estimates = [self.observations(c) for c in coordinates]
+                    self.update_estimates(coordinates, estimates, score)
+                self.trim()
+        else:
+            results = []
+            for value, delta in items:
+                coordinates = self.coordinates(value)
+                estimates = [self.observations(c) for c in coordinates]
+                score = self.index[value] if value in self.index else min(estimates)
+                score += delta
+                self.update_estimates(coordinates, estimates, score)
+                results.append(score)
+
+            if capacity > 0:
+                added = 0
+                minimum = self.ranked_index()[0][1]
+                for (value, _), score in zip(items, results):
+                    if score > minimum:
+                        added += value not in self.index
+                        self.index[value] = score
+
+                if added > 0:
+                    self.trim()
+
+    def merge(self, source):
+        if not source.exists():
+            return
+
+        if not source.estimates:
+            self.increment(source.ranked_index())
+            return
+
+        if not self.estimates:
+            for value, score in self.index.items():
+                for c in self.coordinates(value):
+                    if score > self.observations(c):
+                        self.estimates[c] = score
+
+        for c, value in source.estimates.items():
+            self.estimates[c] = self.observations(c) + value
+
+        members = set(self.index) | set(source.index)
+        self.index = {
+            value: min(self.observations(c) for c in self.coordinates(value)) for value in members
+        }
+        self.trim()
+
+
+def get_most_frequent(sketches, limit=None):
+    """
+    Returns the ``(value, score)`` pairs for the most frequent items across
+    all of the provided sketches, like the ``RANKED`` command in
+    ``cmsketch.lua``.
+    """
+    sketches = [sketch for sketch in sketches if sketch.exists()]
+    if not sketches:
+        return []
+
+    if limit is None:
+        limit = min(sketch.parameters.capacity for sketch in sketches)
+
+    if len(sketches) == 1:
+        return list(reversed(sketches[0].ranked_index()))[:limit]
+
+    values = set().union(*(sketch.index for sketch in sketches))
+    results = [(value, sum(sketch.estimate(value) for sketch in sketches)) for value in values]
+    results.sort(key=lambda item: (-item[1], item[0].encode("utf-8")))
+    return results[:limit]
+
+
 class InMemoryTSDB(BaseTSDB):
     """
     An in-memory time-series storage.
@@ -214,8 +385,14 @@ class InMemoryTSDB(BaseTSDB):
         # self.sets[model][key][rollup] = set of elements
         self.sets = defaultdict(lambda: defaultdict(lambda: defaultdict(set)))
 
-        # self.frequencies[model][key][rollup] = Counter()
-        self.frequencies = defaultdict(lambda: defaultdict(lambda: defaultdict(Counter)))
+        # self.frequencies[model][key][rollup] = CountMinSketch
+        self.frequencies = defaultdict(
+            lambda: defaultdict(
+                lambda: defaultdict(
+                    lambda: CountMinSketch(RedisTSDB.DEFAULT_SKETCH_PARAMETERS),
+                )
+            )
+        )
 
     def record_frequency_multi(self, requests, timestamp=None, environment_id=None):
         environment_ids = {environment_id, None}
@@ -227,11 +404,11 @@ class InMemoryTSDB(BaseTSDB):
 
         for model, request in requests:
             for key, items in request.items():
-                items = {k: float(v) for k, v in items.items()}
+                items = [(k, float(v)) for k, v in items.items()]
                 for environment_id in environment_ids:
                     source = self.frequencies[model][(key, environment_id)]
                     for rollup in self.rollups:
-                        source[self.normalize_to_rollup(timestamp, rollup)].update(items)
+                        source[self.normalize_to_rollup(timestamp, rollup)].increment(items)
 
     def get_most_frequent(
         self, model, keys, start, end=None, rollup=None, limit=None, environment_id=None
@@ -242,13 +419,11 @@ class InMemoryTSDB(BaseTSDB):
 
         results = {}
         for key in keys:
-            result = results[key] = Counter()
             source = self.frequencies[model][(key, environment_id)]
-            for timestamp in series:
-                result.update(source[self.normalize_ts_to_rollup(timestamp, rollup)])
-
-        for key, counter in list(results.items()):
-            results[key] = counter.most_common(limit)
+            results[key] = get_most_frequent(
+                [source[self.normalize_ts_to_rollup(timestamp, rollup)] for timestamp in series],
+                limit,
+            )
 
         return results
 
@@ -264,8 +439,8 @@ class InMemoryTSDB(BaseTSDB):
             result = results[key] = []
             source = self.frequencies[model][(key, environment_id)]
             for timestamp in series:
-                data = source[self.normalize_ts_to_rollup(timestamp, rollup)]
-                result.append((timestamp, dict(data.most_common(limit))))
+                sketch = source[self.normalize_ts_to_rollup(timestamp, rollup)]
+                result.append((timestamp, dict(get_most_frequent([sketch], limit))))
 
         return results
 
@@ -279,8 +454,8 @@ class InMemoryTSDB(BaseTSDB):
             result = results[key] = []
             source = self.frequencies[model][(key, environment_id)]
             for timestamp in series:
-                scores = source[self.normalize_ts_to_rollup(timestamp, rollup)]
-                result.append((timestamp, {k: scores.get(k, 0.0) for k in members}))
+                sketch = source[self.normalize_ts_to_rollup(timestamp, rollup)]
+                result.append((timestamp, {k: sketch.estimate(k) for k in members}))
 
         return results
 
@@ -309,8 +484,10 @@ class InMemoryTSDB(BaseTSDB):
         for environment_id in environment_ids:
             dest = self.frequencies[model][(destination, environment_id)]
             for source in sources:
-                for bucket, counter in self.data[model].pop((source, environment_id), {}).items():
-                    dest[bucket].update(counter)
+                for bucket, sketch in (
+                    self.frequencies[model].pop((source, environment_id), {}).items()
+                ):
+                    dest[bucket].merge(sketch)
 
     def delete_frequencies(
         self, models, keys, start=None, end=None, timestamp=None, environment_ids=None
@@ -329,4 +506,4 @@ class InMemoryTSDB(BaseTSDB):
                     for environment_id in environment_ids:
                         data = self.frequencies[model][(key, environment_id)]
                         for timestamp in series:
-                            data.pop(self.normalize_to_rollup(timestamp, rollup), Counter())
+                            data.pop(self.normalize_to_rollup(timestamp, rollup), None)
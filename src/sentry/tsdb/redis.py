@@ -89,6 +89,13 @@ class RedisTSDB(BaseTSDB):
             ...
         }
 
+    Distinct counts over a range are read from the coarsest buckets that fit
+    within it, falling back to finer buckets at the edges. Rollups listed in
+    ``compacted_rollups`` are not written to when items are recorded;
+    instead, the keys written to each bucket of the next finer rollup are
+    tracked and folded into the coarser buckets by
+    ``compact_distinct_counts`` once that bucket has closed.
+
     Frequency tables are modeled using two data structures:
 
         * top-N index: a sorted set containing the most frequently observed items,
@@ -114,8 +121,23 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop("enable_frequency_sketches", False)
+        compacted_rollups = options.pop("compacted_rollups", ())
         super().__init__(**options)
 
+        # Distinct counters for compacted rollups are not written to when
+        # items are recorded, instead they are folded together from the
+        # closed buckets of a finer rollup by ``compact_distinct_counts``.
+        self.compaction_sources = {}
+        for rollup in compacted_rollups:
+            sources = [
+                source
+                for source in self.rollups
+                if source < rollup and rollup % source == 0 and source not in compacted_rollups
+            ]
+            if not sources:
+                raise ValueError(f"compacted rollup {rollup} has no finer rollup to compact from")
+            self.compaction_sources[rollup] = max(sources)
+
     def validate(self):
         logger.debug("Validating Redis version...")
         version = Version((2, 8, 18)) if self.enable_frequency_sketches else Version((2, 8, 9))
@@ -160,6 +182,36 @@ class RedisTSDB(BaseTSDB):
             environment_id,
         )
 
+    def make_compaction_key(self, rollup, timestamp):
+        """
+        Make the key of the set that tracks the distinct counters written to
+        during a rollup interval that still need to be compacted.
+        """
+        return "{prefix}dc:{rollup}:{epoch}".format(
+            prefix=self.prefix,
+            rollup=rollup,
+            epoch=self.normalize_ts_to_rollup(timestamp, rollup),
+        )
+
+    def make_compaction_member(self, model, key, environment_id):
+        return "{model}:{key}".format(
+            model=model.value,
+            key=self.add_environment_parameter(self.get_model_key(key), environment_id),
+        )
+
+    def make_key_from_compaction_member(self, member, rollup, timestamp):
+        """
+        Make the distinct counter key for a member of a compaction set, as
+        ``make_key`` would for the model, key and environment it was made from.
+        """
+        model, key = member.split(":", 1)
+        return "{prefix}{model}:{epoch}:{key}".format(
+            prefix=self.prefix,
+            model=model,
+            epoch=self.normalize_ts_to_rollup(timestamp, rollup),
+            key=key,
+        )
+
     def make_counter_key(self, model, rollup, timestamp, key, environment_id):
         """
         Make a key that is used for counter values.
@@ -292,26 +344,63 @@ class RedisTSDB(BaseTSDB):
 
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         series = [to_datetime(item) for item in series]
+        epochs = [to_timestamp(timestamp) for timestamp in series]
 
-        results = []
-        cluster, _ = self.get_cluster(environment_id)
-        with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
-                    )
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(hash_key, hash_field))
-                    )
+        counts = self._get_counter_values(model, keys, series, rollup, environment_id)
+        return {key: list(zip(epochs, values)) for key, values in zip(keys, counts)}
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+    def get_sums(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_id=None,
+        use_cache=False,
+        jitter_value=None,
+        tenant_ids=None,
+        referrer_suffix=None,
+    ):
+        self.validate_arguments([model], [environment_id])
 
-        for key, points in results_by_key.items():
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        series = [to_datetime(item) for item in series]
+
+        counts = self._get_counter_values(model, keys, series, rollup, environment_id)
+        return {key: sum(values) for key, values in zip(keys, counts)}
+
+    def _get_counter_values(self, model, keys, series, rollup, environment_id):
+        """
+        Fetches the counters for every key at every timestamp in ``series``.
+
+        Keys that share a vnode are stored in the same hash for a given epoch,
+        so all of their fields are requested with a single ``HMGET`` per hash,
+        pipelined per host. Returns a list of counts in ``series`` order for
+        each key, in ``keys`` order.
+        """
+        # hash_key -> [(hash_field, key index, series index), ...]
+        fields_by_hash_key = defaultdict(list)
+        for i, key in enumerate(keys):
+            for j, timestamp in enumerate(series):
+                hash_key, hash_field = self.make_counter_key(
+                    model, rollup, timestamp, key, environment_id
+                )
+                fields_by_hash_key[hash_key].append((hash_field, i, j))
+
+        cluster, _ = self.get_cluster(environment_id)
+        with cluster.map() as client:
+            responses = {
+                hash_key: client.hmget(hash_key, [hash_field for hash_field, _, _ in fields])
+                for hash_key, fields in fields_by_hash_key.items()
+            }
+
+        counts = [[0] * len(series) for _ in keys]
+        for hash_key, fields in fields_by_hash_key.items():
+            for (_, i, j), value in zip(fields, responses[hash_key].value):
+                if value is not None:
+                    counts[i][j] = int(value)
+        return counts
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
@@ -403,6 +492,19 @@ class RedisTSDB(BaseTSDB):
 
         ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
 
+        # Compacted rollups are only written to directly when the bucket they
+        # are compacted from has already closed, since it would otherwise
+        # not be compacted again.
+        now = int(to_timestamp(timezone.now()))
+        rollups = {}
+        compaction_sources = set()
+        for rollup, max_values in self.rollups.items():
+            source = self.compaction_sources.get(rollup)
+            if source is not None and self.normalize_ts_to_epoch(ts, source) + source > now:
+                compaction_sources.add(source)
+            else:
+                rollups[rollup] = max_values
+
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
             manager = cluster.fanout()
             if not durable:
@@ -411,12 +513,116 @@ class RedisTSDB(BaseTSDB):
             with manager as client:
                 for model, key, values in items:
                     c = client.target_key(key)
-                    for rollup, max_values in self.rollups.items():
+                    for rollup, max_values in rollups.items():
                         for environment_id in environment_ids:
                             k = self.make_key(model, rollup, ts, key, environment_id)
                             c.pfadd(k, *values)
                             c.expireat(k, self.calculate_expiry(rollup, max_values, timestamp))
 
+                    # The compaction set is stored on the same host as the
+                    # distinct counters, so that they can be merged locally.
+                    for rollup in compaction_sources:
+                        k = self.make_compaction_key(rollup, ts)
+                        c.sadd(
+                            k,
+                            *[
+                                self.make_compaction_member(model, key, environment_id)
+                                for environment_id in environment_ids
+                            ],
+                        )
+                        c.expireat(
+                            k, self.calculate_expiry(rollup, self.rollups[rollup], timestamp)
+                        )
+
+    def get_distinct_counts_buckets(self, start, end=None, rollup=None):
+        """
+        Returns the ``(rollup, timestamp)`` pairs of the distinct counter
+        buckets to read for a time range.
+
+        When no rollup is requested, the range covered by the optimal rollup
+        series is covered by the coarsest buckets that fit entirely within it
+        and that are still retained (and, for compacted rollups, have been
+        compacted), falling back to finer buckets towards the edges. Since
+        every bucket is the union of the finer buckets it spans, this yields
+        the same estimate from far fewer keys.
+
+        Buckets of compacted rollups that extend past the compaction
+        watermark are read together with the buckets of their source rollup
+        that have not been compacted into them yet.
+        """
+        watermarks = self.get_compaction_watermarks() if self.compaction_sources else {}
+        now = timezone.now()
+
+        if rollup is not None:
+            rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+            return self.expand_uncompacted_buckets(
+                [(rollup, timestamp) for timestamp in series], watermarks, now
+            )
+
+        rollup, series = self.get_optimal_rollup_series(start, end)
+
+        def get_bounds(candidate, lower, upper):
+            lower = max(
+                -(-lower // candidate) * candidate,
+                self.get_earliest_timestamp(candidate, timestamp=now),
+            )
+            upper = upper - (upper % candidate)
+            if candidate in self.compaction_sources:
+                watermark = watermarks.get(candidate, 0)
+                upper = min(upper, watermark - (watermark % candidate))
+            return lower, upper
+
+        def cover(lower, upper, candidates):
+            for i, candidate in enumerate(candidates):
+                a, b = get_bounds(candidate, lower, upper)
+                if a < b:
+                    return (
+                        cover(lower, a, candidates[i + 1 :])
+                        + [(candidate, timestamp) for timestamp in range(a, b, candidate)]
+                        + cover(b, upper, candidates[i + 1 :])
+                    )
+            return [(rollup, timestamp) for timestamp in range(lower, upper, rollup)]
+
+        # Only rollups that are multiples of the optimal rollup can be used,
+        # otherwise the edges would not line up with its buckets.
+        candidates = sorted(
+            (
+                candidate
+                for candidate in self.rollups
+                if candidate > rollup and candidate % rollup == 0
+            ),
+            reverse=True,
+        )
+
+        return self.expand_uncompacted_buckets(
+            cover(series[0], series[-1] + rollup, candidates), watermarks, now
+        )
+
+    def expand_uncompacted_buckets(self, buckets, watermarks, now):
+        """
+        Adds the source rollup buckets past the compaction watermark to every
+        bucket of a compacted rollup that has not been fully compacted yet.
+
+        Source buckets that are no longer retained are skipped, so this never
+        adds more keys than the source rollup retains, even when compaction
+        has not run yet.
+        """
+        earliest = {
+            source: self.get_earliest_timestamp(source, timestamp=now)
+            for source in set(self.compaction_sources.values())
+        }
+        now = int(to_timestamp(now))
+        result = []
+        for rollup, timestamp in buckets:
+            result.append((rollup, timestamp))
+            source = self.compaction_sources.get(rollup)
+            if source is None:
+                continue
+            lower = max(timestamp, watermarks.get(rollup, 0), earliest[source])
+            upper = min(timestamp + rollup, self.normalize_ts_to_epoch(now, source) + source)
+            result.extend((source, ts) for ts in range(lower, upper, source))
+        return result
+
     def get_distinct_counts_series(
         self, model, keys, start, end=None, rollup=None, environment_id=None
     ):
@@ -427,6 +633,9 @@ class RedisTSDB(BaseTSDB):
 
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
 
+        watermarks = self.get_compaction_watermarks() if rollup in self.compaction_sources else {}
+        now = timezone.now()
+
         responses = {}
         cluster, _ = self.get_cluster(environment_id)
         with cluster.fanout() as client:
@@ -434,12 +643,16 @@ class RedisTSDB(BaseTSDB):
                 c = client.target_key(key)
                 r = responses[key] = []
                 for timestamp in series:
-                    r.append(
-                        (
-                            timestamp,
-                            c.pfcount(self.make_key(model, rollup, timestamp, key, environment_id)),
-                        )
+                    buckets = self.expand_uncompacted_buckets(
+                        [(rollup, timestamp)], watermarks, now
                     )
+                    ks = [
+                        self.make_key(model, bucket_rollup, bucket_timestamp, key, environment_id)
+                        for bucket_rollup, bucket_timestamp in buckets
+                    ]
+                    # See ``get_distinct_counts_totals`` for why ``PFCOUNT``
+                    # is called directly.
+                    r.append((timestamp, c.execute_command("PFCOUNT", *ks)))
 
         return {
             key: [(timestamp, promise.value) for timestamp, promise in value]
@@ -464,7 +677,7 @@ class RedisTSDB(BaseTSDB):
         """
         self.validate_arguments([model], [environment_id])
 
-        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_distinct_counts_buckets(start, end, rollup)
 
         responses = {}
         cluster, _ = self.get_cluster(environment_id)
@@ -477,7 +690,7 @@ class RedisTSDB(BaseTSDB):
                 # supported by the protocol -- so we have to call the command
                 # directly here instead.
                 ks = []
-                for timestamp in series:
+                for rollup, timestamp in buckets:
                     ks.append(self.make_key(model, rollup, timestamp, key, environment_id))
 
                 responses[key] = client.target_key(key).execute_command("PFCOUNT", *ks)
@@ -492,7 +705,7 @@ class RedisTSDB(BaseTSDB):
         if not keys:
             return 0
 
-        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        buckets = self.get_distinct_counts_buckets(start, end, rollup)
 
         temporary_id = uuid.uuid1().hex
 
@@ -504,7 +717,8 @@ class RedisTSDB(BaseTSDB):
             Return a list containing all keys for each interval in the series for a key.
             """
             return [
-                self.make_key(model, rollup, timestamp, key, environment_id) for timestamp in series
+                self.make_key(model, rollup, timestamp, key, environment_id)
+                for rollup, timestamp in buckets
             ]
 
         cluster, _ = self.get_cluster(environment_id)
@@ -670,10 +884,128 @@ class RedisTSDB(BaseTSDB):
                                         )
                                     )
 
+    def get_compaction_watermarks(self):
+        """
+        Returns a mapping of compacted rollup to the timestamp up to which its
+        buckets have been compacted.
+        """
+        key = f"{self.prefix}dc:watermarks"
+        values = self.cluster.get_local_client_for_key(key).hgetall(key)
+        return {int(rollup): int(timestamp) for rollup, timestamp in values.items()}
+
+    def compact_distinct_counts(self, timestamp=None):
+        """
+        Fold the distinct counters written to closed buckets of each source
+        rollup into the buckets of the compacted rollups that contain them.
+
+        Compaction is idempotent (merging a HyperLogLog into one that already
+        contains it does not change it), so a bucket that is compacted more
+        than once, e.g. after a failure, still yields the correct estimate.
+        """
+        if not self.compaction_sources:
+            return
+
+        if timestamp is None:
+            timestamp = timezone.now()
+
+        now = int(to_timestamp(timestamp))
+        watermarks = self.get_compaction_watermarks()
+
+        targets_by_source = defaultdict(list)
+        for rollup, source in self.compaction_sources.items():
+            targets_by_source[source].append(rollup)
+
+        for source, targets in targets_by_source.items():
+            # Leave one interval of slack after the bucket closes so that
+            # writes that started before it closed have landed.
+            cutoff = self.normalize_ts_to_epoch(now - source, source)
+            start = max(
+                min(watermarks.get(rollup, 0) for rollup in targets),
+                self.get_earliest_timestamp(source, timestamp=timestamp),
+            )
+            epochs = list(range(start, cutoff, source))
+
+            for host_id in self.cluster.hosts:
+                client = self.cluster.get_local_client(host_id)
+                with client.pipeline(transaction=False) as pipeline:
+                    for epoch in epochs:
+                        pipeline.smembers(self.make_compaction_key(source, epoch))
+                    pending = pipeline.execute()
+
+                with client.pipeline(transaction=False) as pipeline:
+                    for epoch, members in zip(epochs, pending):
+                        if not members:
+                            continue
+
+                        for member in members:
+                            member = member.decode("utf-8")
+                            source_key = self.make_key_from_compaction_member(member, source, epoch)
+                            for rollup in targets:
+                                key = self.make_key_from_compaction_member(member, rollup, epoch)
+                                pipeline.pfmerge(key, key, source_key)
+                                pipeline.expireat(
+                                    key,
+                                    self.calculate_expiry(
+                                        rollup, self.rollups[rollup], to_datetime(epoch)
+                                    ),
+                                )
+
+                        pipeline.delete(self.make_compaction_key(source, epoch))
+                    pipeline.execute()
+
+            key = f"{self.prefix}dc:watermarks"
+            with self.cluster.get_local_client_for_key(key).pipeline(transaction=False) as pipeline:
+                for rollup in targets:
+                    pipeline.hset(key, rollup, cutoff)
+                pipeline.execute()
+
     def make_frequency_table_keys(self, model, rollup, timestamp, key, environment_id):
         prefix = self.make_key(model, rollup, timestamp, key, environment_id)
         return [f"{prefix}:i", f"{prefix}:e"]
 
+    def execute_sketch_commands(self, cluster, commands):
+        """\
+        Executes count-min sketch script calls, batching all of the calls that
+        are routed to the same host into a single ``BATCH`` script call.
+
+        ``commands`` has the same shape as for ``execute_commands``. Commands
+        other than ``CountMinScript`` calls are sent unbatched after the
+        script call. Returns a mapping of routing key to the results of its
+        ``CountMinScript`` calls, in order.
+        """
+        router = cluster.get_router()
+        keys_by_host = defaultdict(list)
+        for key in commands:
+            keys_by_host[router.get_host_for_key(key)].append(key)
+
+        batches = {}
+        for keys in keys_by_host.values():
+            script_keys = []
+            arguments = ["BATCH"]
+            other_commands = []
+            for key in keys:
+                for command in commands[key]:
+                    if command[0] is not CountMinScript:
+                        other_commands.append(command)
+                        continue
+                    _, ks, args = command
+                    script_keys.extend(ks)
+                    arguments.extend([len(ks), len(args)])
+                    arguments.extend(args)
+            # Any of the routing keys can be used to address the host.
+            batches[keys[0]] = [(CountMinScript, script_keys, arguments)] + other_commands
+
+        responses = cluster.execute_commands(batches)
+
+        results = {}
+        for keys in keys_by_host.values():
+            values = iter(responses[keys[0]][0].value)
+            for key in keys:
+                results[key] = [
+                    next(values) for command in commands[key] if command[0] is CountMinScript
+                ]
+        return results
+
     def record_frequency_multi(self, requests, timestamp=None, environment_id=None):
         self.validate_arguments([model for model, request in requests], [environment_id])
 
@@ -719,7 +1051,7 @@ class RedisTSDB(BaseTSDB):
                         cmds.append(("EXPIREAT", k, t))
 
             try:
-                cluster.execute_commands(commands)
+                self.execute_sketch_commands(cluster, commands)
             except Exception:
                 if durable:
                     raise
@@ -749,9 +1081,9 @@ class RedisTSDB(BaseTSDB):
 
         results = {}
         cluster, _ = self.get_cluster(environment_id)
-        for key, responses in cluster.execute_commands(commands).items():
+        for key, responses in self.execute_sketch_commands(cluster, commands).items():
             results[key] = [
-                (member.decode("utf-8"), float(score)) for member, score in responses[0].value
+                (member.decode("utf-8"), float(score)) for member, score in responses[0]
             ]
 
         return results
@@ -782,11 +1114,11 @@ class RedisTSDB(BaseTSDB):
             ]
 
         def unpack_response(response):
-            return {item.decode("utf-8"): float(score) for item, score in response.value}
+            return {item.decode("utf-8"): float(score) for item, score in response}
 
         results = {}
         cluster, _ = self.get_cluster(environment_id)
-        for key, responses in cluster.execute_commands(commands).items():
+        for key, responses in self.execute_sketch_commands(cluster, commands).items():
             results[key] = list(zip(series, (unpack_response(response) for response in responses)))
 
         return results
@@ -821,11 +1153,11 @@ class RedisTSDB(BaseTSDB):
         results = {}
 
         cluster, _ = self.get_cluster(environment_id)
-        for key, responses in cluster.execute_commands(commands).items():
+        for key, responses in self.execute_sketch_commands(cluster, commands).items():
             members = items[key]
 
             chunk = results[key] = []
-            for timestamp, scores in zip(series, responses[0].value):
+            for timestamp, scores in zip(series, responses[0]):
                 chunk.append((timestamp, dict(zip(members, (float(score) for score in scores)))))
 
         return results
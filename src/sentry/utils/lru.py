@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Callable, Hashable, MutableSet, Optional
+from weakref import WeakSet
+
+from cachetools import LRUCache
+
+from sentry import options
+
+_caches: MutableSet[OptionSizedLRUCache] = WeakSet()
+
+
+class OptionSizedLRUCache:
+    """
+    An LRU cache shared by all threads of a process, sized by the option
+    `option_name`. The cache is disabled while the option is 0, and is
+    rebuilt empty when the option changes.
+
+    >>> _rule_plans = OptionSizedLRUCache("rules.processor.plan-cache-size")
+
+    With `getsizeof`, the option bounds the total size of the values instead
+    of their count, and values larger than the whole cache are not kept.
+    """
+
+    def __init__(self, option_name: str, getsizeof: Optional[Callable[[Any], int]] = None):
+        self.option_name = option_name
+        self.getsizeof = getsizeof
+        self._lock = Lock()
+        self._cache: Optional[LRUCache] = None
+        _caches.add(self)
+
+    def _get_cache(self) -> Optional[LRUCache]:
+        size = options.get(self.option_name)
+        if not size:
+            self._cache = None
+        elif self._cache is None or self._cache.maxsize != size:
+            self._cache = LRUCache(maxsize=size, getsizeof=self.getsizeof)
+        return self._cache
+
+    def enabled(self) -> bool:
+        return bool(options.get(self.option_name))
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            cache = self._get_cache()
+            return cache.get(key) if cache is not None else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            cache = self._get_cache()
+            if cache is None:
+                return
+            if self.getsizeof is not None and self.getsizeof(value) > cache.maxsize:
+                return
+            cache[key] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache = None
+
+
+def clear_caches() -> None:
+    """
+    Empties all option-sized LRU caches of this process, used between tests.
+    """
+    for cache in list(_caches):
+        cache.clear()
@@ -308,6 +308,10 @@ def pytest_runtest_teardown(item):
     for model in (OrganizationOption, ProjectOption, UserOption):
         model.objects.clear_local_cache()
 
+    from sentry.utils.lru import clear_caches
+
+    clear_caches()
+
     Hub.main.bind_client(None)
 
 
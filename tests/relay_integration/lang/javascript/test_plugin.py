@@ -301,7 +301,7 @@ class TestJavascriptIntegration(RelayStoreHelper):
             "type": "js_invalid_source",
         }
 
-    @patch("sentry.lang.javascript.processor.SmCache.from_bytes")
+    @patch("sentry.lang.javascript.cache.SmCache.from_bytes")
     @patch("sentry.lang.javascript.processor.Fetcher.fetch_by_url")
     @patch("sentry.lang.javascript.processor.discover_sourcemap")
     def test_sourcemap_cache_is_constructed_only_once_if_an_error_is_raised(
@@ -2,10 +2,12 @@ from base64 import b64encode
 from datetime import timedelta
 from unittest import mock
 
+import pytest
 from django.test import override_settings
 from django.utils import timezone
 from freezegun import freeze_time
 
+from sentry.event_manager import HashDiscarded
 from sentry.issues.grouptype import PerformanceSlowDBQueryGroupType
 from sentry.models import (
     Activity,
@@ -26,6 +28,7 @@ from sentry.models import (
 )
 from sentry.plugins.base import plugins
 from sentry.testutils import APITestCase, SnubaTestCase
+from sentry.testutils.helpers import override_options
 from sentry.testutils.silo import exempt_from_silo_limits, region_silo_test
 from sentry.types.activity import ActivityType
 
@@ -542,6 +545,23 @@ class GroupUpdateTest(APITestCase):
         assert tombstone.project == group.project
         assert tombstone.data == group.data
 
+    @override_options({"grouphash.cache-ttl": 60, "grouphash.local-cache-size": 100})
+    def test_discard_with_warm_grouphash_cache(self):
+        self.login_as(user=self.user)
+        data = {"message": "oh no", "fingerprint": ["discard-me"]}
+        group = self.store_event(data=data, project_id=self.project.id).group
+        # The second event is saved with the grouphash served from the cache.
+        assert self.store_event(data=data, project_id=self.project.id).group_id == group.id
+
+        url = f"/api/0/issues/{group.id}/"
+        with self.tasks(), self.capture_on_commit_callbacks(execute=True):
+            with self.feature("projects:discard-groups"):
+                resp = self.client.put(url, data={"discard": True})
+        assert resp.status_code == 204
+
+        with pytest.raises(HashDiscarded):
+            self.store_event(data=data, project_id=self.project.id)
+
     def test_discard_performance_issue(self):
         self.login_as(user=self.user)
         group = self.create_group(type=PerformanceSlowDBQueryGroupType.type_id)
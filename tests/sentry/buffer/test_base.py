@@ -4,7 +4,7 @@ from unittest import mock
 from django.utils import timezone
 
 from sentry.buffer.base import Buffer
-from sentry.models import Group, Organization, Project, Release, ReleaseProject, Team
+from sentry.models import Group, GroupRelease, Organization, Project, Release, ReleaseProject, Team
 from sentry.testutils import TestCase
 
 
@@ -69,3 +69,79 @@ class BufferTest(TestCase):
         self.buf.process(Group, columns, filters, {"last_seen": the_date}, signal_only=True)
         group.refresh_from_db()
         assert group.times_seen == prev_times_seen
+
+    def test_process_batch_saves_data(self):
+        group = Group.objects.create(project=Project(id=1))
+        other_group = Group.objects.create(project=Project(id=1))
+        the_date = timezone.now() + timedelta(days=5)
+        self.buf.process_batch(
+            [
+                (Group, {"times_seen": 2}, {"id": group.id}, {"last_seen": the_date}, None),
+                (Group, {"times_seen": 3}, {"pk": other_group.id}, {"level": 10}, None),
+            ]
+        )
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 2
+        assert group_.last_seen == the_date
+        other_group_ = Group.objects.get(id=other_group.id)
+        assert other_group_.times_seen == other_group.times_seen + 3
+        assert other_group_.level == 10
+        assert other_group_.last_seen == other_group.last_seen
+
+    def test_process_batch_updates_group_cache(self):
+        group = Group.objects.create(project=Project(id=1))
+        orig_times_seen = Group.objects.get_from_cache(id=group.id).times_seen
+        self.buf.process_batch([(Group, {"times_seen": 1}, {"id": group.id}, {}, None)])
+        assert Group.objects.get_from_cache(id=group.id).times_seen == orig_times_seen + 1
+
+    def test_process_batch_falls_back_to_process(self):
+        columns = {"new_groups": 1}
+        filters = {"project_id": self.project.id, "release_id": self.release.id}
+        self.buf.process_batch([(ReleaseProject, columns, filters, {}, None)])
+        assert ReleaseProject.objects.filter(new_groups=1, **filters).exists()
+
+    def test_process_batch_updates_by_pk(self):
+        group = Group.objects.create(project=Project(id=1))
+        other_group = Group.objects.create(project=Project(id=1))
+        the_date = timezone.now() + timedelta(days=5)
+        grouprelease = GroupRelease.objects.create(
+            project_id=self.project.id, group_id=group.id, release_id=self.release.id
+        )
+        other_grouprelease = GroupRelease.objects.create(
+            project_id=self.project.id, group_id=other_group.id, release_id=self.release.id
+        )
+        extra = {"last_seen": the_date}
+
+        with self.assertNumQueries(1):
+            self.buf.process_batch(
+                [
+                    (GroupRelease, {}, {"id": grouprelease.id}, extra, None),
+                    (GroupRelease, {}, {"pk": other_grouprelease.id}, extra, None),
+                    # Rows that don't exist anymore are skipped
+                    (GroupRelease, {}, {"id": other_grouprelease.id + 1}, extra, None),
+                ]
+            )
+        assert GroupRelease.objects.get(id=grouprelease.id).last_seen == the_date
+        assert GroupRelease.objects.get(id=other_grouprelease.id).last_seen == the_date
+
+    def test_process_batch_sums_increments_by_pk(self):
+        group = Group.objects.create(project=Project(id=1))
+        release_project = ReleaseProject.objects.get(
+            project_id=self.project.id, release_id=self.release.id
+        )
+
+        self.buf.process_batch(
+            [
+                (Group, {"times_seen": 1}, {"id": group.id}, {}, None),
+                (Group, {"times_seen": 2}, {"id": group.id}, {"level": 10}, None),
+                (ReleaseProject, {"new_groups": 1}, {"id": release_project.id}, {}, None),
+                (ReleaseProject, {"new_groups": 2}, {"pk": release_project.id}, {}, None),
+            ]
+        )
+        group_ = Group.objects.get(id=group.id)
+        assert group_.times_seen == group.times_seen + 3
+        assert group_.level == 10
+        assert (
+            ReleaseProject.objects.get(id=release_project.id).new_groups
+            == release_project.new_groups + 3
+        )
@@ -0,0 +1,32 @@
+import pytest
+
+from sentry.buffer.redis import RedisBuffer
+from sentry.models import Group
+
+
+def benchmark_available():
+    try:
+        import pytest_benchmark  # NOQA
+    except ModuleNotFoundError:
+        return False
+    else:
+        return True
+
+
+# Roughly what a burst of events for a handful of hot groups looks like.
+HOT_GROUP_IDS = [1, 2, 3, 4, 5] * 200
+
+
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize(
+    "incr_coalesce_size", [0, 100], ids=lambda x: "coalesced" if x else "per_call"
+)
+def test_benchmark_incr(incr_coalesce_size, benchmark):
+    buf = RedisBuffer(incr_coalesce_size=incr_coalesce_size, incr_coalesce_interval=60)
+
+    def run():
+        for group_id in HOT_GROUP_IDS:
+            buf.incr(Group, {"times_seen": 1}, {"pk": group_id})
+        buf.flush_coalesced()
+
+    benchmark(run)
@@ -211,6 +211,149 @@ class RedisBufferTest(TestCase):
         self.buf.process("foo")
         process.assert_called_once_with(mock.Mock, {"times_seen": 1}, {"pk": 1}, {}, True)
 
+    def test_incr_coalesced(self):
+        buf = RedisBuffer(incr_coalesce_size=2, incr_coalesce_interval=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        columns = ["times_seen"]
+        filters = {"pk": 1}
+        key = buf._make_key(model, filters=filters)
+
+        buf.incr(model, {"times_seen": 1}, filters, extra={"foo": "bar"})
+        buf.incr(model, {"times_seen": 5}, filters, extra={"foo": "baz"})
+        # Nothing has been written yet, but reads include the local values
+        assert client.hgetall(key) == {}
+        assert client.zrange("b:p", 0, -1) == []
+        assert buf.get(model, columns, filters=filters) == {"times_seen": 6}
+
+        buf.flush_coalesced()
+        result = {force_text(k): v for k, v in client.hgetall(key).items()}
+        assert pickle.loads(result.pop("f")) == filters
+        assert pickle.loads(result.pop("e+foo")) == "baz"
+        assert result == {"i+times_seen": b"6", "m": b"unittest.mock.Mock"}
+        assert client.zrange("b:p", 0, -1) == [key.encode("utf-8")]
+        assert buf.get(model, columns, filters=filters) == {"times_seen": 6}
+
+    def test_incr_coalesced_flushes_on_size(self):
+        buf = RedisBuffer(incr_coalesce_size=2, incr_coalesce_interval=60)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        assert client.zrange("b:p", 0, -1) == []
+        buf.incr(model, {"times_seen": 1}, {"pk": 2})
+        assert len(client.zrange("b:p", 0, -1)) == 2
+        assert buf.coalescing_buffer.empty()
+
+    def test_incr_coalesced_flushes_on_interval(self):
+        buf = RedisBuffer(incr_coalesce_size=100, incr_coalesce_interval=10)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        key = buf._make_key(model, filters=filters)
+
+        with freeze_time("2017-05-03 06:06:06") as frozen_time:
+            buf.incr(model, {"times_seen": 1}, filters)
+            assert client.zrange("b:p", 0, -1) == []
+            frozen_time.tick(11)
+            buf.incr(model, {"times_seen": 1}, filters)
+        assert client.zrange("b:p", 0, -1) == [key.encode("utf-8")]
+        assert client.hget(key, "i+times_seen") == b"2"
+
+    def test_incr_coalesced_flushes_when_idle(self):
+        buf = RedisBuffer(incr_coalesce_size=100, incr_coalesce_interval=0.1)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        key = buf._make_key(model, filters=filters)
+
+        buf.incr(model, {"times_seen": 1}, filters)
+        timer = buf._flush_timer
+        assert timer is not None
+
+        # No further increments come in, the timer flushes the buffer anyway.
+        timer.join(5)
+        assert buf.coalescing_buffer.empty()
+        assert client.zrange("b:p", 0, -1) == [key.encode("utf-8")]
+        assert client.hget(key, "i+times_seen") == b"1"
+
+    @freeze_time()
+    def test_group_cache_updated_coalesced(self):
+        buf = RedisBuffer(incr_coalesce_size=100)
+        orig_times_seen = Group.objects.get_from_cache(id=self.group.id).times_seen
+        for _ in range(5):
+            buf.incr(
+                Group,
+                {"times_seen": 1},
+                {"pk": self.group.id},
+                {"last_seen": timezone.now()},
+            )
+        buf.flush_coalesced()
+        with self.tasks(), mock.patch("sentry.buffer", buf):
+            buf.process_pending()
+        group = Group.objects.get_from_cache(id=self.group.id)
+        assert group.times_seen == orig_times_seen + 5
+
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_bulk(self, process_batch):
+        buf = RedisBuffer(bulk_process=True)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        buf.incr(model, {"times_seen": 1}, {"pk": 1}, extra={"foo": "bar"})
+        buf.incr(model, {"times_seen": 2}, {"pk": 2})
+        keys = [buf._make_key(model, {"pk": 1}), buf._make_key(model, {"pk": 2})]
+
+        buf.process(batch_keys=keys + ["missing"])
+        process_batch.assert_called_once_with(
+            [
+                (mock.Mock, {"times_seen": 1}, {"pk": 1}, {"foo": "bar"}, None),
+                (mock.Mock, {"times_seen": 2}, {"pk": 2}, {}, None),
+            ]
+        )
+        assert client.zrange("b:p", 0, -1) == []
+        for key in keys:
+            assert not client.exists(key)
+            assert not client.exists(buf._make_lock_key(key))
+
+    @mock.patch("sentry.buffer.base.Buffer.process_batch")
+    def test_process_bulk_skips_locked(self, process_batch):
+        buf = RedisBuffer(bulk_process=True)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        key = buf._make_key(model, {"pk": 1})
+        client.set(buf._make_lock_key(key), "1")
+
+        buf.process(batch_keys=[key])
+        assert not process_batch.called
+        assert client.exists(key)
+
+    @freeze_time()
+    def test_group_cache_updated_bulk(self):
+        buf = RedisBuffer(bulk_process=True, incr_batch_size=10)
+        orig_times_seen = Group.objects.get_from_cache(id=self.group.id).times_seen
+        buf.incr(Group, {"times_seen": 5}, {"id": self.group.id}, {"last_seen": timezone.now()})
+        with self.tasks(), mock.patch("sentry.buffer", buf):
+            buf.process_pending()
+        group = Group.objects.get_from_cache(id=self.group.id)
+        assert group.times_seen == orig_times_seen + 5
+
+    @mock.patch("sentry.buffer.redis.process_incr", mock.Mock())
+    @mock.patch("sentry.buffer.redis.metrics")
+    def test_process_pending_reports_lag(self, metrics):
+        with self.buf.cluster.map() as client:
+            client.zadd("b:p:1", {"foo": 100})
+        with freeze_time("1970-01-01 00:03:00"):
+            self.buf.process_pending(partition=1)
+        metrics.timing.assert_any_call("buffer.pending-size", 1, tags={"partition": "1"})
+        metrics.timing.assert_any_call("buffer.pending-lag", 80, tags={"partition": "1"})
+
 
 #    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
 #    def test_incr_uses_signal_only(self):
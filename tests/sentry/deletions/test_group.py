@@ -104,6 +104,14 @@ class DeleteGroupTest(TestCase, SnubaTestCase):
         assert nodestore.get(self.node_id3), "Does not remove from second group"
         assert Group.objects.filter(id=self.keep_event.group_id).exists()
 
+    @mock.patch("sentry.deletions.defaults.group.invalidate_project_grouphashes")
+    def test_invalidates_grouphash_cache(self, invalidate_project_grouphashes):
+        group = self.event.group
+        with self.tasks():
+            delete_groups(object_ids=[group.id])
+
+        invalidate_project_grouphashes.assert_called_once_with(self.project.id)
+
     def test_simple_multiple_groups(self):
         other_event = self.store_event(
             data={
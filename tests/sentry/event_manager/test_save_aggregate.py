@@ -4,8 +4,11 @@ from threading import Thread
 
 import pytest
 
-from sentry.event_manager import _save_aggregate
+from sentry.event_manager import _create_missing_grouphashes, _get_grouphashes, _save_aggregate
 from sentry.eventstore.models import CalculatedHashes, Event
+from sentry.grouping.grouphash_cache import invalidate_project_grouphashes
+from sentry.models import Group, GroupHash
+from sentry.testutils.helpers.options import override_options
 
 
 @pytest.mark.django_db(transaction=True)
@@ -87,3 +90,56 @@ def test_group_creation_race(monkeypatch, default_project, is_race_free):
         # assert many groups are new
         assert 1 < len({rv.group.id for rv in return_values}) <= CONCURRENCY
         assert 1 < sum(rv.is_new for rv in return_values) <= CONCURRENCY
+
+
+@pytest.mark.django_db
+def test_create_missing_grouphashes(default_project):
+    existing = GroupHash.objects.create(project=default_project, hash="a" * 32)
+
+    grouphashes = _get_grouphashes(default_project, ["a" * 32, "b" * 32])
+    assert grouphashes == {"a" * 32: existing}
+
+    _create_missing_grouphashes(default_project, ["a" * 32, "b" * 32, "b" * 32], grouphashes)
+    assert set(grouphashes) == {"a" * 32, "b" * 32}
+    assert grouphashes["a" * 32] == existing
+    assert GroupHash.objects.filter(project=default_project).count() == 2
+
+    # Rows created concurrently are picked up instead of failing on the
+    # unique constraint.
+    concurrent = GroupHash.objects.create(project=default_project, hash="c" * 32)
+    _create_missing_grouphashes(default_project, ["c" * 32], grouphashes)
+    assert grouphashes["c" * 32] == concurrent
+    assert GroupHash.objects.filter(project=default_project).count() == 3
+
+
+@pytest.mark.django_db
+def test_save_aggregate_stale_grouphash_cache(default_project):
+    hashes = CalculatedHashes(hashes=["a" * 32], hierarchical_hashes=[], tree_labels=[])
+
+    def save_aggregate():
+        data = {"timestamp": time.time()}
+        evt = Event(default_project.id, "89aeed6a472e4c5fb992d14df4d7e1b6", data=data)
+        return _save_aggregate(
+            evt,
+            hashes=hashes,
+            release=None,
+            metadata={},
+            received_timestamp=0,
+            level=10,
+            culprit="",
+        )
+
+    with override_options({"grouphash.cache-ttl": 60, "grouphash.local-cache-size": 100}):
+        invalidate_project_grouphashes(default_project.id)
+        group = save_aggregate().group
+        # Make sure the grouphash is cached.
+        assert save_aggregate().group.id == group.id
+
+        # The group and its hashes are deleted without invalidating the cache.
+        GroupHash.objects.filter(project=default_project).delete()
+        Group.objects.filter(id=group.id).delete()
+
+        group_info = save_aggregate()
+        assert group_info.is_new
+        assert group_info.group.id != group.id
+        assert GroupHash.objects.get(project=default_project).group_id == group_info.group.id
@@ -442,3 +442,76 @@ def test_app_no_matches(frame):
     enhancements = Enhancements.from_config_string("app:no +app")
     enhancements.apply_modifications_to_frame([frame], "native", None)
     assert frame.get("in_app")
+
+
+def test_compiled_rules_match_all_rules():
+    enhancements = Enhancements.from_config_string(
+        """
+        family:native function:std::* -app
+        function:panic_handler ^-group -group
+        module:com.example.*  +app
+        !function:main module:com.example.internal.* -group
+        path:**/node_modules/** -app
+        package:/usr/lib/** -app
+        app:yes family:javascript category=ui
+        category:ui -group
+        [ function:foo ] | function:* | [ function:baz ] +prefix
+        function:*Exception* +sentinel
+        error.type:ValueError function:b* -group
+    """,
+        bases=["common:v1"],
+    )
+
+    frames = [
+        {"function": "main", "module": "com.example.app", "in_app": True},
+        {"function": "std::rt::lang_start", "platform": "native"},
+        {"function": "foo", "abs_path": "/app/node_modules/x/index.js"},
+        {"function": "bar", "package": "/usr/lib/libc.so", "in_app": True},
+        {"function": "baz", "module": "com.example.internal.util"},
+        {"function": "panic_handler", "platform": "native"},
+        {"function": "onClickException", "platform": "javascript", "in_app": True},
+    ]
+    exception_data = {"type": "ValueError"}
+
+    def get_actions(rules, match_frames, compiled):
+        if compiled:
+            return [
+                (rule.matcher_description, idx, str(action))
+                for rule, actions in compiled.iter_matching_frame_actions(
+                    match_frames, "java", exception_data, {}
+                )
+                for idx, action in actions
+            ]
+        return [
+            (rule.matcher_description, idx, str(action))
+            for rule in rules
+            for idx, action in rule.get_matching_frame_actions(
+                match_frames, "java", exception_data, {}
+            )
+        ]
+
+    match_frames = [create_match_frame(frame, "java") for frame in frames]
+    modifier_rules, updater_rules = enhancements._compiled_rules
+    expected = get_actions(enhancements._updater_rules, match_frames, None)
+    assert expected
+    assert get_actions(None, match_frames, updater_rules) == expected
+
+    expected_frames = [dict(frame) for frame in frames]
+    match_frames = [create_match_frame(frame, "java") for frame in expected_frames]
+    for rule in enhancements._modifier_rules:
+        for idx, action in rule.get_matching_frame_actions(
+            match_frames, "java", exception_data, {}
+        ):
+            action.apply_modifications_to_frame(expected_frames, match_frames, idx, rule=rule)
+
+    enhancements.apply_modifications_to_frame(frames, "java", exception_data)
+    assert frames == expected_frames
+
+
+def test_loads_is_cached():
+    config = Enhancements.from_config_string("function:foo -group", bases=["common:v1"]).dumps()
+
+    enhancements = Enhancements.loads(config)
+    assert Enhancements.loads(config) is enhancements
+    assert Enhancements.loads(config.encode("ascii")) is enhancements
+    assert enhancements.dumps() == config
@@ -1,6 +1,9 @@
 import pytest
 
-from sentry.grouping.api import get_default_grouping_config_dict
+from sentry.grouping.api import (
+    get_default_grouping_config_dict,
+    get_fingerprinting_config_for_project,
+)
 from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
 from tests.sentry.grouping import with_fingerprint_input
 
@@ -184,3 +187,26 @@ def test_event_hash_variant(insta_snapshot, input):
             },
         }
     )
+
+
+@pytest.mark.django_db
+def test_fingerprinting_config_is_cached(default_project):
+    default_project.update_option(
+        "sentry:fingerprinting_rules", "error.type:DatabaseUnavailable -> DatabaseUnavailable"
+    )
+
+    rules = get_fingerprinting_config_for_project(default_project)
+    assert rules.to_json() == {
+        "version": 1,
+        "rules": [
+            {
+                "matchers": [["type", "DatabaseUnavailable"]],
+                "fingerprint": ["DatabaseUnavailable"],
+                "attributes": {},
+            }
+        ],
+    }
+    assert get_fingerprinting_config_for_project(default_project) is rules
+
+    default_project.update_option("sentry:fingerprinting_rules", "error.type:Foo -> Foo")
+    assert get_fingerprinting_config_for_project(default_project) is not rules
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from sentry.grouping.grouphash_cache import (
+    get_grouphashes,
+    invalidate_grouphashes,
+    invalidate_project_grouphashes,
+)
+from sentry.models import GroupHash
+from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
+
+CACHE_OPTIONS = {
+    "grouphash.cache-ttl": 60,
+    "grouphash.local-cache-size": 100,
+    "grouphash.local-cache-ttl": 60,
+}
+
+
+class GroupHashCacheTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.group = self.create_group(project=self.project)
+        self.grouphash = GroupHash.objects.create(
+            project=self.project, group=self.group, hash="a" * 32
+        )
+        self.addCleanup(invalidate_grouphashes, self.project.id, ["a" * 32, "b" * 32])
+
+    @override_options(CACHE_OPTIONS)
+    def test_cached_after_first_lookup(self):
+        GroupHash.objects.create(project=self.project, hash="b" * 32)
+
+        with self.assertNumQueries(1):
+            grouphashes = get_grouphashes(self.project, ["a" * 32, "b" * 32])
+        assert grouphashes["a" * 32].id == self.grouphash.id
+        assert grouphashes["a" * 32].group_id == self.group.id
+        assert grouphashes["b" * 32].group_id is None
+
+        # Hashes without a group are not cached since they are about to get one.
+        with self.assertNumQueries(1):
+            grouphashes = get_grouphashes(self.project, ["a" * 32, "b" * 32])
+        assert grouphashes["a" * 32].id == self.grouphash.id
+        assert grouphashes["a" * 32].group_id == self.group.id
+
+        with self.assertNumQueries(0):
+            grouphashes = get_grouphashes(self.project, ["a" * 32])
+        assert grouphashes["a" * 32].group_id == self.group.id
+
+    @override_options(CACHE_OPTIONS)
+    def test_locked_in_migration_not_cached(self):
+        GroupHash.objects.filter(id=self.grouphash.id).update(
+            state=GroupHash.State.LOCKED_IN_MIGRATION
+        )
+
+        get_grouphashes(self.project, ["a" * 32])
+        with self.assertNumQueries(1):
+            get_grouphashes(self.project, ["a" * 32])
+
+    @override_options(CACHE_OPTIONS)
+    def test_invalidate(self):
+        get_grouphashes(self.project, ["a" * 32])
+
+        other_group = self.create_group(project=self.project)
+        GroupHash.objects.filter(id=self.grouphash.id).update(group=other_group)
+        assert get_grouphashes(self.project, ["a" * 32])["a" * 32].group_id == self.group.id
+
+        invalidate_grouphashes(self.project.id, ["a" * 32])
+        assert get_grouphashes(self.project, ["a" * 32])["a" * 32].group_id == other_group.id
+
+    @override_options({**CACHE_OPTIONS, "grouphash.local-cache-size": 0})
+    def test_shared_tier(self):
+        get_grouphashes(self.project, ["a" * 32])
+
+        with self.assertNumQueries(0):
+            grouphashes = get_grouphashes(self.project, ["a" * 32])
+        assert grouphashes["a" * 32].group_id == self.group.id
+
+    @override_options(CACHE_OPTIONS)
+    def test_invalidate_reaches_local_cache_of_other_processes(self):
+        get_grouphashes(self.project, ["a" * 32])
+
+        other_group = self.create_group(project=self.project)
+        GroupHash.objects.filter(id=self.grouphash.id).update(group=other_group)
+
+        # Invalidation can't clear the local cache of every process, the entry
+        # is still in ours but the project has moved to a new generation.
+        invalidate_project_grouphashes(self.project.id)
+
+        with self.assertNumQueries(1):
+            grouphashes = get_grouphashes(self.project, ["a" * 32])
+        assert grouphashes["a" * 32].group_id == other_group.id
+
+    @override_options(CACHE_OPTIONS)
+    def test_concurrent_invalidate_not_overwritten(self):
+        other_group = self.create_group(project=self.project)
+        real_filter = GroupHash.objects.filter
+
+        def filter_and_invalidate(*args, **kwargs):
+            # The row is read before it is moved to another group, and the
+            # invalidation lands before the row gets cached.
+            rows = list(real_filter(*args, **kwargs))
+            real_filter(id=self.grouphash.id).update(group=other_group)
+            invalidate_grouphashes(self.project.id, ["a" * 32])
+            return rows
+
+        with mock.patch.object(GroupHash.objects, "filter", side_effect=filter_and_invalidate):
+            grouphashes = get_grouphashes(self.project, ["a" * 32])
+        assert grouphashes["a" * 32].group_id == self.group.id
+
+        assert get_grouphashes(self.project, ["a" * 32])["a" * 32].group_id == other_group.id
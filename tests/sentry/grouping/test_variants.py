@@ -1,9 +1,16 @@
 import pytest
 
+from sentry.eventstore.models import Event
 from sentry.eventtypes.base import format_title_from_tree_label
-from sentry.grouping.api import detect_synthetic_exception, get_default_grouping_config_dict
+from sentry.grouping.api import (
+    detect_synthetic_exception,
+    get_default_grouping_config_dict,
+    get_grouping_variants_for_event,
+    load_default_grouping_config,
+)
 from sentry.grouping.component import GroupingComponent
 from sentry.grouping.strategies.configurations import CONFIGURATIONS
+from sentry.testutils.helpers.options import override_options
 from sentry.utils import json
 from tests.sentry.grouping import with_grouping_input
 
@@ -76,3 +83,43 @@ def test_event_hash_variant(config_name, grouping_input, insta_snapshot, log):
     assert evt.get_grouping_config() == grouping_config
 
     insta_snapshot(output)
+
+
+@override_options({"grouping.variants-cache-size": 10})
+def test_variants_cache():
+    config = load_default_grouping_config()
+
+    def make_event(type, frame_vars):
+        return Event(
+            project_id=1,
+            event_id="a" * 32,
+            data={
+                "platform": "python",
+                "exception": {
+                    "values": [
+                        {
+                            "type": type,
+                            "value": "foo",
+                            "stacktrace": {
+                                "frames": [
+                                    {"function": "main", "module": "app", "vars": frame_vars}
+                                ]
+                            },
+                        }
+                    ]
+                },
+            },
+        )
+
+    variants = get_grouping_variants_for_event(make_event("ValueError", {"x": "1"}), config)
+
+    # Frame vars do not affect grouping, so the variants are shared.
+    cached_variants = get_grouping_variants_for_event(make_event("ValueError", {"x": "2"}), config)
+    assert cached_variants == variants
+    assert all(cached_variants[key] is variant for key, variant in variants.items())
+
+    other_variants = get_grouping_variants_for_event(make_event("TypeError", {"x": "1"}), config)
+    assert other_variants["app"] is not variants["app"]
+    assert {key: variant.get_hash() for key, variant in other_variants.items()} != {
+        key: variant.get_hash() for key, variant in variants.items()
+    }
@@ -1,6 +1,8 @@
 from unittest import TestCase
+from unittest.mock import patch
 
-from sentry.lang.javascript.cache import SourceCache
+from sentry.lang.javascript.cache import SourceCache, get_or_build_sourcemap_cache
+from sentry.testutils.helpers.options import override_options
 
 
 class BasicCacheTest(TestCase):
@@ -34,3 +36,28 @@ class BasicCacheTest(TestCase):
         # fall back to utf-8
         cache.add(url, "foobar".encode("utf-32"), encoding="utf-32")
         assert cache.get(url)[0] == "foobar"
+
+
+class GetOrBuildSourcemapCacheTest(TestCase):
+    @patch("sentry.lang.javascript.cache.SmCache.from_bytes")
+    def test_cached(self, mock_from_bytes):
+        mock_from_bytes.side_effect = lambda source, sourcemap: object()
+
+        with override_options({"processing.sourcemap-cache-size": 100}):
+            first = get_or_build_sourcemap_cache(b"a", b"map-a")
+            assert get_or_build_sourcemap_cache(b"a", b"map-a") is first
+            assert get_or_build_sourcemap_cache(b"b", b"map-a") is not first
+            assert get_or_build_sourcemap_cache(b"a", b"map-b") is not first
+            assert mock_from_bytes.call_count == 3
+
+            # Too large to be kept.
+            get_or_build_sourcemap_cache(b"a", b"x" * 100)
+            get_or_build_sourcemap_cache(b"a", b"x" * 100)
+            assert mock_from_bytes.call_count == 5
+
+    @patch("sentry.lang.javascript.cache.SmCache.from_bytes")
+    def test_disabled(self, mock_from_bytes):
+        with override_options({"processing.sourcemap-cache-size": 0}):
+            get_or_build_sourcemap_cache(b"a", b"map-a")
+            get_or_build_sourcemap_cache(b"a", b"map-a")
+        assert mock_from_bytes.call_count == 2
@@ -30,15 +30,18 @@ from sentry.lang.javascript.processor import (
     fetch_release_file,
     fold_function_name,
     generate_module,
+    get_frame_cache_generation,
     get_function_for_token,
     get_max_age,
     get_release_file_cache_key,
     get_release_file_cache_key_meta,
+    invalidate_frame_cache,
     should_retry_fetch,
     trim_line,
 )
 from sentry.models import (
     ArtifactBundle,
+    ArtifactBundleArchive,
     DebugIdArtifactBundle,
     EventError,
     File,
@@ -48,6 +51,11 @@ from sentry.models import (
     ReleaseFile,
     SourceFileType,
 )
+from sentry.models.artifactbundle import (
+    IndexedArtifactBundleArchive,
+    cache_artifact_bundle_index,
+    get_artifact_bundle_indexes,
+)
 from sentry.models.releasefile import ARTIFACT_INDEX_FILENAME, update_artifact_index
 from sentry.stacktraces.processing import ProcessableFrame, find_stacktraces_in_data
 from sentry.testutils import TestCase
@@ -1593,6 +1601,61 @@ class FetchByDebugIdTest(FetchTest):
         assert result is None
         fetcher.close()
 
+    @override_options({"processing.artifact-bundle-index-ttl": 60})
+    def test_fetch_by_debug_id_with_index(self):
+        debug_id = "c941d872-af1f-4f0c-a7ff-ad3d295fe153"
+        file = self.get_compressed_zip_file(
+            "bundle.zip",
+            {
+                "index.js.map": {
+                    "url": "~/index.js.map",
+                    "type": "source_map",
+                    "content": b"foo" * 100,
+                    "headers": {"debug-id": debug_id},
+                },
+            },
+        )
+        artifact_bundle = ArtifactBundle.objects.create(
+            organization_id=self.organization.id, bundle_id=uuid4(), file=file, artifact_count=1
+        )
+        DebugIdArtifactBundle.objects.create(
+            organization_id=self.organization.id,
+            debug_id=debug_id,
+            artifact_bundle=artifact_bundle,
+            source_file_type=SourceFileType.SOURCE_MAP.value,
+        )
+        ProjectArtifactBundle.objects.create(
+            organization_id=self.organization.id,
+            project_id=self.project.id,
+            artifact_bundle=artifact_bundle,
+        )
+
+        archive = ArtifactBundleArchive(file.getfile())
+        cache_artifact_bundle_index(artifact_bundle.id, archive)
+        file_info = archive.get_file_info("index.js.map")
+        archive.close()
+
+        index = get_artifact_bundle_indexes([artifact_bundle.id])[artifact_bundle.id]
+        indexed_archive = IndexedArtifactBundleArchive(artifact_bundle.file, index)
+        indexed_file_info = indexed_archive.get_file_info("index.js.map")
+        assert indexed_file_info.file_size == file_info.file_size == 300
+        assert indexed_file_info.compress_size == file_info.compress_size
+        assert indexed_file_info.compress_type == file_info.compress_type
+        assert indexed_file_info.CRC == file_info.CRC
+        assert indexed_archive.get_file_info("missing.js") is None
+        indexed_archive.close()
+
+        fetcher = Fetcher(self.organization, self.project)
+        with patch.object(Fetcher, "_fetch_artifact_bundle_file") as fetch_artifact_bundle_file:
+            result = fetcher.fetch_by_debug_id(
+                debug_id=debug_id, source_file_type=SourceFileType.SOURCE_MAP
+            )
+        assert not fetch_artifact_bundle_file.called
+        assert result.url == f"debug-id://{debug_id}/~/index.js.map"
+        assert result.body == b"foo" * 100
+        assert result.headers == {"debug-id": debug_id}
+        fetcher.close()
+
     def test_fetch_by_debug_id_with_invalid_params(self):
         file = self.get_compressed_zip_file(
             "bundle.zip",
@@ -1937,6 +2000,36 @@ class BuildAbsPathDebugIdCacheTest(TestCase):
         }
 
 
+class FrameCacheGenerationTest(TestCase):
+    def test_invalidate(self):
+        generation = get_frame_cache_generation(self.organization.id, "abc")
+        assert get_frame_cache_generation(self.organization.id, "abc") == generation
+        assert get_frame_cache_generation(self.organization.id, "def") != generation
+
+        invalidate_frame_cache(self.organization.id, "abc")
+        assert get_frame_cache_generation(self.organization.id, "abc") != generation
+
+    def test_invalidated_by_uploads(self):
+        release = self.create_release(project=self.project, version="abc")
+        generation = get_frame_cache_generation(self.organization.id, "abc")
+
+        release_file = self.create_release_file(release_id=release.id, name="~/file.min.js")
+        assert get_frame_cache_generation(self.organization.id, "abc") != generation
+
+        generation = get_frame_cache_generation(self.organization.id, "abc")
+        release_file.delete()
+        assert get_frame_cache_generation(self.organization.id, "abc") != generation
+
+        generation = get_frame_cache_generation(self.organization.id, "abc")
+        ReleaseArtifactBundle.objects.create(
+            organization_id=self.organization.id,
+            release_name="abc",
+            dist_name="",
+            artifact_bundle=self.create_artifact_bundle(),
+        )
+        assert get_frame_cache_generation(self.organization.id, "abc") != generation
+
+
 class CacheControlTest(unittest.TestCase):
     def test_simple(self):
         headers = {"content-type": "application/json", "cache-control": "max-age=120"}
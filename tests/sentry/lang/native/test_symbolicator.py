@@ -1,13 +1,16 @@
 import copy
+from unittest import mock
 
 import pytest
+from freezegun import freeze_time
 
 from sentry.lang.native.sources import (
     get_sources_for_project,
     redact_internal_sources,
     reverse_aliases_map,
 )
-from sentry.testutils.helpers import Feature
+from sentry.lang.native.symbolicator import RetrySymbolication, Symbolicator, SymbolicatorTaskKind
+from sentry.testutils.helpers import Feature, override_options
 
 CUSTOM_SOURCE_CONFIG = """
 [{
@@ -267,3 +270,120 @@ class TestAliasReversion:
         reverse_aliases = reverse_aliases_map(builtin_sources)
         expected = {"sentry:ios-source": "sentry:ios", "sentry:tvos-source": "sentry:ios"}
         assert reverse_aliases == expected
+
+
+class FakeSymbolicator:
+    """Symbolicates every frame of a request right away and records the requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    def create_task(self, path, **kwargs):
+        payload = kwargs["json"]
+        self.requests.append(payload)
+        return {
+            "status": "completed",
+            "modules": [dict(module, debug_status="found") for module in payload["modules"]],
+            "stacktraces": [
+                {
+                    "frames": [
+                        dict(frame, function=f"fn_{frame['instruction_addr']}", original_index=idx)
+                        for idx, frame in enumerate(stacktrace["frames"])
+                    ]
+                }
+                for stacktrace in payload["stacktraces"]
+            ],
+        }
+
+
+@pytest.mark.django_db
+class TestSymbolicatorBatching:
+    MODULES = [
+        {
+            "type": "macho",
+            "debug_id": "6b5bb6a6-8c51-3bf8-8b82-3e4fc1ad4f09",
+            "image_addr": "0x1000",
+            "image_size": 4096,
+        }
+    ]
+    SHARED = {"registers": {}, "frames": [{"instruction_addr": "0x1010"}]}
+    OWN = {"registers": {}, "frames": [{"instruction_addr": "0x1020"}]}
+
+    @pytest.fixture(autouse=True)
+    def fake_symbolicator(self):
+        fake = FakeSymbolicator()
+        with override_options({"symbolicator.batch-window": 1.0}), mock.patch(
+            "sentry.lang.native.symbolicator.SymbolicatorSession.create_task",
+            new=fake.create_task,
+        ):
+            yield fake
+
+    def test_batched(self, default_project, fake_symbolicator):
+        leader = Symbolicator(SymbolicatorTaskKind(), default_project, "a" * 32)
+        follower = Symbolicator(SymbolicatorTaskKind(), default_project, "b" * 32)
+
+        with freeze_time("2023-01-01 00:00:00.200") as frozen:
+            with pytest.raises(RetrySymbolication):
+                leader.process_payload([self.SHARED], self.MODULES)
+            with pytest.raises(RetrySymbolication):
+                follower.process_payload([self.SHARED, self.OWN], self.MODULES)
+            assert fake_symbolicator.requests == []
+
+            frozen.tick(2)
+            leader_response = leader.process_payload([self.SHARED], self.MODULES)
+            follower_response = follower.process_payload([self.SHARED, self.OWN], self.MODULES)
+
+        assert len(fake_symbolicator.requests) == 1
+        assert fake_symbolicator.requests[0]["stacktraces"] == [self.SHARED, self.OWN]
+
+        assert [st["frames"][0]["function"] for st in leader_response["stacktraces"]] == [
+            "fn_0x1010"
+        ]
+        assert [st["frames"][0]["function"] for st in follower_response["stacktraces"]] == [
+            "fn_0x1010",
+            "fn_0x1020",
+        ]
+        assert follower_response["modules"][0]["debug_status"] == "found"
+
+    def test_different_modules_not_batched(self, default_project, fake_symbolicator):
+        first = Symbolicator(SymbolicatorTaskKind(), default_project, "a" * 32)
+        second = Symbolicator(SymbolicatorTaskKind(), default_project, "b" * 32)
+        other_modules = [dict(self.MODULES[0], image_addr="0x2000")]
+
+        with freeze_time("2023-01-01 00:00:00.200") as frozen:
+            with pytest.raises(RetrySymbolication):
+                first.process_payload([self.SHARED], self.MODULES)
+            with pytest.raises(RetrySymbolication):
+                second.process_payload([self.SHARED], other_modules)
+
+            frozen.tick(2)
+            first.process_payload([self.SHARED], self.MODULES)
+            second.process_payload([self.SHARED], other_modules)
+
+        assert len(fake_symbolicator.requests) == 2
+
+    def test_follower_falls_back(self, default_project, fake_symbolicator):
+        leader = Symbolicator(SymbolicatorTaskKind(), default_project, "a" * 32)
+        follower = Symbolicator(SymbolicatorTaskKind(), default_project, "b" * 32)
+
+        with freeze_time("2023-01-01 00:00:00.200") as frozen, override_options(
+            {"symbolicator.batch-timeout": 10}
+        ):
+            with pytest.raises(RetrySymbolication):
+                leader.process_payload([self.SHARED], self.MODULES)
+            with pytest.raises(RetrySymbolication):
+                follower.process_payload([self.OWN], self.MODULES)
+
+            # The leader never comes back, so the follower sends its own request.
+            frozen.tick(20)
+            response = follower.process_payload([self.OWN], self.MODULES)
+
+        assert fake_symbolicator.requests == [
+            {
+                "sources": fake_symbolicator.requests[0]["sources"],
+                "options": {"dif_candidates": True},
+                "stacktraces": [self.OWN],
+                "modules": self.MODULES,
+            }
+        ]
+        assert response["stacktraces"][0]["frames"][0]["function"] == "fn_0x1020"
@@ -3,11 +3,13 @@ from datetime import timedelta
 from unittest import mock
 
 import pytest
+from django.test import override_settings
 from django.utils import timezone
 
 from sentry.nodestore.base import json_dumps
 from sentry.nodestore.django.backend import DjangoNodeStorage
 from sentry.nodestore.django.models import Node
+from sentry.testutils.helpers.options import override_options
 from sentry.testutils.silo import region_silo_test
 from sentry.utils.strings import compress
 
@@ -55,6 +57,24 @@ class TestDjangoNodeStorage:
             b'{"foo":"bar"}'
         )
 
+    @region_silo_test(stable=True)
+    def test_set_with_codec(self, tmp_path):
+        with override_settings(
+            SENTRY_NODESTORE_CODEC="sentry.nodestore.codecs.ZstdDictionaryCodec",
+            SENTRY_NODESTORE_CODEC_OPTIONS={"path": str(tmp_path)},
+        ):
+            ns = DjangoNodeStorage()
+            ns.set("d2502ebbd7df41ceba8d3275595cac33", {"foo": "bar"})
+
+            # Payloads compressed by the codec are not compressed again.
+            data = Node.objects.get(id="d2502ebbd7df41ceba8d3275595cac33").data
+            assert data.startswith("raw:")
+            assert ns.get("d2502ebbd7df41ceba8d3275595cac33") == {"foo": "bar"}
+
+            # Nodes written before the codec was enabled are still readable.
+            Node.objects.create(id="5394aa025b8e401ca6bc3ddee3130edc", data=compress(b'{"a": 1}'))
+            assert ns.get("5394aa025b8e401ca6bc3ddee3130edc") == {"a": 1}
+
     @region_silo_test(stable=True)
     def test_delete(self):
         node = Node.objects.create(id="d2502ebbd7df41ceba8d3275595cac33", data=b'{"foo": "bar"}')
@@ -139,3 +159,57 @@ class TestDjangoNodeStorage:
             self.ns.get("node_4")
             self.ns.get("node_4")
             assert mock_get.call_count == 2
+
+    @override_options({"nodedata.local-cache-size": 10})
+    def test_local_cache(self):
+        node_1 = ("a" * 32, {"foo": "a"})
+        node_2 = ("b" * 32, {"foo": "b"})
+        self.ns.set(*node_1)
+        self.ns.set(*node_2)
+
+        # The shared cache is not consulted for items held locally
+        with mock.patch.object(self.ns.cache, "get") as mock_get, mock.patch.object(
+            self.ns.cache, "get_many"
+        ) as mock_get_many, mock.patch.object(Node.objects, "filter") as mock_filter:
+            assert self.ns.get(node_1[0]) == node_1[1]
+            assert self.ns.get_multi([node_1[0], node_2[0]]) == dict([node_1, node_2])
+            assert mock_get.call_count == 0
+            assert mock_get_many.call_count == 0
+            assert mock_filter.call_count == 0
+
+        # Mutating a returned payload does not leak into the cache
+        self.ns.get(node_1[0])["foo"] = "mutated"
+        assert self.ns.get(node_1[0]) == node_1[1]
+
+        # Shared cache hits populate the local tier
+        self.ns.local_cache.clear()
+        assert self.ns.get_multi([node_1[0], node_2[0]]) == dict([node_1, node_2])
+        assert set(self.ns.local_cache) == {node_1[0], node_2[0]}
+
+        # Deletion clears both tiers
+        self.ns.delete(node_1[0])
+        assert node_1[0] not in self.ns.local_cache
+        assert self.ns.get(node_1[0]) is None
+        self.ns.delete_multi([node_2[0]])
+        assert self.ns.get_multi([node_2[0]]) == {}
+
+    @override_options({"nodedata.local-cache-size": 10})
+    @mock.patch("sentry.nodestore.base.metrics")
+    def test_local_cache_metrics(self, metrics):
+        node_id = "a" * 32
+        self.ns.set(node_id, {"foo": "a"})
+        self.ns.local_cache.clear()
+
+        self.ns.get(node_id)
+        metrics.incr.assert_any_call(
+            "nodestore.cache", amount=1, tags={"tier": "local", "result": "miss"}
+        )
+        metrics.incr.assert_any_call(
+            "nodestore.cache", amount=1, tags={"tier": "shared", "result": "hit"}
+        )
+
+        metrics.reset_mock()
+        self.ns.get(node_id)
+        metrics.incr.assert_called_once_with(
+            "nodestore.cache", amount=1, tags={"tier": "local", "result": "hit"}
+        )
@@ -0,0 +1,46 @@
+import pytest
+from django.test import override_settings
+
+from sentry.nodestore.filesystem.backend import FileSystemNodeStorage
+from sentry.testutils.helpers.options import override_options
+
+
+def benchmark_available():
+    try:
+        import pytest_benchmark  # NOQA
+    except ModuleNotFoundError:
+        return False
+    else:
+        return True
+
+
+# A handful of hot events requested over and over again, the way event
+# details, post-process and reprocessing tend to.
+NODE_IDS = [f"{i:032x}" for i in range(20)]
+HOT_NODE_IDS = NODE_IDS[:5]
+
+
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize("local_cache_size", [0, 100], ids=lambda x: "local" if x else "shared")
+def test_benchmark_get_multi(local_cache_size, benchmark, tmp_path):
+    # The local tier is set up on first use, so the option has to be in place
+    # before the storage is touched.
+    with override_options({"nodedata.local-cache-size": local_cache_size}):
+        with override_settings(DEBUG=True):
+            ns = FileSystemNodeStorage(path=str(tmp_path))
+        ns.bootstrap()
+
+        payload = {"exception": {"values": [{"stacktrace": {"frames": [{"lineno": 1}] * 100}}]}}
+        for node_id in NODE_IDS:
+            ns.set(node_id, payload)
+
+        if local_cache_size:
+            assert set(HOT_NODE_IDS) <= set(ns.local_cache)
+        else:
+            assert ns.local_cache is None
+
+        def run():
+            for _ in range(20):
+                ns.get_multi(HOT_NODE_IDS)
+
+        benchmark(run)
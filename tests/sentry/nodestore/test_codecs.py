@@ -0,0 +1,127 @@
+import os
+
+import pytest
+import zstandard
+from django.test import override_settings
+
+from sentry.nodestore import base
+from sentry.nodestore.base import SEGMENTS_HEADER, NodeStorage
+from sentry.nodestore.codecs import (
+    NodeCodec,
+    ZstdDictionaryCodec,
+    get_dictionary_filename,
+    get_dictionary_id,
+)
+from sentry.testutils.helpers.options import override_options
+from sentry.utils import json
+
+
+def make_payload(i, platform="python"):
+    frames = [
+        {"filename": f"app/module_{n}.py", "function": f"handler_{n}", "lineno": n, "in_app": True}
+        for n in range(i % 30)
+    ]
+    return json.dumps(
+        {"platform": platform, "exception": {"values": [{"stacktrace": {"frames": frames}}]}}
+    ).encode("utf8")
+
+
+def write_dictionary(path, platform, version):
+    samples = [make_payload(i, platform) for i in range(300)]
+    dictionary = zstandard.train_dictionary(
+        4096, samples, dict_id=get_dictionary_id(platform, version)
+    )
+    with open(os.path.join(path, get_dictionary_filename(platform, version)), "wb") as f:
+        f.write(dictionary.as_bytes())
+    return dictionary
+
+
+@pytest.fixture
+def dictionary_path(tmp_path):
+    write_dictionary(str(tmp_path), "python", 1)
+    return str(tmp_path)
+
+
+def test_node_codec_is_passthrough():
+    codec = NodeCodec()
+    assert codec.encode(b'{"foo":"bar"}', platform="python") == b'{"foo":"bar"}'
+    assert codec.decode(b'{"foo":"bar"}') == b'{"foo":"bar"}'
+
+
+def test_zstd_dictionary_codec_roundtrip(dictionary_path):
+    codec = ZstdDictionaryCodec(path=dictionary_path)
+    payload = make_payload(20)
+
+    encoded = codec.encode(payload, platform="python")
+    assert len(encoded) < len(payload)
+    assert zstandard.get_frame_parameters(encoded).dict_id == get_dictionary_id("python", 1)
+    assert codec.decode(encoded) == payload
+
+    # No dictionary for this platform, falls back to plain zstd
+    encoded = codec.encode(payload, platform="cocoa")
+    assert zstandard.get_frame_parameters(encoded).dict_id == 0
+    assert codec.decode(encoded) == payload
+
+
+def test_zstd_dictionary_codec_uses_latest_version(dictionary_path):
+    old_codec = ZstdDictionaryCodec(path=dictionary_path)
+    old_encoded = old_codec.encode(make_payload(20), platform="python")
+
+    write_dictionary(dictionary_path, "python", 2)
+    codec = ZstdDictionaryCodec(path=dictionary_path)
+    encoded = codec.encode(make_payload(20), platform="python")
+    assert zstandard.get_frame_parameters(encoded).dict_id == get_dictionary_id("python", 2)
+
+    # Nodes written with older dictionaries can still be read
+    assert codec.decode(old_encoded) == make_payload(20)
+
+
+def test_zstd_dictionary_codec_reads_uncompressed(dictionary_path):
+    codec = ZstdDictionaryCodec(path=dictionary_path)
+    assert codec.decode(b'{"foo":"bar"}\nother\n{}') == b'{"foo":"bar"}\nother\n{}'
+
+
+def test_zstd_dictionary_codec_unknown_dictionary(dictionary_path, tmp_path_factory):
+    encoded = ZstdDictionaryCodec(path=dictionary_path).encode(make_payload(20), "python")
+    codec = ZstdDictionaryCodec(path=str(tmp_path_factory.mktemp("empty")))
+    with pytest.raises(ValueError):
+        codec.decode(encoded)
+
+
+def test_nodestore_encode_decode_with_codec(dictionary_path):
+    with override_settings(
+        SENTRY_NODESTORE_CODEC="sentry.nodestore.codecs.ZstdDictionaryCodec",
+        SENTRY_NODESTORE_CODEC_OPTIONS={"path": dictionary_path},
+    ):
+        ns = NodeStorage()
+        data = json.loads(make_payload(20))
+        encoded = ns._encode({None: data, "unprocessed": {"foo": "bar"}})
+        assert encoded.startswith(zstandard.FRAME_HEADER)
+        assert ns._decode(encoded, subkey=None) == data
+        assert ns._decode(encoded, subkey="unprocessed") == {"foo": "bar"}
+
+        # Payloads written before the codec was enabled are still readable
+        assert ns._decode(b'{"foo":"bar"}', subkey=None) == {"foo": "bar"}
+
+
+@override_options({"nodedata.segmented-layout": True})
+def test_nodestore_segments_decode_only_requested_subkey(dictionary_path, monkeypatch):
+    with override_settings(
+        SENTRY_NODESTORE_CODEC="sentry.nodestore.codecs.ZstdDictionaryCodec",
+        SENTRY_NODESTORE_CODEC_OPTIONS={"path": dictionary_path},
+    ):
+        ns = NodeStorage()
+        data = json.loads(make_payload(20))
+        encoded = ns._encode({None: data, "unprocessed": {"foo": "bar"}})
+        assert encoded.startswith(SEGMENTS_HEADER)
+
+        decoded = []
+
+        def json_loads(value):
+            decoded.append(value)
+            return json.loads(value)
+
+        monkeypatch.setattr(base, "json_loads", json_loads)
+        assert ns._decode(encoded, subkey="unprocessed") == {"foo": "bar"}
+        assert decoded == [b'{"foo":"bar"}']
+        assert ns._decode(encoded, subkey=None) == data
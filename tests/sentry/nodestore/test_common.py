@@ -6,7 +6,9 @@ from contextlib import nullcontext
 
 import pytest
 
+from sentry.nodestore.base import SEGMENTS_HEADER
 from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.testutils.helpers.options import override_options
 from sentry.testutils.silo import region_silo_test
 from tests.sentry.nodestore.bigtable.test_backend import (
     MockedBigtableNodeStorage,
@@ -97,3 +99,25 @@ def test_set_subkeys(ns):
     ns.delete("node_1")
     assert ns.get("node_1") is None
     assert ns.get("node_1", subkey="other") is None
+
+
+@region_silo_test(stable=True)
+def test_set_subkeys_segmented(ns):
+    ns.set_subkeys("node_1", {None: {"foo": "a"}, "legacy": {"foo": "b"}})
+
+    with override_options({"nodedata.segmented-layout": True}):
+        ns.set_subkeys("node_2", {None: {"foo": "a"}, "other": {"foo": "b"}})
+        assert ns._get_bytes("node_2").startswith(SEGMENTS_HEADER)
+
+        # Both layouts can be read side by side
+        assert ns.get("node_1", subkey="legacy") == {"foo": "b"}
+        assert ns.get("node_2") == {"foo": "a"}
+        assert ns.get("node_2", subkey="other") == {"foo": "b"}
+        assert ns.get("node_2", subkey="missing") is None
+        assert ns.get_multi(["node_1", "node_2"], subkey="other") == {
+            "node_1": None,
+            "node_2": {"foo": "b"},
+        }
+
+    # ...also once the option is turned off again
+    assert ns.get("node_2", subkey="other") == {"foo": "b"}
@@ -0,0 +1,97 @@
+from unittest import mock
+
+import pytest
+
+from sentry.ownership.compiled import CompiledSchema, get_compiled_schema
+from sentry.ownership.grammar import dump_schema, load_schema, parse_rules
+from sentry.testutils.helpers import override_options
+
+rules_data = r"""
+*.js                      #frontend
+url:http://google.com/*   #backend
+url:*.example.com/api/*   #backend
+path:src/sentry/*         david@sentry.io
+path:*local/src/*         david@sentry.io
+path:C:\code\app.py       windows@sentry.io
+path:*/MAIN.PY            upper@sentry.io
+tags.foo:bar              tagperson@sentry.io
+module:foo.bar            #workflow
+module:com.android*       #mobile
+module:*somethinginthemiddle*  #mobile
+codeowners:/src/components/  githubuser@sentry.io
+codeowners:frontend/*.ts     githubmod@sentry.io
+codeowners:**/test_*.py      #tests
+codeowners:docs/             #docs
+codeowners:*                 #everyone
+path:src/[ab]/*.py        brackets@sentry.io
+path:src/ünïcode/*        unicode@sentry.io
+path:*.js                 #frontend
+"""
+
+
+def _frames(*frames):
+    return {"exception": {"values": [{"stacktrace": {"frames": list(frames)}}]}}
+
+
+events = [
+    {},
+    {"request": {"url": None}},
+    {"request": {"url": "http://google.com/search"}},
+    {"request": {"url": "https://www.EXAMPLE.com/api/users"}},
+    {"tags": [["foo", "bar"]]},
+    _frames({"filename": "foo/file.py"}, {"abs_path": "/usr/local/src/other/app.py"}),
+    _frames({"filename": "src/sentry/models.py"}, {"filename": "app.js"}),
+    _frames({"abs_path": "C:\\code\\app.py"}, {"filename": "lib/main.py"}),
+    _frames({"filename": "src/components/Button.tsx"}, {"filename": "frontend/index.ts"}),
+    _frames({"filename": "tests/sentry/test_models.py"}, {"filename": "docs/index.md"}),
+    _frames({"filename": "src/a/models.py"}, {"filename": "src/ünïcode/models.py"}),
+    _frames({"filename": "src/ÜNÏCODE/x"}, {"filename": "SRC/SENTRY/MODELS.PY"}),
+    _frames(
+        {"module": "com.android.internal.os.Init", "filename": "Init.java"},
+        {"module": "com.sentry.somethinginthemiddle.Custom", "filename": "SourceFile"},
+        {"module": "foo.bar"},
+    ),
+    {
+        "platform": "python",
+        "stacktrace": {"frames": [{"filename": "src/sentry/api.py"}, None, {"lineno": 1}]},
+    },
+]
+
+
+@pytest.mark.parametrize("data", events)
+def test_matching_rules_identical(data):
+    schema = dump_schema(parse_rules(rules_data))
+
+    expected = [rule for rule in load_schema(schema) if rule.test(data)]
+    assert CompiledSchema(schema).get_matching_rules(data) == expected
+
+
+def test_only_candidate_patterns_tested():
+    schema = dump_schema(
+        parse_rules("".join(f"codeowners:src/module_{i}/ #team{i}\n" for i in range(1000)))
+    )
+    data = _frames({"filename": "src/module_7/views.py"}, {"filename": "src/other/views.py"})
+
+    match = mock.Mock(return_value=True)
+    with mock.patch.dict("sentry.ownership.compiled.MATCH_FUNCS", {"codeowners": match}):
+        rules = CompiledSchema(schema).get_matching_rules(data)
+
+    # Only the patterns sharing the rarest trigram of module_7 are tested, and
+    # only against the value containing their literal runs.
+    assert rules and all("module_7" in rule.matcher.pattern for rule in rules)
+    assert all(call.args[0] == "src/module_7/views.py" for call in match.call_args_list)
+
+
+def test_get_compiled_schema():
+    schema = dump_schema(parse_rules(rules_data))
+
+    with override_options({"ownership.compiled-schema-cache-size": 0}):
+        assert get_compiled_schema(1, schema) is None
+
+    with override_options({"ownership.compiled-schema-cache-size": 10}):
+        compiled = get_compiled_schema(1, schema)
+        assert get_compiled_schema(1, dict(schema)) is compiled
+        assert get_compiled_schema(2, schema) is not compiled
+
+        schema["rules"] = schema["rules"][1:]
+        assert get_compiled_schema(1, schema) is not compiled
@@ -6,6 +6,7 @@ from sentry.ratelimits.cardinality import (
     GrantedQuota,
     Quota,
     RedisBlasterBackend,
+    RedisBloomCardinalityLimiter,
     RedisCardinalityLimiter,
     RedisClusterBackend,
     RequestedQuota,
@@ -25,6 +26,16 @@ def limiter(request, settings):
         yield instance
 
 
+@pytest.fixture(params=["cluster", "rb"])
+def bloom_limiter(request, settings):
+    instance = RedisBloomCardinalityLimiter()
+    if request.param == "rb":
+        instance.backend = RedisBlasterBackend(redis.clusters.get("default"))
+    else:
+        instance.backend = RedisClusterBackend(redis.redis_clusters.get("default"))
+    yield instance
+
+
 class LimiterHelper:
     """
     Wrapper interface around the rate limiter, with specialized, stateful and
@@ -235,3 +246,61 @@ def test_regression_mixed_order(limiter: RedisCardinalityLimiter):
     # there used to be a bug where anything after 10 (i.e. 5) was dropped as
     # well (due to a wrong `break` somewhere in a loop)
     assert helper.add_values([0, 1, 2, 3, 4, 6, 7, 8, 9, 10, 5]) == [0, 1, 2, 3, 4, 6, 7, 8, 9, 5]
+
+
+def test_bloom_basic(bloom_limiter: RedisBloomCardinalityLimiter):
+    helper = LimiterHelper(bloom_limiter)
+    helper.quota = Quota(window_seconds=3600, granularity_seconds=60, limit=100)
+
+    admissions = [helper.add_value(i) for i in range(1000)]
+    admitted = [value for value in admissions if value is not None]
+
+    # The first 100 hashes fill up the quota, after which only false positives
+    # of the Bloom filter are admitted.
+    assert admitted[:100] == list(range(100))
+    assert len(admitted) <= 100 + 900 * 0.03
+
+    # Hashes that have been admitted before are admitted for free.
+    assert list(helper.add_values(admitted)) == admitted
+
+    helper.timestamp += 3600
+
+    assert [helper.add_value(2000 + i) for i in range(100)] == list(range(2000, 2100))
+
+
+def test_bloom_multiple_prefixes(bloom_limiter: RedisBloomCardinalityLimiter):
+    quota = Quota(window_seconds=3600, granularity_seconds=60, limit=10)
+    requests = [
+        RequestedQuota(prefix="a", unit_hashes=[1, 2, 3, 4, 5], quota=quota),
+        RequestedQuota(prefix="b", unit_hashes=list(range(1, 12)), quota=quota),
+    ]
+    new_timestamp, grants = bloom_limiter.check_within_quotas(requests, timestamp=3600)
+
+    assert grants == [
+        GrantedQuota(request=requests[0], granted_unit_hashes=[1, 2, 3, 4, 5], reached_quota=None),
+        GrantedQuota(
+            request=requests[1], granted_unit_hashes=list(range(1, 11)), reached_quota=quota
+        ),
+    ]
+    bloom_limiter.use_quotas(grants, new_timestamp)
+
+    requests = [RequestedQuota(prefix="a", unit_hashes=list(range(1, 12)), quota=quota)]
+    new_timestamp, grants = bloom_limiter.check_within_quotas(requests, timestamp=3600)
+    assert grants == [
+        GrantedQuota(
+            request=requests[0], granted_unit_hashes=list(range(1, 11)), reached_quota=quota
+        )
+    ]
+
+
+def test_bloom_memory_is_bounded(bloom_limiter: RedisBloomCardinalityLimiter):
+    helper = LimiterHelper(bloom_limiter)
+
+    for i in range(10):
+        helper.add_values(range(i * 1000, (i + 1) * 1000))
+
+    # One filter and one HyperLogLog per time bucket in the window, regardless
+    # of how many hashes were requested.
+    client = redis.redis_clusters.get("default")
+    assert len(client.keys("cardinality:bloom:hello-*")) == 60
+    assert len(client.keys("cardinality:hll:hello-*")) == 60
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 
 from sentry.ratelimits.sliding_windows import (
@@ -8,9 +10,9 @@ from sentry.ratelimits.sliding_windows import (
 )
 
 
-@pytest.fixture
-def limiter():
-    return RedisSlidingWindowRateLimiter()
+@pytest.fixture(params=[0, 5], ids=["no-leasing", "leasing"])
+def limiter(request):
+    return RedisSlidingWindowRateLimiter(lease_size=request.param)
 
 
 TIMESTAMP_OFFSET = 100
@@ -121,3 +123,70 @@ def test_conflicting_quotas(limiter):
         GrantedQuota(prefix="foo", granted=6, reached_quotas=[]),
         GrantedQuota(prefix="bar", granted=4, reached_quotas=quotas),
     ]
+
+
+def test_leasing_serves_grants_locally():
+    limiter = RedisSlidingWindowRateLimiter(lease_size=5)
+    quotas = [Quota(window_seconds=10, granularity_seconds=10, limit=10)]
+
+    with mock.patch.object(limiter.client, "pipeline", wraps=limiter.client.pipeline) as pipeline:
+        for _ in range(5):
+            resp = limiter.check_and_use_quotas(
+                [RequestedQuota(prefix="foo", requested=1, quotas=quotas)],
+                timestamp=TIMESTAMP_OFFSET,
+            )
+            assert resp == [GrantedQuota(prefix="foo", granted=1, reached_quotas=[])]
+
+    # One round trip to read the quota, one to lease it.
+    assert pipeline.call_count == 2
+
+
+def test_leasing_shares_quota_between_processes():
+    quotas = [Quota(window_seconds=10, granularity_seconds=1, limit=10)]
+    first = RedisSlidingWindowRateLimiter(lease_size=8)
+    second = RedisSlidingWindowRateLimiter(lease_size=8)
+
+    resp = first.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=1, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=1, reached_quotas=[])]
+
+    # The unused part of the first lease is unavailable to the second process.
+    resp = second.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=5, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=2, reached_quotas=quotas)]
+
+    # Once the granule ends, the first process gives back what it did not
+    # use the next time it talks to Redis, which makes it available again.
+    resp = first.check_and_use_quotas(
+        [RequestedQuota(prefix="bar", requested=1, quotas=quotas)], timestamp=TIMESTAMP_OFFSET + 1
+    )
+    assert resp == [GrantedQuota(prefix="bar", granted=1, reached_quotas=[])]
+
+    resp = second.check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=10, quotas=quotas)],
+        timestamp=TIMESTAMP_OFFSET + 1,
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=7, reached_quotas=quotas)]
+
+
+def test_leasing_counts_grants_beyond_lease():
+    quotas = [Quota(window_seconds=10, granularity_seconds=10, limit=10)]
+    limiter = RedisSlidingWindowRateLimiter(lease_size=5)
+    requests = [RequestedQuota(prefix="foo", requested=4, quotas=quotas)]
+
+    # Both checks are granted against the same lease of 5 before either of
+    # them uses its grant.
+    timestamp, first = limiter.check_within_quotas(requests, timestamp=TIMESTAMP_OFFSET)
+    _, second = limiter.check_within_quotas(requests, timestamp=TIMESTAMP_OFFSET)
+    assert first == second == [GrantedQuota(prefix="foo", granted=4, reached_quotas=[])]
+
+    limiter.use_quotas(requests, first, timestamp)
+    limiter.use_quotas(requests, second, timestamp)
+
+    # What the second grant used beyond the lease is counted in Redis.
+    resp = RedisSlidingWindowRateLimiter().check_and_use_quotas(
+        [RequestedQuota(prefix="foo", requested=10, quotas=quotas)], timestamp=TIMESTAMP_OFFSET
+    )
+    assert resp == [GrantedQuota(prefix="foo", granted=2, reached_quotas=quotas)]
@@ -6,6 +6,7 @@ from django.core.cache import cache
 from django.db import DEFAULT_DB_ALIAS, connections
 from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from freezegun import freeze_time
 
 from sentry.models import GroupRuleStatus, GroupStatus, ProjectOwnership, Rule, RuleFireHistory
 from sentry.notifications.types import ActionTargetType
@@ -14,6 +15,7 @@ from sentry.rules.conditions import EventCondition
 from sentry.rules.filters.base import EventFilter
 from sentry.rules.processor import RuleProcessor
 from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
 from sentry.testutils.silo import region_silo_test
 
 EMAIL_ACTION_DATA = {
@@ -115,6 +117,39 @@ class RuleProcessorTest(TestCase):
         results = list(rp.apply())
         assert len(results) == 0
 
+    @override_options({"rules.processor.buffered-rule-status": True})
+    def test_buffered_rule_status(self):
+        def apply_rules():
+            rp = RuleProcessor(
+                self.group_event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            return list(rp.apply())
+
+        with patch("sentry.rules.processor.buffer_incr") as buffer_incr:
+            results = apply_rules()
+            assert len(results) == 1
+            status = GroupRuleStatus.objects.get(rule=self.rule, group=self.group_event.group)
+            buffer_incr.assert_called_once_with(
+                model=GroupRuleStatus,
+                columns={},
+                filters={"id": status.id},
+                extra={"last_active": mock.ANY},
+            )
+
+            # The rule doesn't fire again within its frequency even though the status in the
+            # database wasn't updated yet.
+            assert status.last_active is None
+            assert apply_rules() == []
+            assert buffer_incr.call_count == 1
+
+            with freeze_time(timezone.now() + timedelta(minutes=Rule.DEFAULT_FREQUENCY + 1)):
+                assert len(apply_rules()) == 1
+            assert buffer_incr.call_count == 2
+
     def run_query_test(self, rp, expected_queries):
         with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
             results = list(rp.apply())
@@ -219,6 +254,121 @@ class RuleProcessorTest(TestCase):
         # mock condition first.
         assert passes.call_count == 0
 
+    @override_options({"rules.processor.plan-cache-size": 10})
+    def test_rule_plans_cached(self):
+        def get_rule_plans():
+            rp = RuleProcessor(
+                self.group_event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            return rp.get_rule_plans()
+
+        with patch.object(
+            RuleProcessor, "compile_rule", autospec=True, side_effect=RuleProcessor.compile_rule
+        ) as compile_rule:
+            plans = get_rule_plans()
+            assert get_rule_plans() == plans
+            assert compile_rule.call_count == 1
+
+            # Saving the rule recompiles it
+            self.rule.data = {**self.rule.data, "action_match": "any"}
+            self.rule.save()
+            new_plans = get_rule_plans()
+            assert compile_rule.call_count == 2
+            assert new_plans[0].match_names == {"condition": "any"}
+
+    @patch(
+        "sentry.constants._SENTRY_RULES",
+        [
+            "sentry.mail.actions.NotifyEmailAction",
+            "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+        ],
+    )
+    def test_frequency_conditions_share_queries(self):
+        frequency_condition = {
+            "id": "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+            "interval": "1h",
+            "value": 10,
+        }
+        self.rule.update(data={"conditions": [frequency_condition], "actions": [EMAIL_ACTION_DATA]})
+        Rule.objects.create(
+            project=self.group_event.project,
+            data={
+                "conditions": [{**frequency_condition, "value": 20}],
+                "actions": [EMAIL_ACTION_DATA],
+            },
+        )
+        rule_3 = Rule.objects.create(
+            project=self.group_event.project,
+            data={
+                "conditions": [{**frequency_condition, "interval": "1d"}],
+                "actions": [EMAIL_ACTION_DATA],
+            },
+        )
+        with patch("sentry.rules.processor.rules", init_registry()), patch(
+            "sentry.rules.conditions.event_frequency.EventFrequencyCondition.query_hook",
+            return_value=15,
+        ) as query_hook:
+            rp = RuleProcessor(
+                self.group_event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            results = list(rp.apply())
+
+        # One query per distinct interval
+        assert query_hook.call_count == 2
+        assert len(results) == 1
+        assert {future.rule for future in results[0][1]} == {self.rule, rule_3}
+
+    @patch(
+        "sentry.constants._SENTRY_RULES",
+        [
+            "sentry.mail.actions.NotifyEmailAction",
+            "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+        ],
+    )
+    def test_frequency_results_shared_by_events(self):
+        self.rule.update(
+            data={
+                "conditions": [
+                    {
+                        "id": "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+                        "interval": "1h",
+                        "value": 20,
+                    }
+                ],
+                "actions": [EMAIL_ACTION_DATA],
+            }
+        )
+
+        def apply_rules(options):
+            with override_options(options), patch(
+                "sentry.rules.processor.rules", init_registry()
+            ), patch(
+                "sentry.rules.conditions.event_frequency.EventFrequencyCondition.query_hook",
+                return_value=15,
+            ) as query_hook:
+                for _ in range(2):
+                    rp = RuleProcessor(
+                        self.group_event,
+                        is_new=False,
+                        is_regression=False,
+                        is_new_group_environment=False,
+                        has_reappeared=False,
+                    )
+                    assert not list(rp.apply())
+            return query_hook.call_count
+
+        assert apply_rules({"rules.frequency-result-cache-ttl": 0}) == 2
+        assert apply_rules({"rules.frequency-result-cache-ttl": 60}) == 1
+        assert apply_rules({"rules.frequency-result-cache-ttl": 60}) == 0
+
 
 class MockFilterTrue(EventFilter):
     id = "tests.sentry.rules.test_processor.MockFilterTrue"
@@ -441,3 +591,48 @@ class RuleProcessorTestFilters(TestCase):
         assert len(futures) == 1
         assert futures[0].rule == self.rule
         assert futures[0].kwargs == {}
+
+    @patch(
+        "sentry.constants._SENTRY_RULES",
+        MOCK_SENTRY_RULES_WITH_FILTERS
+        + ("sentry.rules.conditions.event_frequency.EventFrequencyCondition",),
+    )
+    def test_cheap_predicates_short_circuit(self):
+        Rule.objects.filter(project=self.group_event.project).delete()
+        Rule.objects.create(
+            project=self.group_event.project,
+            data={
+                "conditions": [
+                    {
+                        "id": "sentry.rules.conditions.event_frequency.EventFrequencyCondition",
+                        "interval": "1h",
+                        "value": 10,
+                    },
+                    {"id": "tests.sentry.rules.test_processor.MockFilterTrue"},
+                    {"id": "tests.sentry.rules.test_processor.MockFilterFalse"},
+                ],
+                "filter_match": "any",
+                "action_match": "none",
+                "actions": [EMAIL_ACTION_DATA],
+            },
+        )
+        with patch("sentry.rules.processor.rules", init_registry()), patch(
+            "tests.sentry.rules.test_processor.MockFilterFalse.passes"
+        ) as filter_passes, patch(
+            "sentry.rules.conditions.event_frequency.BaseEventFrequencyCondition.passes",
+            return_value=True,
+        ) as frequency_passes:
+            rp = RuleProcessor(
+                self.group_event,
+                is_new=True,
+                is_regression=True,
+                is_new_group_environment=True,
+                has_reappeared=True,
+            )
+            results = list(rp.apply())
+
+        # The filters match once the first one passes, and the frequency condition decides
+        # the rule
+        assert filter_passes.call_count == 0
+        assert frequency_passes.call_count == 1
+        assert len(results) == 0
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import zstandard
+
+from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.codecs import ZstdDictionaryCodec, get_dictionary_id
+from sentry.runner.commands.nodestore import train_dictionaries
+from sentry.testutils import CliTestCase
+from sentry.testutils.helpers import override_options
+from sentry.utils import json
+
+
+class TrainDictionariesTest(CliTestCase):
+    command = train_dictionaries
+
+    def setUp(self):
+        super().setUp()
+        self.nodes = self.create_tempdir()
+        self.output = os.path.join(self.create_tempdir(), "dictionaries")
+        for i in range(200):
+            frames = [{"filename": f"app/module_{n}.py", "lineno": n} for n in range(i % 30)]
+            payload = {"platform": "python", "exception": {"values": [{"frames": frames}]}}
+            with open(os.path.join(self.nodes, f"{i:032x}.json"), "wb") as f:
+                f.write(json.dumps(payload).encode("utf8") + b"\nunprocessed\n{}")
+
+    def create_tempdir(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        return path
+
+    def test_train(self):
+        rv = self.invoke(self.nodes, self.output, "--version=1", "--dict-size=4096")
+        assert rv.exit_code == 0, rv.output
+        assert os.listdir(self.output) == ["python-1.zdict"]
+
+        codec = ZstdDictionaryCodec(path=self.output)
+        encoded = codec.encode(b'{"platform":"python"}', platform="python")
+        assert zstandard.get_frame_parameters(encoded).dict_id == get_dictionary_id("python", 1)
+
+    def test_refuses_to_overwrite(self):
+        rv = self.invoke(self.nodes, self.output, "--version=1", "--dict-size=4096")
+        assert rv.exit_code == 0, rv.output
+        rv = self.invoke(self.nodes, self.output, "--version=1", "--dict-size=4096")
+        assert rv.exit_code != 0
+        assert "already exists" in rv.output
+
+    @override_options({"nodedata.segmented-layout": True})
+    def test_train_segmented(self):
+        ns = NodeStorage()
+        for filename in os.listdir(self.nodes):
+            path = os.path.join(self.nodes, filename)
+            with open(path, "rb") as f:
+                main = ns._decode_payload(f.read(), subkey=None)
+            with open(path, "wb") as f:
+                f.write(ns._encode({None: main, "unprocessed": {}}))
+
+        with mock.patch("zstandard.train_dictionary", wraps=zstandard.train_dictionary) as train:
+            rv = self.invoke(self.nodes, self.output, "--version=1", "--dict-size=4096")
+        assert rv.exit_code == 0, rv.output
+        assert os.listdir(self.output) == ["python-1.zdict"]
+
+        # Every segment is a sample on its own, decoded from the segmented layout.
+        (_, samples), _ = train.call_args
+        assert len(samples) == 400
+        assert all(isinstance(json.loads(sample), dict) for sample in samples)
@@ -50,12 +50,13 @@ from sentry.tasks.derive_code_mappings import SUPPORTED_LANGUAGES
 from sentry.tasks.merge import merge_groups
 from sentry.tasks.post_process import (
     ISSUE_OWNERS_PER_PROJECT_PER_MIN_RATELIMIT,
+    locks,
     post_process_group,
     process_event,
 )
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.cases import BaseTestCase
-from sentry.testutils.helpers import with_feature
+from sentry.testutils.helpers import override_options, with_feature
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.testutils.helpers.eventprocessing import write_event_to_cache
 from sentry.testutils.performance_issues.store_transaction import PerfIssueTransactionTestMixin
@@ -1238,6 +1239,79 @@ class AssignmentTestMixin(BasePostProgressGroupMixin):
             },
         )
 
+    @override_options({"post_process.owner-assignment-coalesce-window": 60})
+    @patch("sentry.tasks.post_process.metrics")
+    def test_coalesces_auto_assignment(self, mock_metrics):
+        self.make_ownership()
+        event = self.create_event(
+            data={
+                "message": "oh no",
+                "platform": "python",
+                "stacktrace": {"frames": [{"filename": "src/app/example.py"}]},
+            },
+            project_id=self.project.id,
+        )
+        with patch.object(
+            ProjectOwnership,
+            "handle_auto_assignment",
+            wraps=ProjectOwnership.handle_auto_assignment,
+        ) as handle_auto_assignment:
+            for _ in range(3):
+                self.call_post_process_group(
+                    is_new=False,
+                    is_regression=False,
+                    is_new_group_environment=False,
+                    event=event,
+                )
+            assert handle_auto_assignment.call_count == 1
+            assert event.group.assignee_set.first().user_id == self.user.id
+
+            # Unassigning the group lets the next event auto-assign it again.
+            GroupAssignee.objects.deassign(event.group, self.user)
+            self.call_post_process_group(
+                is_new=False,
+                is_regression=False,
+                is_new_group_environment=False,
+                event=event,
+            )
+            assert handle_auto_assignment.call_count == 2
+
+        mock_metrics.incr.assert_any_call(
+            "post_process.owner_assignment.skipped",
+            tags={"stage": "auto_assignment", "reason": "debounced"},
+        )
+
+    @override_options({"post_process.owner-assignment-coalesce-window": 60})
+    @patch("sentry.tasks.post_process.ISSUE_OWNERS_EVALUATION_WAIT", 0)
+    @patch("sentry.tasks.post_process.metrics")
+    def test_coalesces_issue_owners_evaluation(self, mock_metrics):
+        self.make_ownership()
+        event = self.create_event(
+            data={
+                "message": "oh no",
+                "platform": "python",
+                "stacktrace": {"frames": [{"filename": "src/app/example.py"}]},
+            },
+            project_id=self.project.id,
+        )
+
+        # Another event of the group is evaluating its owners.
+        lock = locks.get(f"issue_owners_evaluation:{event.group_id}", duration=10, name="test")
+        with lock.acquire(), patch.object(
+            ProjectOwnership, "get_issue_owners", return_value=[]
+        ) as get_issue_owners:
+            self.call_post_process_group(
+                is_new=False,
+                is_regression=False,
+                is_new_group_environment=False,
+                event=event,
+            )
+        assert get_issue_owners.call_count == 0
+        mock_metrics.incr.assert_any_call(
+            "post_process.owner_assignment.skipped",
+            tags={"stage": "issue_owners", "reason": "in_flight"},
+        )
+
 
 class ProcessCommitsTestMixin(BasePostProgressGroupMixin):
     github_blame_return_value = {
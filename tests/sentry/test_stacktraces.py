@@ -1,12 +1,19 @@
+import threading
+
 import pytest
 
 from sentry.grouping.api import get_default_grouping_config_dict, load_grouping_config
 from sentry.stacktraces.processing import (
+    StacktraceProcessor,
+    compact_frame_result,
+    expand_frame_result,
     find_stacktraces_in_data,
     get_crash_frame_from_event_data,
     normalize_stacktraces_for_grouping,
+    process_stacktraces,
 )
 from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
 
 
 class FindStacktracesTest(TestCase):
@@ -157,6 +164,96 @@ class FindStacktracesTest(TestCase):
         assert len(infos[0].stacktrace["frames"]) == 3
 
 
+class UppercaseProcessor(StacktraceProcessor):
+    supports_concurrent_processing = True
+
+    def __init__(self, *args, **kwargs):
+        StacktraceProcessor.__init__(self, *args, **kwargs)
+        self.threads = set()
+
+    def handles_frame(self, frame, stacktrace_info):
+        return True
+
+    def process_frame(self, processable_frame, processing_task):
+        self.threads.add(threading.get_ident())
+        frame = dict(processable_frame.frame, function=processable_frame["function"].upper())
+        return [frame], [processable_frame.frame], None
+
+
+class ProcessStacktracesTest(TestCase):
+    def get_data(self):
+        return {
+            "project": self.project.id,
+            "platform": "python",
+            "exception": {
+                "values": [
+                    {
+                        "type": "Error%d" % i,
+                        "stacktrace": {"frames": [{"function": f"func_{i}_{j}"} for j in range(3)]},
+                    }
+                    for i in range(4)
+                ]
+            },
+        }
+
+    def process(self, data, supports_concurrent_processing):
+        processors = []
+
+        def make_processors(data, infos):
+            processor = UppercaseProcessor(data, infos, self.project)
+            processor.supports_concurrent_processing = supports_concurrent_processing
+            processors.append(processor)
+            return processors
+
+        assert process_stacktraces(data, make_processors=make_processors) is data
+        return processors[0].threads
+
+    def assert_processed(self, data):
+        for i, exception in enumerate(data["exception"]["values"]):
+            assert [frame["function"] for frame in exception["stacktrace"]["frames"]] == [
+                f"FUNC_{i}_{j}" for j in range(3)
+            ]
+            assert [frame["function"] for frame in exception["raw_stacktrace"]["frames"]] == [
+                f"func_{i}_{j}" for j in range(3)
+            ]
+
+    def test_serial(self):
+        data = self.get_data()
+        assert self.process(data, True) == {threading.get_ident()}
+        self.assert_processed(data)
+
+    @override_options({"processing.stacktrace-thread-pool-size": 4})
+    def test_concurrent(self):
+        data = self.get_data()
+        assert threading.get_ident() not in self.process(data, True)
+        self.assert_processed(data)
+
+    @override_options({"processing.stacktrace-thread-pool-size": 4})
+    def test_concurrent_not_supported(self):
+        data = self.get_data()
+        assert self.process(data, False) == {threading.get_ident()}
+        self.assert_processed(data)
+
+
+def test_frame_result_roundtrip():
+    frame = {"function": "a", "abs_path": "foo.min.js", "lineno": 1, "colno": 10}
+    new_frame = dict(frame, function="foo", abs_path="foo.js", context_line="foo()")
+    del new_frame["colno"]
+    raw_frame = dict(frame, context_line="a()")
+    error = {"type": "js_no_source", "url": "foo.js"}
+
+    value = compact_frame_result(frame, ([new_frame], [raw_frame], [error]))
+    assert value == (
+        [({"function": "foo", "abs_path": "foo.js", "context_line": "foo()"}, ["colno"])],
+        [({"context_line": "a()"}, [])],
+        [error],
+    )
+    assert expand_frame_result(frame, value) == ([new_frame], [raw_frame], [error])
+
+    value = compact_frame_result(frame, None)
+    assert expand_frame_result(frame, value) == (None, None, [])
+
+
 class NormalizeInApptest(TestCase):
     def test_normalize_with_system_frames(self):
         data = {
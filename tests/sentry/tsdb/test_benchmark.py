@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
+from sentry.tsdb.redis import RedisTSDB
+
+
+def benchmark_available():
+    try:
+        import pytest_benchmark  # NOQA
+    except ModuleNotFoundError:
+        return False
+    else:
+        return True
+
+
+# Issue stream stats: 100 groups over the 24h and 14d periods.
+GROUP_IDS = list(range(1, 101))
+PERIODS = {"24h": (timedelta(hours=24), ONE_HOUR), "14d": (timedelta(days=14), ONE_DAY)}
+
+
+@pytest.fixture
+def tsdb():
+    db = RedisTSDB(
+        rollups=((10, 30), (ONE_MINUTE, 120), (ONE_HOUR, 24), (ONE_DAY, 30)),
+        vnodes=64,
+    )
+    yield db
+    with db.cluster.all() as client:
+        client.flushdb()
+
+
+@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@pytest.mark.parametrize("period", sorted(PERIODS))
+def test_benchmark_get_range(period, benchmark, tsdb):
+    duration, rollup = PERIODS[period]
+    end = datetime.utcnow().replace(tzinfo=pytz.UTC)
+    start = end - duration
+
+    timestamp = start
+    while timestamp <= end:
+        tsdb.incr_multi([(TSDBModel.group, group_id) for group_id in GROUP_IDS], timestamp)
+        timestamp += timedelta(seconds=rollup)
+
+    results = benchmark(tsdb.get_range, TSDBModel.group, GROUP_IDS, start, end, rollup=rollup)
+    assert len(results) == len(GROUP_IDS)
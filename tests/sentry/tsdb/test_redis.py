@@ -1,5 +1,7 @@
+import random
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from unittest import mock
 
 import pytest
 import pytz
@@ -7,6 +9,7 @@ from django.test import override_settings
 
 from sentry.testutils import TestCase
 from sentry.tsdb.base import ONE_DAY, ONE_HOUR, ONE_MINUTE, TSDBModel
+from sentry.tsdb.inmemory import InMemoryTSDB
 from sentry.tsdb.redis import CountMinScript, RedisTSDB, SuppressionWrapper
 from sentry.utils.dates import to_datetime, to_timestamp
 
@@ -188,6 +191,44 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_get_range_shared_vnode(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        def timestamp(d):
+            t = int(to_timestamp(d))
+            return t - (t % 3600)
+
+        # 1 and 65 share a vnode, so they are read with one HMGET per epoch
+        keys = [1, 65, 2, "foo"]
+        self.db.incr(TSDBModel.group, 1, dts[0])
+        self.db.incr(TSDBModel.group, 65, dts[0], count=2)
+        self.db.incr(TSDBModel.group, 65, dts[3], count=3)
+        self.db.incr(TSDBModel.group, "foo", dts[2], count=4)
+
+        results = self.db.get_range(TSDBModel.group, keys, dts[0], dts[-1])
+        assert results == {
+            1: [(timestamp(dts[0]), 1)] + [(timestamp(dts[i]), 0) for i in range(1, 4)],
+            65: [
+                (timestamp(dts[0]), 2),
+                (timestamp(dts[1]), 0),
+                (timestamp(dts[2]), 0),
+                (timestamp(dts[3]), 3),
+            ],
+            2: [(timestamp(dts[i]), 0) for i in range(0, 4)],
+            "foo": [
+                (timestamp(dts[0]), 0),
+                (timestamp(dts[1]), 0),
+                (timestamp(dts[2]), 4),
+                (timestamp(dts[3]), 0),
+            ],
+        }
+
+        results = self.db.get_sums(TSDBModel.group, keys, dts[0], dts[-1])
+        assert results == {1: 1, 65: 5, 2: 0, "foo": 4}
+
+        assert self.db.get_range(TSDBModel.group, [], dts[0], dts[-1]) == {}
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -326,6 +367,93 @@ class RedisTSDBTest(TestCase):
         )
         assert results == {1: 0, 2: 0}
 
+    def test_get_distinct_counts_buckets(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        start = now - timedelta(minutes=119)
+        model = TSDBModel.users_affected_by_group
+
+        rollup, series = self.db.get_optimal_rollup_series(start, now)
+        assert rollup == ONE_MINUTE
+
+        assert self.db.get_distinct_counts_buckets(start, now, rollup=ONE_MINUTE) == [
+            (ONE_MINUTE, timestamp) for timestamp in series
+        ]
+
+        # The range always contains a full hour, which is read from a single
+        # bucket instead of sixty.
+        buckets = self.db.get_distinct_counts_buckets(start, now)
+        assert {r for r, _ in buckets} == {ONE_MINUTE, ONE_HOUR}
+        assert len(buckets) < len(series)
+
+        intervals = sorted((timestamp, timestamp + r) for r, timestamp in buckets)
+        assert intervals[0][0] == series[0]
+        assert intervals[-1][1] == series[-1] + ONE_MINUTE
+        assert all(a[1] == b[0] for a, b in zip(intervals, intervals[1:]))
+
+        for i in range(0, 120, 7):
+            self.db.record(model, 1, (f"user-{i}", "shared"), now - timedelta(minutes=i))
+            self.db.record(model, 2, (f"user-{i % 3}",), now - timedelta(minutes=i))
+
+        assert self.db.get_distinct_counts_totals(
+            model, [1, 2], start, now
+        ) == self.db.get_distinct_counts_totals(model, [1, 2], start, now, rollup=ONE_MINUTE)
+        assert self.db.get_distinct_counts_union(
+            model, [1, 2], start, now
+        ) == self.db.get_distinct_counts_union(model, [1, 2], start, now, rollup=ONE_MINUTE)
+
+    def test_compact_distinct_counts(self):
+        with override_settings(
+            SENTRY_OPTIONS={
+                "redis.clusters": {"tsdb": {"hosts": {i - 6: {"db": i} for i in range(6, 9)}}}
+            }
+        ):
+            db = RedisTSDB(
+                rollups=self.db.rollups.items(),
+                vnodes=64,
+                cluster="tsdb",
+                compacted_rollups=(ONE_HOUR, ONE_DAY),
+            )
+
+        assert db.compaction_sources == {ONE_HOUR: ONE_MINUTE, ONE_DAY: ONE_MINUTE}
+
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        model = TSDBModel.users_affected_by_group
+
+        db.record(model, 1, ("foo", "bar"), now)
+        db.record(model, 1, ("baz",), now, environment_id=1)
+
+        # Buckets that have already closed are written to directly.
+        db.record(model, 2, ("foo",), now - timedelta(minutes=10))
+
+        earlier = now - timedelta(minutes=10)
+        assert db.get_distinct_counts_totals(model, [2], earlier, earlier, rollup=ONE_HOUR) == {
+            2: 1
+        }
+
+        # Buckets that have not been compacted yet are read from the source
+        # rollup instead.
+        assert db.get_compaction_watermarks() == {}
+        for rollup in (ONE_MINUTE, ONE_HOUR, ONE_DAY):
+            assert db.get_distinct_counts_totals(model, [1], now, now, rollup=rollup) == {1: 3}
+        assert db.get_distinct_counts_series(model, [1], now, now, rollup=ONE_DAY) == {
+            1: [(db.normalize_to_epoch(now, ONE_DAY), 3)]
+        }
+
+        # Only source buckets that are still retained are read.
+        buckets = db.get_distinct_counts_buckets(now - timedelta(days=29), now, rollup=ONE_DAY)
+        assert len([r for r, _ in buckets if r == ONE_MINUTE]) <= db.rollups[ONE_MINUTE]
+
+        db.compact_distinct_counts(now + timedelta(minutes=3))
+
+        cutoff = db.normalize_to_epoch(now + timedelta(minutes=2), ONE_MINUTE)
+        assert db.get_compaction_watermarks() == {ONE_HOUR: cutoff, ONE_DAY: cutoff}
+
+        for rollup in (ONE_HOUR, ONE_DAY):
+            assert db.get_distinct_counts_totals(model, [1], now, now, rollup=rollup) == {1: 3}
+            assert db.get_distinct_counts_totals(
+                model, [1], now, now, rollup=rollup, environment_id=1
+            ) == {1: 1}
+
     def test_frequency_tables(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC)
         model = TSDBModel.frequent_issues_by_project
@@ -593,6 +721,71 @@ class RedisTSDBTest(TestCase):
             model, ("organization:1", "organization:2"), now, environment_id=1
         ) == {"organization:1": [], "organization:2": []}
 
+    def test_frequency_tables_batched_per_host(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        model = TSDBModel.frequent_issues_by_project
+        keys = [f"organization:{i}" for i in range(20)]
+
+        self.db.record_frequency_multi(
+            [(model, {key: {"project:1": 1, "project:2": 2} for key in keys})], now
+        )
+
+        with mock.patch.object(
+            self.db.cluster, "execute_commands", wraps=self.db.cluster.execute_commands
+        ) as execute_commands:
+            results = self.db.get_most_frequent(
+                model, keys, now - timedelta(hours=1), now, rollup=ONE_HOUR
+            )
+
+        assert results == {key: [("project:2", 2.0), ("project:1", 1.0)] for key in keys}
+
+        # One script call per host instead of one per key
+        (commands,), _ = execute_commands.call_args
+        assert len(commands) <= len(self.db.cluster.hosts)
+        assert all(len(cmds) == 1 for cmds in commands.values())
+
+    def test_frequency_tables_match_inmemory(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        model = TSDBModel.frequent_issues_by_project
+        inmemory = InMemoryTSDB(rollups=self.db.rollups.items())
+        keys = ["organization:1", "organization:2"]
+
+        # Enough distinct members to overflow the index and use the estimates
+        rng = random.Random(42)
+        for hours in range(3):
+            for _ in range(20):
+                request = {
+                    key: {f"project:{rng.randint(0, 200)}": rng.randint(1, 5) for _ in range(10)}
+                    for key in keys
+                }
+                for db in (self.db, inmemory):
+                    db.record_frequency_multi([(model, request)], now - timedelta(hours=hours))
+
+        start = now - timedelta(hours=2)
+        members = {key: [f"project:{i}" for i in range(0, 200, 7)] for key in keys}
+
+        def query(db):
+            return (
+                db.get_most_frequent(model, keys, start, now, rollup=ONE_HOUR),
+                db.get_most_frequent(model, keys, start, now, rollup=ONE_HOUR, limit=5),
+                db.get_most_frequent(model, keys, now, rollup=ONE_HOUR),
+                db.get_most_frequent_series(model, keys, start, now, rollup=ONE_HOUR),
+                db.get_frequency_series(model, dict(members), start, now, rollup=ONE_HOUR),
+                db.get_frequency_totals(model, dict(members), start, now, rollup=ONE_HOUR),
+            )
+
+        assert query(self.db) == query(inmemory)
+
+        # Only one of the queried buckets exists, ties are ranked like a
+        # single sketch would rank them.
+        for db in (self.db, inmemory):
+            db.record_frequency_multi(
+                [(model, {"organization:3": {"project:a": 1, "project:b": 1}})], now
+            )
+            assert db.get_most_frequent(model, ["organization:3"], start, now, rollup=ONE_HOUR) == {
+                "organization:3": [("project:b", 1.0), ("project:a", 1.0)]
+            }
+
     def test_frequency_table_import_export_no_estimators(self):
         client = self.db.cluster.get_local_client_for_key("key")
 
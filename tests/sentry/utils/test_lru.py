@@ -0,0 +1,36 @@
+from sentry.testutils.helpers import override_options
+from sentry.utils.lru import OptionSizedLRUCache, clear_caches
+
+
+def test_disabled():
+    cache = OptionSizedLRUCache("rules.processor.plan-cache-size")
+    with override_options({"rules.processor.plan-cache-size": 0}):
+        assert not cache.enabled()
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+
+def test_resize_and_clear():
+    cache = OptionSizedLRUCache("rules.processor.plan-cache-size")
+    with override_options({"rules.processor.plan-cache-size": 2}):
+        assert cache.enabled()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("c", 3)
+        assert cache.get("a") is None
+        assert cache.get("c") == 3
+
+    with override_options({"rules.processor.plan-cache-size": 3}):
+        assert cache.get("c") is None
+        cache.set("c", 3)
+        clear_caches()
+        assert cache.get("c") is None
+
+
+def test_getsizeof():
+    cache = OptionSizedLRUCache("rules.processor.plan-cache-size", getsizeof=len)
+    with override_options({"rules.processor.plan-cache-size": 4}):
+        cache.set("a", "abc")
+        cache.set("b", "abcde")
+        assert cache.get("a") == "abc"
+        assert cache.get("b") is None